@@ -8,18 +8,25 @@ import sys
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"  # hides all GPU devices from TensorFlow
 import logging
 logger = logging.getLogger(__name__)
+import numpy as np
 import torch
 import torch.nn as nn
+from autoencoder.model_registry import ModelRegistry
 
 
 class Autoencoder(nn.Module):
     epochs = 20
     batch_size = 32
     lr = 0.001
+    # fast training mode (train_fast): large mini-batches, higher learning rate, early stopping
+    fast_batch_size = 512
+    fast_lr = 0.01
+    fast_max_epochs = 200
+    fast_patience = 8  # epochs without (relative) improvement of min_delta before stopping
+    fast_min_delta = 0.02
     model_base_dir = os.environ.get('MODEL_PATH', '../models')
-    model_name = "autoencoder.pth"  # pytorch (pth) model file path
+    model_name = "autoencoder.pth"  # pytorch (pth) model file path (models saved before the registry was introduced)
     model_path = os.path.join(model_base_dir, model_name)
-    # ToDo use dynamic file name, e.g. model_filename = f"autoencoder_epochs{epochs}_noise{noise_level}_fault{fault_injected}_{timestamp}.pth"
     small_model = False
 
     def __init__(self):
@@ -80,7 +87,7 @@ class Autoencoder(nn.Module):
         """
         Train the autoencoder model on the provided signal data.
         :param signal: the signal data to train on
-        :return: -
+        :return: average loss (MSE) of the last epoch
         """
         signal_tensor = torch.from_numpy(signal)
         criterion = nn.MSELoss()
@@ -107,17 +114,82 @@ class Autoencoder(nn.Module):
             logger.info(f"training: epoch: {epoch} -> avg_loss: {avg_loss}")
 
         logger.info(f"Training completed. Loss: {loss.item()}")
+        return avg_loss
 
-    def save_model(self):
+    def train_fast(self, signal, compile_model=False):
         """
-        Save the trained model to a file.
-        :return: -
+        Fast training mode: large shuffled mini-batches are indexed straight from the signal tensor
+        (no DataLoader), the learning rate is reduced on loss plateaus and training stops early when
+        the loss no longer improves.
+        :param signal: the signal data to train on (2D array [samples, 1])
+        :param compile_model: use torch.compile for the forward/backward pass
+        :return: loss (MSE) of the last epoch
         """
-        torch.save(self.state_dict(), Autoencoder.model_path)
+        signal_tensor = torch.from_numpy(np.ascontiguousarray(signal, dtype=np.float32))
+        model = torch.compile(self) if compile_model else self
+        criterion = nn.MSELoss()
+        optimizer = torch.optim.Adam(self.parameters(), lr=Autoencoder.fast_lr)
+        scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.5,
+                                                               patience=Autoencoder.fast_patience // 3)
+        n_samples = len(signal_tensor)
+        best_loss = float('inf')
+        epochs_without_improvement = 0
+        epoch_loss = float('nan')
+
+        for epoch in range(Autoencoder.fast_max_epochs):
+            permutation = torch.randperm(n_samples)
+            running_loss = torch.zeros(())
+            for start in range(0, n_samples, Autoencoder.fast_batch_size):
+                inputs = signal_tensor[permutation[start:start + Autoencoder.fast_batch_size]]
+                loss = criterion(model(inputs), inputs)
+
+                optimizer.zero_grad(set_to_none=True)
+                loss.backward()
+                optimizer.step()
+                running_loss += loss.detach() * len(inputs)
+            epoch_loss = running_loss.item() / n_samples
+            scheduler.step(epoch_loss)
+            logger.info(f"fast training: epoch: {epoch} -> avg_loss: {epoch_loss}")
+
+            # early stopping on loss plateau
+            if epoch_loss < best_loss * (1 - Autoencoder.fast_min_delta):
+                best_loss = epoch_loss
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+                if epochs_without_improvement >= Autoencoder.fast_patience:
+                    break
+
+        logger.info(f"Fast training completed after {epoch + 1} epochs. Loss: {epoch_loss}")
+        return epoch_loss
+
+    @staticmethod
+    def registry():
+        """
+        Model registry of this model (versions in MODEL_PATH/autoencoder).
+        :return: ModelRegistry
+        """
+        return ModelRegistry(Autoencoder.model_base_dir, os.path.splitext(Autoencoder.model_name)[0])
+
+    def save_model(self, metadata=None):
+        """
+        Save the trained model as a new version in the model registry (atomic, becomes the latest version).
+        :param metadata: training metadata stored in the manifest (e.g. loss, samples)
+        :return: version id
+        """
+        return Autoencoder.registry().publish(self.state_dict(), metadata)
 
-    def load_model(self):
+    def load_model(self, version=None):
         """
-        Load the trained model from a file.
-        :return: -
+        Load a trained model version from the registry (memory-mapped);
+        falls back to the model file model_path if no version has been published.
+        :param version: version id (default: latest)
+        :return: version id (None for model_path)
         """
-        self.load_state_dict(torch.load(Autoencoder.model_path, weights_only=True))
+        registry = Autoencoder.registry()
+        version = version or registry.latest_version()
+        if version is None:
+            self.load_state_dict(torch.load(Autoencoder.model_path, weights_only=True))
+            return None
+        self.load_state_dict(registry.load(version))
+        return version
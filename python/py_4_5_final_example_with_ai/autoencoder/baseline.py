@@ -0,0 +1,186 @@
+# baseline.py
+"""
+Baseline statistics of the reconstruction loss of normal data, stored with the model version in the registry
+(versions/<version>.baseline.json). They provide a stable detection threshold that does not depend on the
+(possibly small or fully faulty) data of a single detect request:
+- Welford moments (count, mean, M2), merged batch-wise (Chan et al.) -> threshold mean + k * std
+- quantile sketch with log-spaced buckets (relative accuracy, DDSketch-like) -> threshold = quantile, e.g. 0.999
+Both are updated incrementally and can be merged, e.g. with the losses of data confirmed to be normal.
+"""
+import json
+import math
+import os
+import numpy as np
+import torch
+
+BASELINE_SUFFIX = 'baseline.json'  # registry artifact: versions/<version>.baseline.json
+
+
+class LossBaseline:
+    relative_accuracy = 0.01  # relative error of the quantile estimates
+    min_value = 1e-12  # smaller losses are counted in the zero bucket
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.zero_count = 0
+        self.offset = 0  # bucket index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def _gamma():
+        return (1 + LossBaseline.relative_accuracy) / (1 - LossBaseline.relative_accuracy)
+
+    def update(self, losses):
+        """
+        Add losses (vectorized: moments and bucket counts of the batch are merged into the baseline).
+        :param losses: 1D array or tensor of reconstruction losses
+        :return: self
+        """
+        losses = np.asarray(losses.numpy() if isinstance(losses, torch.Tensor) else losses, dtype=np.float64).ravel()
+        if len(losses) == 0:
+            return self
+        n, mean = len(losses), losses.mean()
+        m2 = np.square(losses - mean).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+        positive = losses[losses > LossBaseline.min_value]
+        self.zero_count += n - len(positive)
+        if len(positive):
+            index = np.ceil(np.log(positive) / math.log(self._gamma())).astype(np.int64)
+            self._add_counts(index.min(), np.bincount(index - index.min()))
+        return self
+
+    def _add_counts(self, offset, counts):
+        if len(self.counts) == 0:
+            self.offset, self.counts = offset, counts.astype(np.int64)
+            return
+        low = min(self.offset, offset)
+        high = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(high - low, dtype=np.int64)
+        merged[self.offset - low:self.offset - low + len(self.counts)] += self.counts
+        merged[offset - low:offset - low + len(counts)] += counts
+        self.offset, self.counts = low, merged
+
+    def merge(self, other):
+        """
+        Merge another baseline (e.g. computed by another process) into this one.
+        :param other: LossBaseline
+        :return: self
+        """
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.zero_count += other.zero_count
+        if len(other.counts):
+            self._add_counts(other.offset, other.counts)
+        return self
+
+    @property
+    def std(self):
+        """ Sample standard deviation of the losses (like torch.std). """
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def quantile(self, q):
+        """
+        Estimated quantile of the losses (relative error <= relative_accuracy).
+        :param q: quantile in [0, 1]
+        :return: loss value
+        """
+        if self.count == 0:
+            raise ValueError("Empty baseline")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right'))
+        gamma = self._gamma()
+        return 2 * gamma ** (self.offset + bucket) / (gamma + 1)
+
+    def threshold(self, k=3.0, quantile=None):
+        """
+        Detection threshold for the reconstruction loss.
+        :param k: multiplier for the standard deviation (mean + k * std)
+        :param quantile: use this quantile instead (e.g. 0.999)
+        :return: threshold
+        """
+        return self.quantile(quantile) if quantile else self.mean + k * self.std
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "std": self.std,
+                "zero_count": self.zero_count, "relative_accuracy": LossBaseline.relative_accuracy,
+                "offset": int(self.offset), "counts": self.counts.tolist()}
+
+    @staticmethod
+    def from_dict(data):
+        if data['relative_accuracy'] != LossBaseline.relative_accuracy:
+            raise ValueError("Baseline was stored with a different relative accuracy")
+        baseline = LossBaseline()
+        baseline.count, baseline.mean, baseline.m2 = data['count'], data['mean'], data['m2']
+        baseline.zero_count, baseline.offset = data['zero_count'], data['offset']
+        baseline.counts = np.array(data['counts'], dtype=np.int64)
+        return baseline
+
+
+def reconstruction_losses(model, vibration_data):
+    """
+    Reconstruction loss (MSE) of each row.
+    :param model: model callable (eager or exported, see autoencoder/export.py)
+    :param vibration_data: 2D float32 array [samples, 1]
+    :return: 1D tensor
+    """
+    x = torch.from_numpy(np.ascontiguousarray(vibration_data, dtype=np.float32))
+    with torch.inference_mode():
+        return ((model(x) - x) ** 2).mean(dim=1)
+
+
+def save_baseline(registry, version, baseline):
+    """
+    Atomically save the baseline of a model version.
+    :param registry: ModelRegistry
+    :param version: version id
+    :param baseline: LossBaseline
+    :return: file
+    """
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(baseline.to_dict(), f)
+    return registry.save_artifact(version, BASELINE_SUFFIX, write)
+
+
+def load_baseline(registry, version=None):
+    """
+    :param registry: ModelRegistry
+    :param version: version id (default: latest)
+    :return: LossBaseline of the version or None if there is none (e.g. models trained before baselines)
+    """
+    version = version or registry.latest_version()
+    if version is None:
+        return None
+    try:
+        with open(registry.artifact_path(version, BASELINE_SUFFIX)) as f:
+            return LossBaseline.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def baseline_version(registry):
+    """
+    Version key of the latest baseline for ModelWatcher: changes with the model version and each baseline update.
+    :return: (version id, modification time of the baseline file) or None
+    """
+    version = registry.latest_version()
+    if version is None:
+        return None
+    try:
+        return version, os.stat(registry.artifact_path(version, BASELINE_SUFFIX)).st_mtime_ns
+    except FileNotFoundError:
+        return version, None
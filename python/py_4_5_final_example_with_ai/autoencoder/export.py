@@ -0,0 +1,144 @@
+# export.py
+"""
+Export of the trained autoencoder for CPU inference backends:
+- eager: PyTorch float32 (the trained model itself)
+- torchscript / torchscript-int8: traced TorchScript module, optionally with dynamic int8 quantized Linear layers
+- onnx / onnx-int8: ONNX model run by onnxruntime, optionally with dynamic int8 quantized weights
+The exported files are stored next to the model version in the model registry (versions/<version>.<suffix>),
+so an export is done once per version (by the train service or on first use in the detect service).
+onnx, onnxscript (export) and onnxruntime (inference, int8 quantization) are optional dependencies.
+"""
+import copy
+import os
+import logging
+import torch
+import torch.nn as nn
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('eager', 'torchscript', 'torchscript-int8', 'onnx', 'onnx-int8')
+SUFFIXES = {'torchscript': 'ts.pt', 'torchscript-int8': 'ts-int8.pt', 'onnx': 'onnx', 'onnx-int8': 'int8.onnx'}
+
+
+def inference_module(model):
+    """
+    Plain copy of the encoder/decoder in eval mode (the autoencoder classes override nn.Module.train,
+    so eval() and the quantization/export tools that call it cannot be used on them directly).
+    :param model: Autoencoder or SpectralAutoencoder
+    :return: nn.Sequential(encoder, decoder)
+    """
+    return nn.Sequential(copy.deepcopy(model.encoder), copy.deepcopy(model.decoder)).eval()
+
+
+def quantize_int8(module):
+    """
+    Dynamic int8 quantization of the Linear layers (weights int8, activations quantized per batch).
+    :param module: module in eval mode (see inference_module)
+    :return: quantized module
+    """
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_model(model, backend, path):
+    """
+    Export a model for a backend.
+    :param model: trained Autoencoder or SpectralAutoencoder
+    :param backend: torchscript, torchscript-int8, onnx or onnx-int8
+    :param path: output file
+    :return: -
+    """
+    module = inference_module(model)
+    example = torch.zeros(8, module[0][0].in_features)
+    if backend in ('torchscript', 'torchscript-int8'):
+        if backend == 'torchscript-int8':
+            module = quantize_int8(module)
+        with torch.no_grad():
+            torch.jit.save(torch.jit.trace(module, example), path)
+    elif backend in ('onnx', 'onnx-int8'):
+        onnx_path = path if backend == 'onnx' else path + '.float.onnx'
+        program = torch.onnx.export(module, (example,), input_names=['input'], output_names=['reconstructed'],
+                                    dynamic_shapes=({0: torch.export.Dim('rows')},), dynamo=True, verbose=False)
+        if backend == 'onnx':
+            program.save(path)
+        else:
+            import onnx
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            model_proto = program.model_proto
+            del model_proto.graph.value_info[:]  # shapes of the weights conflict with the quantizer's shape inference
+            onnx.save(model_proto, onnx_path)
+            try:
+                quantize_dynamic(onnx_path, path, weight_type=QuantType.QInt8)
+            finally:
+                os.unlink(onnx_path)
+    else:
+        raise ValueError(f"Unknown export backend {backend}, use one of {', '.join(SUFFIXES)}")
+    logger.info(f"model exported: {backend} -> {path}")
+
+
+class OnnxModel:
+    """ onnxruntime session with the call interface of the PyTorch model (tensor in, tensor out). """
+
+    def __init__(self, path, num_threads=None):
+        """
+        :param path: ONNX model file
+        :param num_threads: intra-op threads (default: torch.get_num_threads())
+        """
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or torch.get_num_threads()
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, x):
+        return torch.from_numpy(self.session.run(None, {'input': x.numpy()})[0])
+
+
+def load_exported(backend, path):
+    """
+    Load an exported model.
+    :param backend: torchscript, torchscript-int8, onnx or onnx-int8
+    :param path: exported file
+    :return: callable mapping an input tensor [rows, features] to the reconstructed tensor
+    """
+    if backend.startswith('torchscript'):
+        return torch.jit.load(path)
+    return OnnxModel(path)
+
+
+def load_inference_model(model_class, backend='eager', version=None):
+    """
+    Load a model version from the registry for a backend; the export is created and stored in the
+    registry if it does not exist yet.
+    :param model_class: Autoencoder or SpectralAutoencoder
+    :param backend: one of BACKENDS
+    :param version: version id (default: latest)
+    :return: callable mapping an input tensor [rows, features] to the reconstructed tensor
+    """
+    if backend == 'eager':
+        model = model_class()
+        model.load_model(version)
+        return model
+    if backend not in SUFFIXES:
+        raise ValueError(f"Unknown inference backend {backend}, use one of {', '.join(BACKENDS)}")
+    registry = model_class.registry()
+    version = version or registry.latest_version()
+    if version is None:
+        raise FileNotFoundError(f"Backend {backend} needs a model version in {registry.directory}")
+    path = registry.artifact_path(version, SUFFIXES[backend])
+    if not os.path.exists(path):
+        export_version(model_class, backend, version)
+    return load_exported(backend, path)
+
+
+def export_version(model_class, backend, version=None):
+    """
+    Export a model version and store the export in the registry.
+    :param model_class: Autoencoder or SpectralAutoencoder
+    :param backend: torchscript, torchscript-int8, onnx or onnx-int8
+    :param version: version id (default: latest)
+    :return: exported file
+    """
+    model = model_class()
+    version = model.load_model(version)
+    if version is None:
+        raise FileNotFoundError(f"Export needs a model version in {model_class.registry().directory}")
+    return model_class.registry().save_artifact(version, SUFFIXES[backend],
+                                                lambda path: export_model(model, backend, path))
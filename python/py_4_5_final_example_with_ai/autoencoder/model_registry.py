@@ -0,0 +1,200 @@
+# model_registry.py
+"""
+Versioned on-disk registry for the trained autoencoder models.
+Layout (one directory per model name in MODEL_PATH):
+    <base_dir>/<name>/versions/<version>.pth   model state dicts (never modified after publishing)
+    <base_dir>/<name>/versions/<version>.<suffix>  exported variants of a version (see autoencoder/export.py)
+    <base_dir>/<name>/manifest.json            versions with training metadata (e.g. loss, samples)
+    <base_dir>/<name>/LATEST                   version served by the detect service
+    <base_dir>/<name>/.lock                    lock file of the manifest updates
+All files are written to a temporary file first and renamed (os.replace is atomic), so readers never see
+a half-written model, manifest or pointer. Switching the served version (e.g. rollback) only rewrites LATEST.
+Publishers in several processes (e.g. gunicorn workers or a second train service on the same MODEL_PATH) are
+serialized by an exclusive lock on the lock file (fcntl.flock, POSIX only: elsewhere only within one process).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+import torch
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    keep_versions = 20  # number of versions kept on disk (the latest version is never removed)
+    _lock = threading.Lock()  # serializes the threads of this process (the lock file the processes, see lock)
+
+    def __init__(self, base_dir, name):
+        """
+        :param base_dir: model directory (MODEL_PATH)
+        :param name: model name, e.g. autoencoder
+        """
+        self.name = name
+        self.directory = os.path.join(base_dir, name)
+        self.versions_dir = os.path.join(self.directory, 'versions')
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.latest_path = os.path.join(self.directory, 'LATEST')
+        self.lock_path = os.path.join(self.directory, '.lock')
+
+    @contextmanager
+    def lock(self):
+        """
+        Exclusive lock for a read-modify-write of the registry files (manifest, LATEST, artifacts), held by one
+        thread of one process at a time.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with ModelRegistry._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)  # released when the file is closed
+            yield
+
+    def _write_atomic(self, path, write_fn):
+        """ Write a file via a temporary file in the same directory and an atomic rename. """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write_fn(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _write_json(self, path, data):
+        self._write_atomic(path, lambda f: f.write(json.dumps(data, indent=2).encode()))
+
+    def manifest(self):
+        """ :return: manifest dict {"name": ..., "versions": [{"version", "file", "created", "metadata"}, ...]} """
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"name": self.name, "versions": []}
+
+    def versions(self):
+        """ :return: version ids, oldest first """
+        return [entry['version'] for entry in self.manifest()['versions']]
+
+    def latest_version(self):
+        """ :return: version id the LATEST pointer refers to or None if no model has been published """
+        try:
+            with open(self.latest_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version=None):
+        """
+        :param version: version id (default: latest)
+        :return: model file of the version
+        """
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No model published in {self.directory}")
+        return os.path.join(self.versions_dir, f"{version}.pth")
+
+    def publish(self, state_dict, metadata=None):
+        """
+        Save a new model version and make it the latest version.
+        :param state_dict: model state dict
+        :param metadata: JSON serializable training metadata (e.g. loss, samples, training mode)
+        :return: version id
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"  # time stamp + random suffix (the manifest keeps the order)
+        self._write_atomic(self.path(version), lambda f: torch.save(state_dict, f))
+        with self.lock():
+            manifest = self.manifest()
+            manifest['versions'].append({"version": version, "file": f"versions/{version}.pth",
+                                         "created": time.time(), "metadata": metadata or {}})
+            self._write_json(self.manifest_path, manifest)
+            self._write_atomic(self.latest_path, lambda f: f.write(version.encode()))
+            self._prune(manifest)
+        logger.info(f"model {self.name} published: version {version}")
+        return version
+
+    def set_latest(self, version):
+        """
+        Point LATEST to an existing version (e.g. to roll back to an older model).
+        :param version: version id
+        """
+        if version not in self.versions() or not os.path.exists(self.path(version)):
+            raise ValueError(f"Unknown version {version} of model {self.name}")
+        with self.lock():
+            self._write_atomic(self.latest_path, lambda f: f.write(version.encode()))
+        logger.info(f"model {self.name}: latest version set to {version}")
+
+    def rollback(self):
+        """
+        Point LATEST to the version published before the current latest version.
+        :return: version id now served
+        """
+        versions = self.versions()
+        latest = self.latest_version()
+        index = versions.index(latest) if latest in versions else len(versions)
+        if index == 0:
+            raise ValueError(f"No older version of model {self.name}")
+        self.set_latest(versions[index - 1])
+        return versions[index - 1]
+
+    def artifact_path(self, version, suffix):
+        """
+        :param version: version id
+        :param suffix: artifact suffix, e.g. onnx
+        :return: file of an artifact derived from the version (e.g. exported model)
+        """
+        return os.path.join(self.versions_dir, f"{version}.{suffix}")
+
+    def save_artifact(self, version, suffix, write_fn):
+        """
+        Atomically save an artifact derived from a version (removed together with the version).
+        :param version: version id
+        :param suffix: artifact suffix, e.g. onnx
+        :param write_fn: function write_fn(path) writing the artifact to the given (temporary) path
+        :return: artifact file
+        """
+        path = self.artifact_path(version, suffix)
+        # torch.jit.save derives the archive name from the file name, so it must not start with a dot
+        fd, tmp_path = tempfile.mkstemp(dir=self.versions_dir, prefix='tmp-', suffix=f".{suffix}")
+        os.close(fd)
+        try:
+            write_fn(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    def load(self, version=None):
+        """
+        Load a model version memory-mapped (the file is mapped instead of read, so switching versions is fast).
+        :param version: version id (default: latest)
+        :return: state dict
+        """
+        return torch.load(self.path(version), mmap=True, weights_only=True)
+
+    def _prune(self, manifest):
+        latest = self.latest_version()
+        old = manifest['versions'][:-ModelRegistry.keep_versions]
+        removed = [entry for entry in old if entry['version'] != latest]
+        if not removed:
+            return
+        manifest['versions'] = [entry for entry in manifest['versions'] if entry not in removed]
+        self._write_json(self.manifest_path, manifest)
+        for entry in removed:
+            for file_name in os.listdir(self.versions_dir):  # model file and artifacts of the version
+                if file_name.startswith(f"{entry['version']}."):
+                    try:
+                        os.unlink(os.path.join(self.versions_dir, file_name))
+                    except FileNotFoundError:
+                        pass
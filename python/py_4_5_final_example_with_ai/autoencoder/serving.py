@@ -0,0 +1,163 @@
+# serving.py
+"""
+Helpers for serving the autoencoder in the detect service:
+- ModelWatcher: hot-reload of the model (version) published by the train service (no restart needed), loaded in
+  a background thread so requests never wait for a load
+- MicroBatcher: combines the rows of concurrent requests into one forward pass
+"""
+import os
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from queue import Queue, Empty
+import numpy as np
+logger = logging.getLogger(__name__)
+
+
+class ModelWatcher:
+    """
+    Keeps the current model and swaps in a new one when the model file changes. The model file is checked and
+    loaded by a background thread, readers (e.g. the MicroBatcher worker) only read the current reference.
+    """
+
+    def __init__(self, load_fn, model_path=None, check_interval_s=2.0, version_fn=None):
+        """
+        :param load_fn: callable returning a new model instance loaded from model_path
+        :param model_path: model file to watch
+        :param check_interval_s: min. time between two checks of the model file
+        :param version_fn: callable returning the current model version (e.g. ModelRegistry.latest_version),
+                           used instead of the modification time of model_path
+        """
+        self.load_fn = load_fn
+        self.model_path = model_path
+        self.check_interval_s = check_interval_s
+        self.version_fn = version_fn or self._file_version
+        self.model = None
+        self.version = None  # (mtime, size) of the loaded model file or version_fn() when it was loaded
+        self._loaded = False  # load_fn may return None (e.g. no baseline for this version), cached as well
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def _file_version(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """
+        Load the model file into a new model instance and swap it in (the reference assignment is atomic,
+        requests still running keep the old model).
+        :return: True if a new model was loaded
+        """
+        with self._lock:
+            version = self.version_fn()
+            if self._loaded and version == self.version:
+                return False
+            model = self.load_fn()
+            self.model, self.version = model, version
+            self._loaded = True
+            logger.info(f"model loaded: {self.model_path or self.load_fn.__name__} (version {version})")
+            return True
+
+    def check(self):
+        """
+        Load a new model version if there is one. A file that cannot be loaded (e.g. still being written) is
+        ignored and the old model is kept.
+        :return: True if a new model was loaded
+        """
+        try:
+            return self.reload()
+        except Exception as e:
+            logger.warning(f"model reload failed, keeping current model: {e}")
+            return False
+
+    def get(self):
+        """
+        Return the current model. Only the first call loads the model (in the calling thread), new versions are
+        loaded by the watcher thread every check_interval_s and swapped in without blocking the callers.
+        """
+        if not self._loaded:
+            self.reload()
+        self._ensure_watcher()
+        return self.model
+
+    def _ensure_watcher(self):
+        # started lazily like the MicroBatcher worker, i.e. in each forked server worker process
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval_s)
+            self.check()
+
+
+class MicroBatcher:
+    """ Collects the inputs of concurrent requests and runs them as one batch. """
+
+    def __init__(self, infer_fn, max_batch_rows=65536, max_wait_ms=5.0):
+        """
+        :param infer_fn: function mapping a 2D numpy array [rows, features] to one result per row
+                         (numpy array or tensor with len == rows)
+        :param max_batch_rows: max. number of rows per batch (a single larger request is run alone)
+        :param max_wait_ms: max. time to wait for more requests after the first one
+        """
+        self.infer_fn = infer_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self._queue = Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, rows):
+        """
+        Run infer_fn for the rows (together with the rows of other concurrent requests).
+        :param rows: 2D numpy array [rows, features]
+        :return: result of infer_fn for these rows
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((rows, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # the worker thread is started lazily, e.g. only after forking the server worker processes
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        pending = None
+        while True:
+            batch = [pending] if pending is not None else [self._queue.get()]
+            pending = None
+            n_rows = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while n_rows < self.max_batch_rows:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if n_rows + len(item[0]) > self.max_batch_rows:
+                    pending = item  # does not fit, first item of the next batch
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.infer_fn(np.concatenate([rows for rows, _ in batch]))
+            offset = 0
+            for rows, future in batch:
+                future.set_result(results[offset:offset + len(rows)])
+                offset += len(rows)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
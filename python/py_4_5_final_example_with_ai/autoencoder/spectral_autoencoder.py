@@ -0,0 +1,151 @@
+# spectral_autoencoder.py
+"""
+Autoencoder on windowed spectral features (FFT magnitude frames) for vibration anomaly detection using PyTorch.
+Instead of one row per sample (Autoencoder), each row is the FFT magnitude spectrum of one window, so
+training and detection need one inference per window hop and the model sees the temporal context of a window.
+"""
+import os
+import logging
+logger = logging.getLogger(__name__)
+import numpy as np
+import torch
+import torch.nn as nn
+from numpy.lib.stride_tricks import sliding_window_view
+from autoencoder.model_registry import ModelRegistry
+
+
+def spectral_features(signal, window_size=500, step=50):
+    """
+    FFT magnitude frames of a signal, computed like AnomalyDetector.do_fft_batched
+    (Hanning window, magnitudes scaled by 2 / window_size).
+    :param signal: 1D signal (or 2D array [samples, 1])
+    :param window_size: samples per window
+    :param step: window hop in samples
+    :return: 2D float32 array [window, frequency bin]
+    """
+    signal = np.asarray(signal, dtype=np.float32).ravel()
+    if len(signal) < window_size:
+        return np.empty((0, window_size // 2 + 1), dtype=np.float32)
+    frames = sliding_window_view(signal, window_size)[::step]  # strided view, no copy
+    window = np.hanning(window_size).astype(np.float32)
+    return ((2.0 / window_size) * np.abs(np.fft.rfft(frames * window, axis=-1))).astype(np.float32)
+
+
+class SpectralAutoencoder(nn.Module):
+    window_size = 500  # 0.5 s at 1000 Hz
+    step = 50  # window hop (one inference per hop)
+    epochs = 300
+    batch_size = 64
+    lr = 0.001
+    error_threshold = 0.15  # max. reconstruction error (FFT magnitude) of a bin in a normal window
+    model_base_dir = os.environ.get('MODEL_PATH', '../models')
+    model_name = "autoencoder_spectral.pth"  # registry name (without .pth): versions in MODEL_PATH/autoencoder_spectral
+
+    def __init__(self):
+        """
+        Initialize the spectral autoencoder model (input: one FFT magnitude frame).
+        """
+        super(SpectralAutoencoder, self).__init__()
+        n_bins = SpectralAutoencoder.window_size // 2 + 1
+        self.encoder = nn.Sequential(
+            nn.Linear(n_bins, 64),
+            nn.ReLU(),
+            nn.Linear(64, 16),
+            nn.ReLU()
+        )
+        self.decoder = nn.Sequential(
+            nn.Linear(16, 64),
+            nn.ReLU(),
+            nn.Linear(64, n_bins)
+        )
+        try:
+            os.makedirs(SpectralAutoencoder.model_base_dir, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Error creating directory: {e}")
+            raise
+
+    def forward(self, x):
+        """
+        Encode and decode a batch of FFT magnitude frames.
+        :param x: input tensor [frames, bins]
+        :return: decoded tensor
+        """
+        return self.decoder(self.encoder(x))
+
+    def features(self, signal):
+        """
+        FFT magnitude frames of a signal with the window size and hop of this model.
+        :param signal: 1D signal (or 2D array [samples, 1])
+        :return: 2D float32 array [window, frequency bin]
+        """
+        return spectral_features(signal, SpectralAutoencoder.window_size, SpectralAutoencoder.step)
+
+    def reconstruction_errors(self, features):
+        """
+        Anomaly score per window: the largest absolute reconstruction error over all frequency bins,
+        i.e. the magnitude of the strongest spectral component the model cannot explain.
+        :param features: 2D float32 array [window, frequency bin] (see features)
+        :return: tensor with one score per window
+        """
+        features = torch.from_numpy(features)
+        with torch.inference_mode():
+            return (self(features) - features).abs().amax(dim=1)
+
+    def train(self, signal):
+        """
+        Train the autoencoder on the FFT magnitude frames of the signal
+        (shuffled mini-batches indexed straight from the feature tensor).
+        :param signal: the signal data to train on
+        :return: loss (MSE) of the last epoch
+        """
+        features = torch.from_numpy(self.features(signal))
+        if len(features) == 0:
+            raise ValueError(f"Signal too short, at least {SpectralAutoencoder.window_size} samples required")
+        criterion = nn.MSELoss()
+        optimizer = torch.optim.Adam(self.parameters(), lr=SpectralAutoencoder.lr)
+
+        epoch_loss = float('nan')
+        for epoch in range(SpectralAutoencoder.epochs):
+            permutation = torch.randperm(len(features))
+            running_loss = torch.zeros(())
+            for start in range(0, len(features), SpectralAutoencoder.batch_size):
+                inputs = features[permutation[start:start + SpectralAutoencoder.batch_size]]
+                loss = criterion(self(inputs), inputs)
+
+                optimizer.zero_grad(set_to_none=True)
+                loss.backward()
+                optimizer.step()
+                running_loss += loss.detach() * len(inputs)
+            epoch_loss = running_loss.item() / len(features)
+            if epoch % 50 == 0:
+                logger.info(f"spectral training: epoch: {epoch} -> avg_loss: {epoch_loss}")
+
+        logger.info(f"Spectral training completed on {len(features)} windows. Loss: {epoch_loss}")
+        return epoch_loss
+
+    @staticmethod
+    def registry():
+        """
+        Model registry of this model (versions in MODEL_PATH/autoencoder_spectral).
+        :return: ModelRegistry
+        """
+        return ModelRegistry(SpectralAutoencoder.model_base_dir, os.path.splitext(SpectralAutoencoder.model_name)[0])
+
+    def save_model(self, metadata=None):
+        """
+        Save the trained model as a new version in the model registry (atomic, becomes the latest version).
+        :param metadata: training metadata stored in the manifest (e.g. loss, samples)
+        :return: version id
+        """
+        return SpectralAutoencoder.registry().publish(self.state_dict(), metadata)
+
+    def load_model(self, version=None):
+        """
+        Load a trained model version from the registry (memory-mapped).
+        :param version: version id (default: latest)
+        :return: version id
+        """
+        registry = SpectralAutoencoder.registry()
+        version = version or registry.latest_version()
+        self.load_state_dict(registry.load(version))
+        return version
@@ -0,0 +1,106 @@
+# benchmark_backends.py
+"""
+CPU benchmark of the inference backends of the detect service (INFERENCE_BACKEND, see autoencoder/export.py):
+- throughput (samples/s) of the reconstruction loss in batches of BATCH_MAX_ROWS rows
+- memory: RSS before loading (runtime and signal), increase by loading the model and peak RSS
+  (each backend runs in its own process)
+- accuracy: difference of the reconstruction error and of the detected anomalies compared to eager float32
+The model is trained on the clean signal (/simulate?inject_fault=false&noise=0) and published to a temporary registry.
+Usage: python benchmark_backends.py [--threads N] [--seconds S]
+"""
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.export import BACKENDS, export_version, load_inference_model
+from motor_simulator import simulate_motor_vibration
+
+batch_max_rows = 262144  # default BATCH_MAX_ROWS of detect_microservice
+k = 3.0  # dynamic threshold of detect_microservice.detect (mean + k * std)
+
+
+def rss_mb():
+    """ Current resident set size of this process in MB (Linux). """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def option(name, default):
+    return type(default)(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+def run_backend(backend, model_dir, seconds, threads):
+    """ Child process: load the backend, compute the reconstruction losses and report timings and memory. """
+    Autoencoder.model_base_dir = model_dir
+    if threads:
+        torch.set_num_threads(threads)
+    _, signal = simulate_motor_vibration(seconds, 1000, 0.37, seconds / 2, True, as_array=True, seed=1)
+    vibration_data = signal.reshape(-1, 1).astype(np.float32)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    model = load_inference_model(Autoencoder, backend)
+    load_s = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    def losses():
+        with torch.inference_mode():
+            return torch.cat([((model(x) - x) ** 2).mean(dim=1)
+                              for x in torch.from_numpy(vibration_data).split(batch_max_rows)]).numpy()
+
+    losses()  # warm-up
+    best_s = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        result = losses()
+        best_s = min(best_s, time.perf_counter() - start)
+    np.save(os.path.join(model_dir, f"losses-{backend}.npy"), result)
+    print(json.dumps({"backend": backend, "samples_per_s": len(vibration_data) / best_s, "load_ms": load_s * 1000,
+                      "base_rss_mb": rss_before, "load_rss_mb": rss_loaded - rss_before,
+                      "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+if __name__ == "__main__":
+    seconds = option('--seconds', 1000.0)
+    threads = option('--threads', 0)
+    if '--child' in sys.argv:
+        run_backend(sys.argv[sys.argv.index('--child') + 1], option('--model-dir', ''), seconds, threads)
+        sys.exit(0)
+
+    model_dir = tempfile.mkdtemp(prefix='benchmark-backends-')
+    Autoencoder.model_base_dir = model_dir
+    _, train_signal = simulate_motor_vibration(5.0, 1000, 0, 2.5, False, as_array=True)
+    torch.manual_seed(0)
+    autoencoder = Autoencoder()
+    autoencoder.train_fast(train_signal.reshape(-1, 1).astype(np.float32))
+    autoencoder.save_model()
+    for backend in BACKENDS[1:]:
+        export_version(Autoencoder, backend)  # export once, the child processes only load
+    print(f"Signal: {seconds:.0f} s at 1000 Hz, torch threads: {threads or torch.get_num_threads()}")
+    print(f"  {'backend':18s} {'samples/s':>12s} {'load ms':>8s} {'base MB':>8s} {'load MB':>8s} {'peak MB':>8s} "
+          f"{'max |d loss|':>13s} {'d threshold':>12s} {'anomalies':>10s}")
+
+    eager_losses = None
+    for backend in BACKENDS:
+        output = subprocess.run([sys.executable, __file__, '--child', backend, '--model-dir', model_dir,
+                                 '--seconds', str(seconds), '--threads', str(threads)],
+                                capture_output=True, text=True, check=True).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        losses = np.load(os.path.join(model_dir, f"losses-{backend}.npy"))
+        threshold = losses.mean() + k * losses.std()
+        anomalies = set(np.flatnonzero(losses > threshold))
+        if eager_losses is None:
+            eager_losses, eager_threshold, eager_anomalies = losses, threshold, anomalies
+        agreement = len(anomalies & eager_anomalies) / max(1, len(anomalies | eager_anomalies))
+        print(f"  {backend:18s} {stats['samples_per_s']:12.0f} {stats['load_ms']:8.1f} {stats['base_rss_mb']:8.0f} "
+              f"{stats['load_rss_mb']:8.1f} {stats['peak_rss_mb']:8.0f} {np.abs(losses - eager_losses).max():13.2e} "
+              f"{(threshold - eager_threshold) / eager_threshold:+12.2%} {agreement:10.1%}")
+    shutil.rmtree(model_dir)
@@ -0,0 +1,48 @@
+# benchmark_band_monitor.py
+"""
+Benchmark of the streaming monitors: full FFT per hop (StreamingSpectrumAnalyzer)
+vs. sliding DFT of the target band only (BandMonitor).
+Usage: python benchmark_band_monitor.py [sampling_rate] [duration_s]
+"""
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from band_monitor import BandMonitor
+from streaming_analyzer import StreamingSpectrumAnalyzer
+
+window_size_s = 0.5
+chunk_size = 100  # samples per push (sensor packet)
+
+
+def run(monitor, signal):
+    """ Stream the signal through the monitor and return (seconds, number of frames, number of anomalies). """
+    start = time.perf_counter()
+    n_frames = n_anomalies = 0
+    for offset in range(0, len(signal), chunk_size):
+        for frame in monitor.push(signal[offset:offset + chunk_size]):
+            n_frames += 1
+            n_anomalies += frame.anomaly
+    return time.perf_counter() - start, n_frames, n_anomalies
+
+
+if __name__ == "__main__":
+    sampling_rate = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    duration_s = float(sys.argv[2]) if len(sys.argv) > 2 else 60.0
+
+    t = np.arange(int(duration_s * sampling_rate)) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 12 * np.sin(2 * np.pi * 80 * t) * (t >= duration_s / 2)
+    signal += 0.3 * np.random.default_rng(0).normal(size=t.shape)
+    detector = AnomalyDetector()
+    print(f"Signal: {duration_s} s at {sampling_rate} Hz, window {window_size_s} s, "
+          f"band {detector.target_freq_min}-{detector.target_freq_max} Hz")
+
+    for overlap in (0.5, 0.9, 0.98):
+        fft_s, n_frames, fft_anomalies = run(StreamingSpectrumAnalyzer(detector, sampling_rate, window_size_s, overlap), signal)
+        band_monitor = BandMonitor(detector, sampling_rate, window_size_s, overlap)
+        band_s, _, band_anomalies = run(band_monitor, signal)
+        print(f"  overlap {overlap:4.2f} ({n_frames} hops, {len(band_monitor.freqs)} band bins): "
+              f"FFT {fft_s / n_frames * 1e6:7.1f} us/hop, sliding DFT {band_s / n_frames * 1e6:7.1f} us/hop, "
+              f"speedup x{fft_s / band_s:4.1f}, anomalies {fft_anomalies} / {band_anomalies}")
@@ -0,0 +1,47 @@
+# benchmark_lod.py
+"""
+Plotting of long vibration signals: full signal vs. min/max samples per pixel (MinMaxLine, lod.py).
+For each duration: time to build the plot and draw it (Agg, no window), the number of plotted points and the time
+of a zoom (new sample selection + draw); the LOD plot must contain the same min/max values as the full signal.
+Usage: python benchmark_lod.py [duration_s,...]
+"""
+import os
+import sys
+import time
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from lod import MinMaxLine
+from motor_simulator import simulate_motor_vibration
+
+sampling_rate = 1000
+
+
+def draw(t, signal, lod):
+    """ Build and draw the figure; returns (seconds, figure, axes, plotted line). """
+    start = time.perf_counter()
+    fig = Figure(figsize=(12, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    line = MinMaxLine(ax, t, signal).line if lod else ax.plot(t, signal)[0]
+    fig.canvas.draw()
+    return time.perf_counter() - start, fig, ax, line
+
+
+if __name__ == "__main__":
+    durations = [float(d) for d in sys.argv[1].split(',')] if len(sys.argv) > 1 else [600.0, 3600.0, 36000.0]
+    for duration_s in durations:
+        t, signal = simulate_motor_vibration(duration_s, sampling_rate, 0.65, duration_s / 2, True, as_array=True,
+                                             seed=1)
+        signal[int(0.7 * len(signal)):int(0.7 * len(signal)) + 5] += 20  # short fault burst (5 ms)
+        print(f"Signal: {duration_s:.0f} s at {sampling_rate} Hz ({len(signal)} samples)")
+        for lod in (False, True):
+            draw_s, fig, ax, line = draw(t, signal, lod)
+            start = time.perf_counter()
+            ax.set_xlim(0.65 * duration_s, 0.75 * duration_s)  # zoom to 10 % around the burst
+            fig.canvas.draw()
+            zoom_s = time.perf_counter() - start
+            y = line.get_ydata()
+            print(f"  {'lod' if lod else 'full':10s} draw {draw_s * 1000:9.1f} ms, zoom {zoom_s * 1000:8.1f} ms, "
+                  f"{len(y):9d} points, max {np.max(y):6.2f} (signal {np.max(signal):6.2f})")
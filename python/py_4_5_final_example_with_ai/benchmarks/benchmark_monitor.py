@@ -0,0 +1,41 @@
+# benchmark_monitor.py
+"""
+Headless frame rate of the blitting monitor renderer (BlitMonitor) for one and several motors
+(one figure per motor, rendered one after another), compared to a full redraw of the figure per frame.
+The result tells how many motors a dashboard can show at the frame rate of the animation (interval_ms).
+Usage: python benchmark_monitor.py [duration_s] [frames]
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from monitor import BlitMonitor
+from motor_simulator import simulate_motor_vibration
+
+sampling_rate = 1000
+interval_ms = 100  # frame interval of the animation (10 fps)
+full_redraw_frames = 20  # full redraws are slow, fewer frames are measured
+
+
+if __name__ == "__main__":
+    duration_s = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    detector = AnomalyDetector(threshold=5.0)
+    t, signal = simulate_motor_vibration(duration_s, sampling_rate, 0.65, duration_s / 2, True, as_array=True, seed=1)
+    print(f"Signal: {duration_s:.0f} s at {sampling_rate} Hz, {n_frames} frames per motor")
+
+    full = BlitMonitor(t, signal, detector, sampling_rate, interval_ms=interval_ms, headless=True)
+    full_fps = full.run_headless(full_redraw_frames, blit=False)['fps']
+    print(f"  full redraw: {full_fps:8.1f} fps")
+    for n_motors in (1, 4, 8):
+        monitors = [BlitMonitor(t, signal, detector, sampling_rate, interval_ms=interval_ms, headless=True)
+                    for _ in range(n_motors)]
+        seconds = sum(monitor.run_headless(n_frames)['seconds'] for monitor in monitors)
+        fps = n_frames / seconds  # frame rate of each motor when all are rendered
+        print(f"  blit, {n_motors} motor(s): {fps:8.1f} fps per motor, "
+              f"{n_motors * fps / (1000 / interval_ms):6.1f} motors at {1000 / interval_ms:.0f} fps "
+              f"(speedup x{fps * n_motors / full_fps:5.1f})")
+    # approx. figure memory of the spectra: one block of frames instead of all frames
+    print(f"  spectra block: {full._block_magnitudes.nbytes / 2 ** 20:.1f} MB, "
+          f"all frames: {full.n_frames * full.n_bins * np.dtype(np.float32).itemsize / 2 ** 20:.1f} MB")
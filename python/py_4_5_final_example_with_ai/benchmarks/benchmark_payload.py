@@ -0,0 +1,40 @@
+# benchmark_payload.py
+"""
+Benchmark of the payload formats for the vibration signal (payload.codec):
+serialization and parse cost and body size per 1M samples.
+Usage: python benchmark_payload.py [n_samples]
+"""
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from payload import codec
+
+repeats = 3
+
+
+def best_time(fn, *args):
+    """ Run fn several times and return the best wall-clock time (s) and the last result. """
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    t = np.arange(n_samples) / 1000
+    signal = np.sin(2 * np.pi * 25 * t) + 0.3 * np.random.default_rng(0).normal(size=n_samples)
+    per_million = 1_000_000 / n_samples
+
+    print(f"{n_samples} samples, values per 1M samples")
+    print(f"  {'format':28s} {'encode ms':>10s} {'decode ms':>10s} {'size MB':>9s} {'max abs err':>12s}")
+    for content_type in codec.supported_content_types():
+        encode_s, body = best_time(codec.encode, signal, content_type)
+        decode_s, decoded = best_time(codec.decode, body, content_type)
+        print(f"  {content_type:28s} {encode_s * 1000 * per_million:10.1f} {decode_s * 1000 * per_million:10.1f} "
+              f"{len(body) / 1e6 * per_million:9.2f} {np.max(np.abs(decoded - signal)):12.2e}")
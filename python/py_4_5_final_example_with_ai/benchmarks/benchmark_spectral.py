@@ -0,0 +1,91 @@
+# benchmark_spectral.py
+"""
+Benchmark of the two autoencoder modes: per-sample (Autoencoder, one row per sample) vs.
+spectral (SpectralAutoencoder, one row per window hop):
+- inference rows/s and signal samples/s
+- detection quality (precision/recall/F1) on a simulated signal with a fault after fault_time_s
+Both models are trained on the clean signal (/simulate?inject_fault=false&noise=0) as in test_services.py.
+Usage: python benchmark_spectral.py [noise_level]
+"""
+import os
+import sys
+import time
+import numpy as np
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+os.environ.setdefault('MODEL_PATH', os.path.join(os.path.dirname(__file__), '..', 'models'))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.spectral_autoencoder import SpectralAutoencoder
+from motor_simulator import simulate_motor_vibration
+
+sampling_rate = 1000
+fault_time_s = 2.5
+k = 3.0  # dynamic threshold of detect_microservice.detect (mean + k * std)
+
+
+def scores(predicted, truth):
+    """ Precision, recall and F1 of boolean predictions. """
+    tp = np.sum(predicted & truth)
+    precision = tp / max(1, np.sum(predicted))
+    recall = tp / max(1, np.sum(truth))
+    return precision, recall, 2 * precision * recall / max(1e-12, precision + recall)
+
+
+def rows_per_second(fn, rows, repeats=5):
+    """ Best throughput of fn(rows) in rows per second. """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+if __name__ == "__main__":
+    noise_level = float(sys.argv[1]) if len(sys.argv) > 1 else 0.37
+    torch.manual_seed(0)
+    _, train_signal = simulate_motor_vibration(5.0, sampling_rate, 0, fault_time_s, False, as_array=True)
+    _, test_signal = simulate_motor_vibration(5.0, sampling_rate, noise_level, fault_time_s, True, as_array=True, seed=1)
+    _, long_signal = simulate_motor_vibration(60.0, sampling_rate, noise_level, fault_time_s, True, as_array=True, seed=2)
+
+    sample_model = Autoencoder()
+    sample_model.train_fast(train_signal.reshape(-1, 1).astype(np.float32))
+    spectral_model = SpectralAutoencoder()
+    spectral_model.train(train_signal)
+
+    # inference throughput (60 s signal)
+    def sample_inference(rows):
+        with torch.inference_mode():
+            return sample_model(torch.from_numpy(rows))
+
+    sample_rows = long_signal.reshape(-1, 1).astype(np.float32)
+    sample_rate = rows_per_second(sample_inference, sample_rows)
+    spectral_rows = spectral_model.features(long_signal)
+    spectral_rate = rows_per_second(spectral_model.reconstruction_errors, spectral_rows)
+    feature_s = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        spectral_model.features(long_signal)
+        feature_s = min(feature_s, time.perf_counter() - start)
+    print(f"Inference on {len(long_signal)} samples ({len(long_signal) / sampling_rate:.0f} s):")
+    print(f"  per-sample: {len(sample_rows):7d} rows, {sample_rate:12.0f} rows/s, {sample_rate:12.0f} samples/s")
+    print(f"  spectral:   {len(spectral_rows):7d} rows, {spectral_rate:12.0f} rows/s, "
+          f"{spectral_rate * len(long_signal) / len(spectral_rows):12.0f} samples/s (+ {feature_s * 1000:.1f} ms FFT features)")
+
+    # detection quality (5 s signal, fault after fault_time_s)
+    x = torch.from_numpy(test_signal.reshape(-1, 1).astype(np.float32))
+    with torch.inference_mode():
+        losses = ((sample_model(x) - x) ** 2).mean(dim=1).numpy()
+    sample_predicted = losses > losses.mean() + k * losses.std()
+    sample_truth = np.arange(len(test_signal)) / sampling_rate >= fault_time_s
+
+    features = spectral_model.features(test_signal)
+    errors = spectral_model.reconstruction_errors(features).numpy()
+    spectral_predicted = errors > SpectralAutoencoder.error_threshold
+    centers = np.arange(len(features)) * SpectralAutoencoder.step + SpectralAutoencoder.window_size // 2
+    spectral_truth = centers / sampling_rate >= fault_time_s
+
+    print(f"Detection quality (noise {noise_level}, fault after {fault_time_s} s):")
+    print("  per-sample (samples): precision %.2f recall %.2f F1 %.2f" % scores(sample_predicted, sample_truth))
+    print("  spectral (windows):   precision %.2f recall %.2f F1 %.2f" % scores(spectral_predicted, spectral_truth))
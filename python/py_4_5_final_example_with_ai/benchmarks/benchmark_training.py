@@ -0,0 +1,49 @@
+# benchmark_training.py
+"""
+Benchmark of the autoencoder training modes: standard (DataLoader, batch size 32, 20 epochs)
+vs. fast (large mini-batches from the tensor, early stopping, optionally torch.compile).
+The training signal is the one train_microservice receives from the simulate service (/simulate?inject_fault=false&noise=0).
+Usage: python benchmark_training.py [--compile]
+"""
+import os
+import sys
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+os.environ.setdefault('MODEL_PATH', os.path.join(os.path.dirname(__file__), '..', 'models'))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from motor_simulator import simulate_motor_vibration
+
+
+def reconstruction_mse(model, vibration_data):
+    """ MSE of the reconstruction over the whole signal. """
+    x = torch.from_numpy(vibration_data)
+    with torch.inference_mode():
+        return nn.functional.mse_loss(model(x), x).item()
+
+
+def run(train_fn, vibration_data):
+    """ Train a new autoencoder with train_fn and return (seconds, reconstruction MSE). """
+    torch.manual_seed(0)
+    model = Autoencoder()
+    start = time.perf_counter()
+    train_fn(model, vibration_data)
+    return time.perf_counter() - start, reconstruction_mse(model, vibration_data)
+
+
+if __name__ == "__main__":
+    _, signal = simulate_motor_vibration(5.0, 1000, 0, 2.5, False, as_array=True)
+    vibration_data = signal.reshape(-1, 1).astype(np.float32)
+    print(f"Training signal: {len(vibration_data)} samples, torch threads: {torch.get_num_threads()}")
+
+    modes = [("standard", lambda m, x: m.train(x)), ("fast", lambda m, x: m.train_fast(x))]
+    if "--compile" in sys.argv:
+        modes.append(("fast + torch.compile", lambda m, x: m.train_fast(x, compile_model=True)))
+    standard_s = None
+    for name, train_fn in modes:
+        seconds, mse = run(train_fn, vibration_data)
+        standard_s = standard_s or seconds
+        print(f"  {name:22s} {seconds:7.2f} s  speedup x{standard_s / seconds:5.1f}  reconstruction MSE {mse:.2e}")
@@ -0,0 +1,255 @@
+# load_test.py
+"""
+Load test of the simulate, train and detect microservices.
+The services are started as local subprocesses (free ports, temporary MODEL_PATH) or an already running deployment
+is used (--external, e.g. docker compose on the default ports). Each endpoint is driven with the configured
+concurrency levels, payload sizes and payload formats (see payload/codec.py); the report contains throughput and
+p50/p95/p99 latency per endpoint, format, payload size and concurrency and is saved as JSON for comparisons
+between releases (--compare previous.json).
+Every training publishes a new model version that the detect service loads, so with --external the deployed model
+is used (it must exist) and the train scenario is skipped, unless --allow-train is given.
+Usage: python load_test.py [--endpoints simulate,detect,detect-spectral,train] [--formats json,raw]
+                           [--samples 5000,50000] [--concurrency 1,4,16] [--requests 50] [--train-requests 3]
+                           [--external [--allow-train]] [--output results.json] [--compare previous.json]
+                           [--max-regression 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'motor_simulation-service'))
+from motor_simulator import simulate_motor_vibration
+from payload import codec
+
+services = {  # name -> (working directory, script, default port)
+    'simulate': ('motor_simulation-service', 'simulate_microservice.py', 5003),
+    'train': ('train_service', 'train_microservice.py', 5001),
+    'detect': ('detect_service', 'detect_microservice.py', 5002),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_service(name, model_dir, log_dir):
+    """
+    Start a service as subprocess on a free port.
+    :return: (process, base url)
+    """
+    directory, script, _ = services[name]
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), MODEL_PATH=model_dir, MODEL_CHECK_INTERVAL_S='0.5',
+               PYTHONPATH=os.pathsep.join([root, os.environ.get('PYTHONPATH', '')]))
+    log = open(os.path.join(log_dir, f"{name}.log"), 'w')
+    process = subprocess.Popen([sys.executable, script], cwd=os.path.join(root, directory), env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_until(check, timeout_s=120, what="service"):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{what} not ready after {timeout_s} s")
+
+
+def port_open(url):
+    host, port = url.rsplit('//', 1)[1].split(':')
+    with socket.socket() as s:
+        return s.connect_ex((host, int(port))) == 0
+
+
+def percentiles(latencies_s):
+    p50, p95, p99 = np.percentile(np.asarray(latencies_s) * 1000, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "mean_ms": float(np.mean(latencies_s) * 1000)}
+
+
+def run_scenario(request_fn, concurrency, n_requests):
+    """
+    Send n_requests with concurrency parallel clients (one HTTP session per client thread).
+    :param request_fn: function(session) -> response
+    :return: dict with throughput, latency percentiles and errors
+    """
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = request_fn(local.session).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(one, range(n_requests)))
+        wall_s = time.perf_counter() - start
+    latencies = [latency for latency, ok in results if ok]
+    stats = {"requests": n_requests, "errors": n_requests - len(latencies), "throughput_rps": n_requests / wall_s}
+    stats.update(percentiles(latencies) if latencies else {})
+    return stats
+
+
+def scenarios(endpoint, urls, payload_format, signal):
+    """ Request function of an endpoint for a payload format and signal (the body is encoded once). """
+    content_type = codec.FORMATS[payload_format]
+    body = codec.encode(signal, content_type)
+    headers = {'Content-Type': content_type}
+    if endpoint == 'simulate':
+        query = f"/simulate?duration={len(signal) / 1000}&noise=0.37&format={payload_format}"
+        return lambda session: session.get(urls['simulate'] + query)
+    if endpoint == 'detect':
+        return lambda session: session.post(urls['detect'] + "/detect", data=body, headers=headers)
+    if endpoint == 'detect-spectral':
+        return lambda session: session.post(urls['detect'] + "/detect?model=spectral", data=body, headers=headers)
+    if endpoint == 'train':
+        return lambda session: session.post(urls['train'] + "/train?training=fast", data=body, headers=headers)
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def compare(results, previous_path, max_regression):
+    """ Print the p95 change per scenario compared to a previous run; returns the number of regressions. """
+    with open(previous_path) as f:
+        previous = {key(r): r for r in json.load(f)['results']}
+    regressions = 0
+    print(f"Comparison with {previous_path} (p95):")
+    for result in results:
+        old = previous.get(key(result))
+        if old is None or 'p95_ms' not in old or 'p95_ms' not in result:
+            continue
+        change = result['p95_ms'] / old['p95_ms'] - 1
+        regressed = change > max_regression
+        regressions += regressed
+        print(f"  {label(result):50s} {old['p95_ms']:9.1f} -> {result['p95_ms']:9.1f} ms {change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def key(result):
+    return result['endpoint'], result['format'], result['samples'], result['concurrency']
+
+
+def label(result):
+    return f"{result['endpoint']} {result['format']} {result['samples']} samples c={result['concurrency']}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the motor microservices")
+    parser.add_argument('--endpoints', default='simulate,detect')
+    parser.add_argument('--formats', default='json,raw')
+    parser.add_argument('--samples', default='5000,50000', help="payload sizes in samples (1000 samples = 1 s)")
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--requests', type=int, default=50, help="requests per scenario")
+    parser.add_argument('--train-requests', type=int, default=3, help="requests per train scenario")
+    parser.add_argument('--external', action='store_true', help="use running services on the default ports")
+    parser.add_argument('--allow-train', action='store_true',
+                        help="with --external: train (publishes new model versions of the deployment)")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'results',
+                                                         f"load_test_{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    parser.add_argument('--compare', help="previous result file")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="max. relative p95 increase")
+    args = parser.parse_args()
+    endpoints = args.endpoints.split(',')
+    train = not args.external or args.allow_train
+    if not train and 'train' in endpoints:
+        print("Skipping the train scenario: it would replace the deployed model (use --allow-train)")
+        endpoints.remove('train')
+    sizes = [int(size) for size in args.samples.split(',')]
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    processes = []
+    try:
+        # Step 1: start services (detect needs a trained model, so it is started after the first training)
+        if args.external:
+            urls = {name: f"http://localhost:{port}" for name, (_, _, port) in services.items()}
+        else:
+            work_dir = tempfile.mkdtemp(prefix='load-test-')
+            model_dir = os.path.join(work_dir, 'models')
+            urls = {}
+            for name in ('simulate', 'train'):
+                process, urls[name] = start_service(name, model_dir, work_dir)
+                processes.append(process)
+            for name in ('simulate', 'train'):
+                wait_until(lambda: port_open(urls[name]), what=name)
+            print(f"Services started (logs and models in {work_dir})")
+        models = ['sample'] + (['spectral'] if 'detect-spectral' in endpoints else [])
+        if train:
+            _, train_signal = simulate_motor_vibration(5.0, 1000, 0, 2.5, False, as_array=True)
+            train_body = {"vibration": train_signal.tolist()}
+            requests.post(urls['train'] + "/train?training=fast", json=train_body).raise_for_status()
+            if 'spectral' in models:
+                requests.post(urls['train'] + "/train?model=spectral", json=train_body).raise_for_status()
+        else:  # use the deployed models
+            for model in models:
+                response = requests.get(urls['train'] + f"/models?model={model}")
+                response.raise_for_status()
+                if response.json()['latest'] is None:
+                    sys.exit(f"No {model} model deployed: train it first or use --allow-train")
+        if not args.external:
+            process, urls['detect'] = start_service('detect', model_dir, work_dir)
+            processes.append(process)
+            wait_until(lambda: port_open(urls['detect']), what='detect')
+
+        # Step 2: run the scenarios
+        results = []
+        print(f"  {'scenario':50s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>6s}")
+        for endpoint in endpoints:
+            n_requests = args.train_requests if endpoint == 'train' else args.requests
+            for payload_format in args.formats.split(','):
+                for samples in sizes:
+                    _, signal = simulate_motor_vibration(samples / 1000, 1000, 0.37, samples / 2000, True,
+                                                         as_array=True, seed=1)
+                    request_fn = scenarios(endpoint, urls, payload_format, signal)
+                    run_scenario(request_fn, 1, 1)  # warm-up (model loading, connection)
+                    for concurrency in levels:
+                        result = {"endpoint": endpoint, "format": payload_format, "samples": samples,
+                                  "concurrency": concurrency}
+                        result.update(run_scenario(request_fn, concurrency, n_requests))
+                        results.append(result)
+                        print(f"  {label(result):50s} {result['throughput_rps']:8.1f} {result.get('p50_ms', 0):8.1f} "
+                              f"{result.get('p95_ms', 0):8.1f} {result.get('p99_ms', 0):8.1f} {result['errors']:6d}")
+
+        # Step 3: save (and compare) the results
+        report = {"meta": {"time": time.strftime('%Y-%m-%dT%H:%M:%S'), "commit": git_commit(),
+                           "python": platform.python_version(), "platform": platform.platform(),
+                           "cpus": os.cpu_count(), "external": args.external, "args": vars(args)},
+                  "results": results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+        if args.compare and compare(results, args.compare, args.max_regression):
+            sys.exit(1)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
@@ -16,17 +16,77 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 # shared_path = os.environ.get('SHARED_PATH', '../autoencoder')
 # sys.path.append(shared_path)
 from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.spectral_autoencoder import SpectralAutoencoder, spectral_features
+from autoencoder.serving import ModelWatcher, MicroBatcher
+from autoencoder.export import SUFFIXES, export_version, load_inference_model
+from autoencoder.baseline import baseline_version, load_baseline
 from flask import Flask, request, jsonify
+from werkzeug.exceptions import UnsupportedMediaType
+from payload.codec import read_vibration
 import numpy as np
 # from tensorflow.python.keras.models import load_model   # tensorflow version
 
 app = Flask(__name__)
-autoencoder = Autoencoder()
-model = None
 
 # Parameters
 # RECONSTRUCTION_ERROR_THRESHOLD = 0.01  # tensorflow version ToDo tune this threshold
 k = 3.0 # multiplier for the standard deviation (σ = std) used for dynamic threshold
+model_check_interval_s = float(os.environ.get('MODEL_CHECK_INTERVAL_S', 2.0))  # how often to look for a new model file
+batch_max_rows = int(os.environ.get('BATCH_MAX_ROWS', 262144))  # max. samples of concurrent requests in one forward pass
+batch_max_wait_ms = float(os.environ.get('BATCH_MAX_WAIT_MS', 2.0))  # max. time to wait for concurrent requests
+inference_backend = os.environ.get('INFERENCE_BACKEND', 'eager')  # eager, torchscript(-int8), onnx(-int8)
+# request: mean + k * std of the request's losses; baseline: threshold from the loss baseline stored with the model
+# (only if the baseline was built at the operating noise level: the training data of the n8n workflow has no noise,
+# feed normal data to POST /models/baseline of the train service first)
+threshold_mode = os.environ.get('THRESHOLD_MODE', 'request')
+threshold_quantile = float(os.environ.get('THRESHOLD_QUANTILE', 0)) or None  # e.g. 0.999 instead of mean + k * std
+if os.environ.get('TORCH_NUM_THREADS'):
+    torch.set_num_threads(int(os.environ['TORCH_NUM_THREADS']))  # intra-op threads
+
+
+def load_autoencoder():
+    """ Load the latest model version for the inference backend (see autoencoder/export.py). """
+    return load_inference_model(Autoencoder, inference_backend)
+
+
+def load_spectral_autoencoder():
+    """ Create a spectral autoencoder and load the latest model version. """
+    model = SpectralAutoencoder()
+    model.load_model()
+    return model
+
+
+def load_loss_baseline():
+    """ Loss baseline of the latest model version (None for models without baseline). """
+    return load_baseline(Autoencoder.registry())
+
+
+def reconstruction_losses(vibration_data):
+    """
+    Reconstruction loss for each row (sample) of vibration_data (2D array [samples, 1]). Runs in the batcher thread
+    and only reads the current model (loaded by the request, swapped by the watcher thread of model_watcher).
+    """
+    vibration_tensor = torch.from_numpy(vibration_data)
+    with torch.inference_mode():
+        reconstructed = model_watcher.model(vibration_tensor)
+        return ((reconstructed - vibration_tensor) ** 2).mean(dim=1)
+
+
+# the model is swapped in automatically when train_service publishes a new model version or the latest version
+# is switched in the model registry, e.g. rollback (hot reload)
+model_watcher = ModelWatcher(load_autoencoder, check_interval_s=model_check_interval_s,
+                             version_fn=lambda: Autoencoder.registry().latest_version())
+# baseline statistics are reloaded when the model version changes or the baseline is updated
+baseline_watcher = ModelWatcher(load_loss_baseline, check_interval_s=model_check_interval_s,
+                                version_fn=lambda: baseline_version(Autoencoder.registry()))
+# concurrent requests are combined into one forward pass
+batcher = MicroBatcher(reconstruction_losses, max_batch_rows=batch_max_rows, max_wait_ms=batch_max_wait_ms)
+# spectral model (one row per window hop), loaded on first use
+spectral_model_watcher = ModelWatcher(load_spectral_autoencoder, check_interval_s=model_check_interval_s,
+                                      version_fn=lambda: SpectralAutoencoder.registry().latest_version())
+spectral_batcher = MicroBatcher(lambda features: spectral_model_watcher.model.reconstruction_errors(features),
+                                max_batch_rows=max(1, batch_max_rows // SpectralAutoencoder.step),
+                                max_wait_ms=batch_max_wait_ms)
 
 
 def detect(data):
@@ -34,34 +94,67 @@ def detect(data):
     # vibration_data = np.array(data['vibration'])  # tensorflow version
     # vibration_data = vibration_data.reshape(-1, 1)  # tensorflow version
     vibration_data = np.array(data['vibration']).reshape(-1, 1).astype(np.float32)  # Each sample 1D
-    vibration_tensor = torch.from_numpy(vibration_data)
 
-    # Step 2: Predict reconstructed signal
+    # Step 2: Predict reconstructed signal and calculate reconstruction error (batched with concurrent requests)
     # reconstructed = model.predict(vibration_data, verbose=0) # Tensorflow version
-    with torch.no_grad():  # Calculate losses for all samples
-        reconstructed = autoencoder(vibration_tensor)
-        losses = ((reconstructed - vibration_tensor) ** 2).mean(dim=1)
-
-        # Step 3: Calculate reconstruction error
-        # errors = np.mean(np.square(vibration_data - reconstructed), axis=1)  # Tensorflow version
-
-        # Step 4: Detect anomalies
-        # anomalies = np.where(errors > RECONSTRUCTION_ERROR_THRESHOLD)[0]  # Tensorflow version
-        # anomalies = (loss > 0.01).nonzero(as_tuple=True)[0]  # hard-coded threshold for anomalies
-        # Calculate dynamic threshold
-        mean_loss = losses.mean()
-        std_loss = losses.std()
-        threshold = mean_loss + k * std_loss
-        anomalies = (losses > threshold).nonzero(as_tuple=True)[0]  # Use dynamic threshold
-        return anomalies, losses, threshold, vibration_data
+    # errors = np.mean(np.square(vibration_data - reconstructed), axis=1)  # Tensorflow version
+    model_watcher.get()  # first load in the request thread, the batcher thread must not wait for a load
+    baseline = baseline_watcher.get() if threshold_mode == 'baseline' else None
+    if baseline is not None and len(vibration_data):
+        # stable threshold from the baseline: each chunk is decided as soon as its losses are computed
+        threshold = baseline.threshold(k, threshold_quantile)
+        losses, anomalies = [], []
+        for start in range(0, len(vibration_data), batch_max_rows):
+            chunk_losses = batcher.submit(vibration_data[start:start + batch_max_rows])
+            anomalies.append((chunk_losses > threshold).nonzero(as_tuple=True)[0] + start)
+            losses.append(chunk_losses)
+        return torch.cat(anomalies), torch.cat(losses), threshold, vibration_data
+    losses = batcher.submit(vibration_data)
+
+    # Step 3: Detect anomalies
+    # anomalies = np.where(errors > RECONSTRUCTION_ERROR_THRESHOLD)[0]  # Tensorflow version
+    # anomalies = (loss > 0.01).nonzero(as_tuple=True)[0]  # hard-coded threshold for anomalies
+    # Calculate dynamic threshold
+    mean_loss = losses.mean()
+    std_loss = losses.std()
+    threshold = mean_loss + k * std_loss
+    anomalies = (losses > threshold).nonzero(as_tuple=True)[0]  # Use dynamic threshold
+    return anomalies, losses, threshold, vibration_data
+
+
+def detect_spectral(data):
+    """
+    Detect anomalous windows with the spectral autoencoder (one inference per window hop).
+    A window is anomalous if a spectral component of more than SpectralAutoencoder.error_threshold
+    (FFT magnitude) cannot be reconstructed.
+    :return: anomalous window indices, error per window, threshold, features [window, bin]
+    """
+    features = spectral_features(data['vibration'], SpectralAutoencoder.window_size, SpectralAutoencoder.step)
+    spectral_model_watcher.get()  # first load in the request thread (see detect)
+    errors = spectral_batcher.submit(features)
+    threshold = SpectralAutoencoder.error_threshold
+    anomalies = (errors > threshold).nonzero(as_tuple=True)[0]
+    return anomalies, errors, threshold, features
 
 # Flask endpoint
 @app.route('/detect', methods=['POST'])
 def detect_endpoint():
-    global autoencoder, k
+    global k
     try:
-        # receive vibration data
-        data = request.get_json()
+        # receive vibration data (JSON or binary, see payload.codec)
+        data = {'vibration': read_vibration(request)}
+        if request.args.get('model', 'sample') == 'spectral':
+            anomalies, errors, threshold, features = detect_spectral(data)
+            starts = anomalies.numpy() * SpectralAutoencoder.step
+            return jsonify({
+                "status": "Detection completed",
+                "anomalies": anomalies.tolist(),  # window indices
+                "anomalous_windows": [[int(start), int(start) + SpectralAutoencoder.window_size] for start in starts],
+                "total_windows": len(features),
+                "total_samples": len(data['vibration']),
+                "model_version": spectral_model_watcher.version
+            })
+
         # get detection data
         anomalies, losses, threshold, vibration_data = detect(data)
         anomaly_list = anomalies.tolist()
@@ -69,25 +162,49 @@ def detect_endpoint():
         return jsonify({
             "status": "Detection completed",
             "anomalies": anomaly_list,
-            "total_samples": len(vibration_data)
+            "total_samples": len(vibration_data),
+            "threshold": float(threshold),
+            "model_version": model_watcher.version
         })
+    except UnsupportedMediaType as e:
+        return jsonify({"status": "Error", "message": e.description}), 415
     except Exception as e:
         return jsonify({"status": "Error", "message": str(e)}), 500
 
 
-# Start server
-if __name__ == "__main__":
+def preload_models():
+    """
+    Wait until a model has been published and load it with its loss baseline. With gunicorn (gunicorn.conf.py)
+    this runs in the master process before forking, so all workers share the loaded weights.
+    onnxruntime sessions cannot be shared with forked processes: for the onnx backends only the export is
+    created here and each worker opens its own session on first use; a missing exporter (onnx, onnxscript)
+    raises a RuntimeError instead of retrying.
+    """
     logger.info("1. loading model ...")
-    loaded = False
-    while not loaded:
+    while True:
         try:
-            autoencoder.load_model()
-            loaded = True
+            if inference_backend.startswith('onnx'):
+                registry = Autoencoder.registry()
+                version = registry.latest_version()
+                if version is None:
+                    raise FileNotFoundError(f"No model published in {registry.directory}")
+                if not os.path.exists(registry.artifact_path(version, SUFFIXES[inference_backend])):
+                    export_version(Autoencoder, inference_backend, version)
+            else:
+                model_watcher.reload()
+            baseline_watcher.reload()
             break
+        except ImportError as e:  # waiting does not help: the exporter is not installed
+            raise RuntimeError(f"Cannot export the model for INFERENCE_BACKEND={inference_backend}: {e}. Install onnx and "
+                               f"onnxscript or add the backend to EXPORT_BACKENDS of the train service") from e
         except Exception as e:
             sleep(3)
-            logger.error("model file not found")
-            pass
+            logger.error(f"model file not found: {e}")
     logger.info("loading done")
+
+
+# Start server (development server; production: gunicorn -c gunicorn.conf.py detect_microservice:app)
+if __name__ == "__main__":
+    preload_models()
     logger.info("2. starting web services")
-    app.run(host="0.0.0.0", port=5002)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5002)), threaded=True)
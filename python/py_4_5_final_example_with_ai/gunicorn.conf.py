@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+"""
+Production serving of the microservices with gunicorn (instead of the Flask development server app.run):
+    gunicorn -c gunicorn.conf.py detect_microservice:app
+- WEB_WORKERS worker processes (default: number of CPUs) with WEB_THREADS threads each (gthread workers)
+- the app is imported in the master before forking (preload_app); a module function preload_models() is called
+  there as well, so the detect service loads the autoencoder once and the workers share its weights copy-on-write
+  (gc.freeze keeps the garbage collector from touching, and thereby copying, the shared objects)
+- each worker gets its share of the CPUs for the torch intra-op threads (unless TORCH_NUM_THREADS is set)
+  and a fresh numpy random state (the forked workers would generate the same simulated noise otherwise)
+- graceful reload: kill -HUP <master pid> reloads this configuration and the preloaded model, starts new workers
+  and stops the old ones after their running requests (new model versions are picked up by the workers without
+  reload, see autoencoder/serving.py ModelWatcher)
+The train service keeps its training jobs in the worker process, so it must run with WEB_WORKERS=1.
+"""
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_WORKERS', 0)) or os.cpu_count() or 1
+threads = int(os.environ.get('WEB_THREADS', 4))  # concurrent requests per worker (combined by the MicroBatcher)
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))  # s without heartbeat before a blocked worker is restarted
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))  # time for running requests on reload/stop
+preload_app = True
+accesslog = os.environ.get('WEB_ACCESS_LOG')  # e.g. - for stdout (default: no access log)
+
+
+def _preload(server):
+    """ Call preload_models() of the app module (if it has one) in the master process. """
+    module = sys.modules.get(server.app.app_uri.split(':')[0])
+    preload_models = getattr(module, 'preload_models', None)
+    if preload_models is not None:
+        preload_models()
+    gc.freeze()  # objects allocated so far are shared with the workers and ignored by their garbage collector
+
+
+def on_starting(server):
+    _preload(server)
+
+
+def on_reload(server):
+    gc.unfreeze()
+    _preload(server)
+
+
+def post_fork(server, worker):
+    if 'numpy' in sys.modules:
+        sys.modules['numpy'].random.seed()
+    if 'torch' in sys.modules and not os.environ.get('TORCH_NUM_THREADS'):
+        sys.modules['torch'].set_num_threads(max(1, (os.cpu_count() or 1) // server.cfg.workers))
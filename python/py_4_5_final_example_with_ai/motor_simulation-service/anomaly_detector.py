@@ -1,6 +1,110 @@
+from collections import namedtuple
+from functools import lru_cache
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import firwin, kaiserord, resample_poly
 from torch.fft import fftfreq
 
+
+@lru_cache(maxsize=16)
+def hanning_window(window_size, dtype=np.float64):
+    """
+    Return a cached (read-only) Hanning window of the given size and dtype.
+    The window is built once per (size, dtype) and shared by all FFT calls.
+    """
+    window = np.hanning(window_size).astype(dtype)
+    window.flags.writeable = False
+    return window
+
+def decimation_factor(sampling_rate, max_freq, window_size=None, step=None, transition=0.1):
+    """
+    Largest decimation factor that keeps all frequencies up to max_freq: the decimated sampling rate must be
+    above 2 * max_freq * (1 + transition), the margin is the transition band of the anti-alias filter.
+    With window_size and step (samples) the factor also divides both, so the FFT windows of the decimated
+    signal cover exactly the same samples (same frames and times, window_size / factor samples per window).
+    """
+    limit = max(1, int(sampling_rate / (2 * max_freq * (1 + transition))))
+    for factor in range(limit, 1, -1):
+        if (window_size is None or window_size % factor == 0) and (step is None or step % factor == 0):
+            return factor
+    return 1
+
+
+@lru_cache(maxsize=16)
+def anti_alias_filter(sampling_rate, factor, max_freq, attenuation_db=60):
+    """
+    Cached (read-only) linear-phase low-pass FIR filter (Kaiser window) for decimation by factor.
+    Pass band up to max_freq; only frequencies that alias into 0..max_freq (above sampling_rate / factor - max_freq)
+    must be suppressed, so the transition band is max_freq..sampling_rate / factor - max_freq.
+    """
+    decimated_rate = sampling_rate / factor
+    width = decimated_rate - 2 * max_freq
+    if width <= 0:
+        raise ValueError(f"Decimation by {factor} aliases frequencies below {max_freq} Hz")
+    numtaps, beta = kaiserord(attenuation_db, width / (0.5 * sampling_rate))
+    numtaps |= 1  # odd: the filter delay is a whole number of samples (output aligned to t[::factor])
+    taps = firwin(numtaps, 0.5 * decimated_rate, window=('kaiser', beta), fs=sampling_rate)
+    taps.flags.writeable = False
+    return taps
+
+# Row of the multichannel anomaly table: channel (motor) index, anomaly frequency (Hz) and peak magnitude
+anomaly_table_dtype = np.dtype([('motor', np.int32), ('frequency', np.float64), ('magnitude', np.float64)])
+# Row of the per-frame anomaly table: time frame index, anomaly frequency (Hz) and peak magnitude
+frame_anomaly_table_dtype = np.dtype([('frame', np.int32), ('frequency', np.float64), ('magnitude', np.float64)])
+# One fault family: fundamental frequency (Hz), frequencies of its harmonics found in the spectrum (Hz),
+# peak magnitude of the family and harmonic-sum score of the fundamental
+FaultFamily = namedtuple('FaultFamily', ['fundamental', 'harmonics', 'magnitude', 'score'])
+
+
+def _group_peaks(keys, peak_freqs, peak_magnitudes, group_distance):
+    """
+    Group runs of nearby peak frequencies (ascending within each key, e.g. channel or frame).
+    A new group starts where the key changes or the gap to the previous frequency exceeds group_distance.
+    Returns key, mean frequency (rounded to 0.1 Hz) and max magnitude of each group.
+    """
+    if len(peak_freqs) == 0:
+        return np.asarray(keys)[:0], np.empty(0), np.empty(0)
+    new_group = np.ones(len(peak_freqs), dtype=bool)
+    new_group[1:] = (np.diff(keys) != 0) | (np.diff(peak_freqs) > group_distance)
+    starts = np.flatnonzero(new_group)
+    counts = np.diff(np.append(starts, len(peak_freqs)))
+    mean_freqs = np.round(np.add.reduceat(peak_freqs, starts) / counts, 1)
+    return keys[starts], mean_freqs, np.maximum.reduceat(peak_magnitudes, starts)
+
+
+def _spectral_peaks(freqs, spectrum, min_magnitude):
+    """
+    Local maxima of a spectrum above min_magnitude (DC excluded) with the frequency refined by parabolic
+    interpolation of the log magnitudes of the peak bin and its neighbours (accurate for the Hanning window,
+    sub-bin accuracy, e.g. 89 Hz vs. 90 Hz with 2 Hz bins).
+    Returns peak frequencies (ascending) and magnitudes.
+    """
+    left, center, right = spectrum[:-2], spectrum[1:-1], spectrum[2:]
+    bins = np.flatnonzero((center > left) & (center >= right) & (center > min_magnitude)) + 1
+    a, b, c = (np.log(np.maximum(spectrum[i], np.finfo(np.float64).tiny)) for i in (bins - 1, bins, bins + 1))
+    curvature = a - 2 * b + c
+    offset = np.divide(0.5 * (a - c), curvature, out=np.zeros(len(bins)), where=curvature != 0)
+    return freqs[bins] + offset * (freqs[1] - freqs[0]), spectrum[bins]
+
+
+def _harmonic_members(peak_freqs, fundamental, n_harmonics, harmonic_tolerance):
+    """ Boolean mask of the peaks that are harmonic 1..n_harmonics of the fundamental (within tolerance Hz). """
+    order = np.round(peak_freqs / fundamental)
+    return (order >= 1) & (order <= n_harmonics) & (np.abs(peak_freqs - order * fundamental) <= harmonic_tolerance)
+
+
+def _far_from(freqs, normal_freqs, tolerance):
+    """ Boolean mask of the frequencies that are more than tolerance Hz away from every normal frequency. """
+    normal_freqs = np.sort(np.asarray(normal_freqs, dtype=float))
+    if len(normal_freqs) == 0:
+        return np.ones(len(freqs), dtype=bool)
+    idx = np.searchsorted(normal_freqs, freqs)
+    lower = normal_freqs[np.clip(idx - 1, 0, len(normal_freqs) - 1)]
+    upper = normal_freqs[np.clip(idx, 0, len(normal_freqs) - 1)]
+    return (np.abs(freqs - lower) > tolerance) & (np.abs(freqs - upper) > tolerance)
+
+
 class AnomalyDetector:
     """ Class to detect anomalies in motor vibrations using FFT analysis."""
 
@@ -82,6 +186,95 @@ class AnomalyDetector:
         return np.array(times), freqs, np.array(magnitudes)
 
 
+    def decimate(self, t, signal, sampling_rate, max_freq, window_size=None, step=None):
+        """
+        Anti-alias decimation (polyphase FIR, scipy.signal.resample_poly) to the lowest sampling rate that keeps
+        all frequencies up to max_freq (see decimation_factor).
+
+        Parameters:
+        - t: time array
+        - signal: 1D signal or 2D array [channel][sample]
+        - sampling_rate: samples per second
+        - max_freq: highest frequency of interest (Hz), e.g. the highest normal/fault frequency
+        - window_size, step: FFT window size and step (samples) that the factor must divide (optional)
+
+        Returns:
+        - t, signal: decimated arrays (every factor-th time of t)
+        - sampling_rate: decimated sampling rate
+        - factor: decimation factor (1: t and signal are returned unchanged)
+        """
+        factor = decimation_factor(sampling_rate, max_freq, window_size, step)
+        if factor == 1:
+            return t, signal, sampling_rate, 1
+        taps = anti_alias_filter(sampling_rate, factor, max_freq)
+        decimated = resample_poly(signal, 1, factor, axis=-1, window=taps)
+        return np.asarray(t)[::factor], decimated, sampling_rate / factor, factor
+
+
+    def do_fft_batched(self, t, signal, window_size_s=1.0, sampling_rate=1000, overlap=0.5, magnitude_threshold=None,
+                       dtype=np.float64, frames_per_batch=4096, max_freq=None, step=None):
+        """
+        Vectorized version of do_fft (same parameters and return values).
+        All windows are taken as strided views of the signal (no copies), the Hanning window is cached
+        and one rfft is run over the whole frame matrix (in batches of frames_per_batch frames to bound
+        the temporary memory for very long recordings).
+        The signal can also be a 2D array [channel][sample] (e.g. one row per motor, all sampled with
+        the same time array t): all channels are transformed in the same batched pass.
+        Additional parameters:
+        - dtype: np.float64 (default) or np.float32 for the computation and the returned magnitudes
+        - frames_per_batch: max. number of frames (all channels) transformed by one rfft call
+        - max_freq: highest frequency of interest (Hz); if set, the signal is decimated first (see decimate), so
+          window size, FFT work and memory shrink by the decimation factor with the same frames, times and
+          frequency resolution (bins up to the decimated Nyquist frequency only)
+        - step: samples between two windows (instead of overlap, e.g. for a moving window of a few samples)
+        Returns:
+        - times: center times of each window
+        - freqs: FFT frequency bins
+        - magnitudes: 2D array [window index][frequency bin] with the given dtype
+          (3D array [channel][window index][frequency bin] for a 2D signal)
+        """
+        window_size = int(window_size_s * sampling_rate)
+        if step is None:
+            step = int(window_size * (1 - overlap))
+        if step <= 0:
+            raise ValueError("Overlap too high; resulting step size <= 0")
+
+        dtype = np.dtype(dtype)
+        if max_freq is not None:
+            t, signal, sampling_rate, factor = self.decimate(t, signal, sampling_rate, max_freq, window_size, step)
+            window_size, step = window_size // factor, step // factor
+        t = np.asarray(t)
+        signal = np.asarray(signal, dtype=dtype)
+        channels = np.atleast_2d(signal)
+        freqs = np.fft.rfftfreq(window_size, d=1 / sampling_rate)
+        if channels.shape[-1] < window_size:
+            return np.array([]), freqs, np.empty(signal.shape[:-1] + (0, len(freqs)), dtype=dtype)
+
+        frames = sliding_window_view(channels, window_size, axis=-1)[:, ::step]  # view [channel][frame][sample], no copy
+        n_channels, n_frames = frames.shape[:2]
+        starts = np.arange(n_frames) * step
+        times = t[starts + window_size // 2]
+
+        window = hanning_window(window_size, dtype)
+        scale = dtype.type(2.0 / window_size)
+        magnitudes = np.empty((n_channels, n_frames, len(freqs)), dtype=dtype)
+        frames_step = min(frames_per_batch, n_frames)
+        channels_step = max(1, frames_per_batch // n_frames)
+        for c in range(0, n_channels, channels_step):
+            for first in range(0, n_frames, frames_step):
+                batch = frames[c:c + channels_step, first:first + frames_step]
+                magnitudes[c:c + channels_step, first:first + batch.shape[1]] = \
+                    np.abs(np.fft.rfft(batch * window, axis=-1)) * scale
+
+        # Apply threshold if specified (same as zeroing the FFT values below the threshold)
+        if magnitude_threshold is not None:
+            magnitudes[magnitudes < magnitude_threshold] = 0
+
+        if signal.ndim == 1:
+            magnitudes = magnitudes[0]
+        return times, freqs, magnitudes
+
+
     def detect_anomalies(self, freqs, normal_freqs, magnitudes, threshold_ratio=0.5, tolerance=3.0, group_distance=3.0):
         """
         Detect anomalous frequencies robustly:
@@ -99,36 +292,142 @@ class AnomalyDetector:
         Returns:
         - List of detected anomaly frequencies (grouped and filtered)
         """
-        max_magnitude = np.max(magnitudes)
-        peak_mask = np.max(magnitudes, axis=0) > threshold_ratio * max_magnitude
-        strong_freqs = freqs[peak_mask]
+        peak_magnitudes = np.max(magnitudes, axis=0)
+        peak_mask = peak_magnitudes > threshold_ratio * np.max(magnitudes)
+        order = np.argsort(freqs[peak_mask], kind='stable')
+        strong_freqs = freqs[peak_mask][order]
 
-        # Step 1: group close peaks into frequency clusters
-        if len(strong_freqs) == 0:
-            return []
+        # Step 1 + 2: group close peaks into frequency clusters, reduce each group to its mean
+        _, detected, _ = _group_peaks(np.zeros(len(strong_freqs), dtype=int), strong_freqs,
+                                      peak_magnitudes[peak_mask][order], group_distance)
 
-        strong_freqs = np.sort(strong_freqs)
-        groups = []
-        current_group = [strong_freqs[0]]
+        # Step 3: exclude anything close to normal frequencies
+        return detected[_far_from(detected, normal_freqs, tolerance)].tolist()
 
-        for f in strong_freqs[1:]:
-            if abs(f - current_group[-1]) <= group_distance:
-                current_group.append(f)
-            else:
-                groups.append(current_group)
-                current_group = [f]
-        groups.append(current_group)
 
-        # Step 2: reduce each group to representative (mean or strongest)
-        detected = [round(np.mean(g), 1) for g in groups]
+    def detect_anomalies_per_frame(self, freqs, normal_freqs, magnitudes, threshold_ratio=0.5, tolerance=3.0,
+                                   group_distance=3.0, relative_to_frame=False):
+        """
+        Detect anomalous frequencies in every time frame (instead of the max. over all frames as in
+        detect_anomalies), e.g. to see when an anomaly starts and ends in a long recording.
+        Same grouping and normal frequency rules as detect_anomalies, computed with array operations.
 
-        # Step 3: exclude anything close to normal frequencies
-        filtered = []
-        for f in detected:
-            if all(abs(f - nf) > tolerance for nf in normal_freqs):
-                filtered.append(f)
+        Parameters:
+        - freqs: array of FFT bins (1D, ascending)
+        - normal_freqs: list of known/expected frequencies
+        - magnitudes: 2D array [time_frame, freq_bin]
+        - threshold_ratio: relative threshold to max magnitude
+        - tolerance: Hz distance to normal freqs to ignore
+        - group_distance: Hz to merge nearby anomaly bins into one group
+        - relative_to_frame: use the max magnitude of each frame (True) or of the whole recording (False)
 
-        return filtered
+        Returns:
+        - anomaly table: structured array with one row per anomaly and frame and the fields
+          frame (time frame index), frequency (group mean, rounded to 0.1 Hz) and magnitude (group peak)
+        """
+        reference = np.max(magnitudes, axis=1, keepdims=True) if relative_to_frame else np.max(magnitudes)
+        frames, bins = np.nonzero(magnitudes > threshold_ratio * reference)  # sorted by frame, then frequency
+
+        frame_keys, detected, group_magnitudes = _group_peaks(frames, freqs[bins], magnitudes[frames, bins],
+                                                              group_distance)
+        keep = _far_from(detected, normal_freqs, tolerance)
+
+        table = np.empty(np.count_nonzero(keep), dtype=frame_anomaly_table_dtype)
+        table['frame'] = frame_keys[keep]
+        table['frequency'] = detected[keep]
+        table['magnitude'] = group_magnitudes[keep]
+        return table
+
+
+    def detect_anomalies_multichannel(self, freqs, normal_freqs, magnitudes, threshold_ratio=0.5, tolerance=3.0,
+                                      group_distance=3.0):
+        """
+        Detect anomalous frequencies for many channels (motors) at once.
+        Same rules as detect_anomalies, applied to each channel separately (threshold relative to the
+        channel's max magnitude), but computed with array operations over all channels.
+
+        Parameters:
+        - freqs: array of FFT bins (1D, ascending)
+        - normal_freqs: list of known/expected frequencies
+        - magnitudes: 3D array [channel, time_frame, freq_bin] (e.g. from do_fft_batched with a 2D signal)
+        - threshold_ratio: relative threshold to max magnitude of the channel
+        - tolerance: Hz distance to normal freqs to ignore
+        - group_distance: Hz to merge nearby anomaly bins into one group
+
+        Returns:
+        - anomaly table: structured array with one row per anomaly and the fields
+          motor (channel index), frequency (group mean, rounded to 0.1 Hz) and magnitude (group peak)
+        """
+        peak_magnitudes = np.max(magnitudes, axis=1)  # [channel, freq_bin]
+        peak_mask = peak_magnitudes > threshold_ratio * np.max(peak_magnitudes, axis=1, keepdims=True)
+        channels, bins = np.nonzero(peak_mask)  # sorted by channel, then frequency
+
+        motors, detected, group_magnitudes = _group_peaks(channels, freqs[bins], peak_magnitudes[channels, bins],
+                                                          group_distance)
+        keep = _far_from(detected, normal_freqs, tolerance)
+
+        table = np.empty(np.count_nonzero(keep), dtype=anomaly_table_dtype)
+        table['motor'] = motors[keep]
+        table['frequency'] = detected[keep]
+        table['magnitude'] = group_magnitudes[keep]
+        return table
+
+
+    def detect_fault_families(self, freqs, normal_freqs, magnitudes, threshold_ratio=0.5, n_harmonics=5,
+                              tolerance=3.0, harmonic_tolerance=0.6):
+        """
+        Identify fault families: a mechanical fault excites a fundamental frequency and its harmonics, which
+        detect_anomalies reports as separate anomalies. Here each family is reported once:
+        - peaks of the spectrum (max over the frames, as detect_anomalies) above threshold_ratio * max magnitude
+        - peaks near a normal frequency or a harmonic of it are normal operation and ignored
+        - the remaining peaks are candidate fundamentals, ranked by the harmonic-sum score of the spectrum
+          (sum of the magnitudes at harmonic 1..n_harmonics, one array operation over all bins: O(bins * harmonics))
+        - the best candidate takes all remaining peaks at its harmonics into its family, then the next one ...
+
+        Parameters:
+        - freqs: array of FFT bins (1D, ascending, equally spaced)
+        - normal_freqs: list of known/expected frequencies
+        - magnitudes: 1D spectrum or 2D array [time_frame, freq_bin]
+        - threshold_ratio: relative threshold to max magnitude for the peaks
+        - n_harmonics: highest harmonic order of a family (incl. the fundamental)
+        - tolerance: Hz distance to normal freqs to ignore
+        - harmonic_tolerance: max. Hz distance of a peak to the harmonic frequency (must be smaller than the
+          distance of unrelated fault frequencies, e.g. 89 Hz is not the 2nd harmonic of 45 Hz)
+
+        Returns:
+        - list of FaultFamily (fundamental, harmonics, magnitude, score), highest score first;
+          frequencies rounded to 0.1 Hz
+        """
+        spectrum = np.max(magnitudes, axis=0) if np.ndim(magnitudes) == 2 else np.asarray(magnitudes)
+        peak_freqs, peak_magnitudes = _spectral_peaks(freqs, spectrum, threshold_ratio * np.max(spectrum))
+
+        # normal operation: normal frequencies and their harmonics
+        normal = ~_far_from(peak_freqs, normal_freqs, tolerance)
+        for normal_freq in normal_freqs:
+            normal |= _harmonic_members(peak_freqs, normal_freq, n_harmonics, harmonic_tolerance)
+        peak_freqs, peak_magnitudes = peak_freqs[~normal], peak_magnitudes[~normal]
+
+        # harmonic-sum score of every bin as fundamental (a peak can fall between two bins: max of the neighbours)
+        widened = np.maximum(spectrum, np.maximum(np.roll(spectrum, 1), np.roll(spectrum, -1)))
+        harmonic_bins = np.arange(len(spectrum))[:, np.newaxis] * np.arange(1, n_harmonics + 1)  # [bin, harmonic]
+        scores = np.where(harmonic_bins < len(spectrum), widened[np.minimum(harmonic_bins, len(spectrum) - 1)],
+                          0).sum(axis=1)
+        bin_width = freqs[1] - freqs[0]
+        peak_scores = scores[np.clip(np.round((peak_freqs - freqs[0]) / bin_width).astype(int), 0, len(scores) - 1)]
+
+        families = []
+        remaining = np.ones(len(peak_freqs), dtype=bool)
+        for candidate in np.argsort(-peak_scores, kind='stable'):
+            if not remaining[candidate]:
+                continue  # already a harmonic of a family with a higher score
+            members = remaining & _harmonic_members(peak_freqs, peak_freqs[candidate], n_harmonics,
+                                                    harmonic_tolerance)
+            members[candidate] = True
+            remaining &= ~members
+            harmonics = peak_freqs[members & (np.arange(len(peak_freqs)) != candidate)]
+            families.append(FaultFamily(round(float(peak_freqs[candidate]), 1), np.round(harmonics, 1).tolist(),
+                                        float(peak_magnitudes[members].max()), float(peak_scores[candidate])))
+        return families
 
 
     def snap_to_nearest(self, freqs, target_freqs, tolerance=5.0):
@@ -144,13 +443,20 @@ class AnomalyDetector:
         Returns:
         - snapped: list of snapped frequencies
         """
-        snapped = []
-        for f in target_freqs:
-            idx = np.argmin(np.abs(freqs - f))
-            nearest = freqs[idx]
-            if abs(nearest - f) <= tolerance:
-                snapped.append(round(nearest, 2))
-        return sorted(set(snapped))
+        freqs = np.asarray(freqs)
+        target_freqs = np.asarray(target_freqs, dtype=float)
+        if len(freqs) == 0 or len(target_freqs) == 0:
+            return []
+        sorted_freqs = np.sort(freqs)
+
+        # nearest bin: the sorted neighbour below or above the insertion point
+        idx = np.searchsorted(sorted_freqs, target_freqs)
+        lower = sorted_freqs[np.clip(idx - 1, 0, len(sorted_freqs) - 1)]
+        upper = sorted_freqs[np.clip(idx, 0, len(sorted_freqs) - 1)]
+        nearest = np.where(np.abs(target_freqs - lower) <= np.abs(upper - target_freqs), lower, upper)
+
+        snapped = np.round(nearest[np.abs(nearest - target_freqs) <= tolerance], 2)
+        return np.unique(snapped).tolist()
 
 
     def detect_(self, freqs, magnitudes):
@@ -0,0 +1,300 @@
+"""
+Offline batch analysis of recorded vibration files (no plots), e.g. the nightly re-analysis of a day's fleet
+recordings. All recordings of a directory are distributed over a process pool (one file per task, largest
+files first), each worker runs the AnomalyDetector pipeline (windowed FFT, anomalies per frame, fault families)
+and the results are written as one consolidated report:
+- files table: one row per recording with size, number of anomalies, fault families, error and timings
+  (read, FFT, detection and total seconds)
+- anomalies table: one row per anomaly and time frame (file index, frame, time, frequency, magnitude)
+The report is columnar: .npz with one array per column (e.g. report['anomalies.frequency']) or two CSV files
+(<name>_files.csv and <name>_anomalies.csv) if the output ends with .csv.
+Recording formats:
+- .npy: 1D numpy array of samples (opened memory-mapped)
+- .csv: one column (samples) or several columns with the time (s) in the first and the samples in the last
+  column (the sampling rate is taken from the time column), optional header line
+- .bin/.raw: raw payload of payload/codec.py (b'VIB1' header + float32 samples) or headerless little-endian
+  float32 samples
+- directory of a RecordingStore (recording_store.py, sampling rate from its header)
+Usage: python batch_analysis.py <directory> [--output report.npz] [--workers N] [--recursive]
+                                [--sampling-rate 1000] [--window 0.5] [--overlap 0.5] [--normal-freqs 25,67]
+                                [--threshold-ratio 0.5] [--max-freq 100]
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from anomaly_detector import AnomalyDetector, anti_alias_filter, decimation_factor
+from payload.codec import RAW_DTYPE, RAW_HEADER, RAW_MAGIC
+from recording_store import RecordingStore
+
+EXTENSIONS = ('.npy', '.csv', '.bin', '.raw')
+
+# Row of the files table: recording, its size and analysis results, error message (empty if ok) and timings (s)
+file_table_dtype = np.dtype([('path', 'U1024'), ('samples', np.int64), ('duration_s', np.float64),
+                             ('sampling_rate', np.float64), ('frames', np.int32), ('anomalies', np.int32),
+                             ('fault_families', 'U256'), ('error', 'U256'), ('read_s', np.float64),
+                             ('fft_s', np.float64), ('detect_s', np.float64), ('total_s', np.float64)])
+# Row of the anomalies table: file index (row of the files table), time frame, its center time (s),
+# anomaly frequency (Hz) and peak magnitude
+batch_anomaly_table_dtype = np.dtype([('file', np.int32), ('frame', np.int32), ('time', np.float64),
+                                      ('frequency', np.float64), ('magnitude', np.float64)])
+
+
+def find_recordings(directory, recursive=False):
+    """ Paths of all recordings (see EXTENSIONS and RecordingStore directories) in the directory, sorted. """
+    if recursive:
+        paths = [os.path.join(root, name) for root, dirs, names in os.walk(directory) for name in names + dirs]
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(path for path in paths if os.path.isfile(path) and path.lower().endswith(EXTENSIONS)
+                  or os.path.isfile(os.path.join(path, RecordingStore.header_name)))
+
+
+def recording_size(path):
+    """ Size of a recording in bytes (sum of the chunk files for a RecordingStore directory). """
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def read_recording(path, sampling_rate=1000):
+    """
+    Read a recording (see module docstring for the formats).
+
+    Parameters:
+    - path: .npy, .csv, .bin or .raw file or RecordingStore directory
+    - sampling_rate: samples per second if the file has no time column
+
+    Returns:
+    - signal: 1D array (memory-mapped for .npy and binary files) or the RecordingStore (slices are read from
+      its memory-mapped chunk files)
+    - sampling_rate: of the recording
+    """
+    if os.path.isdir(path):
+        store = RecordingStore(path)
+        return store, store.sampling_rate
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        signal = np.load(path, mmap_mode='r')
+        if signal.ndim != 1:
+            raise ValueError(f"Expected a 1D array, got shape {signal.shape}")
+        return signal, sampling_rate
+    if extension == '.csv':
+        with open(path) as file:
+            first_line = file.readline()
+        try:
+            [float(value) for value in first_line.split(',')]
+            skip_rows = 0
+        except ValueError:
+            skip_rows = 1  # header line
+        data = np.loadtxt(path, delimiter=',', skiprows=skip_rows, ndmin=2)
+        if data.shape[1] > 1 and len(data) > 1:
+            sampling_rate = round(1 / np.median(np.diff(data[:, 0])), 6)
+        return data[:, -1], sampling_rate
+    if extension in ('.bin', '.raw'):
+        size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            header = file.read(RAW_HEADER.size)
+        if len(header) == RAW_HEADER.size:
+            magic, n_samples = RAW_HEADER.unpack(header)
+            if magic == RAW_MAGIC:
+                if size != RAW_HEADER.size + n_samples * RAW_DTYPE.itemsize:
+                    raise ValueError("Invalid raw recording (wrong header or length)")
+                return np.memmap(path, dtype=RAW_DTYPE, mode='r', offset=RAW_HEADER.size, shape=(n_samples,)), \
+                    sampling_rate
+        if size % RAW_DTYPE.itemsize:
+            raise ValueError("Size of the raw recording is not a multiple of 4 bytes (float32)")
+        return np.memmap(path, dtype=RAW_DTYPE, mode='r'), sampling_rate
+    raise ValueError(f"Unsupported recording format: {path}")
+
+
+def fft_in_slices(detector, signal, sampling_rate, window_size_s=0.5, overlap=0.5, max_freq=None, dtype=None,
+                  slice_frames=16384):
+    """
+    AnomalyDetector.do_fft_batched of a long recording in time slices of slice_frames frames: only one slice of
+    the (memory-mapped) signal and its time array are in memory at a time, the frames of the slices are the
+    frames of the whole recording. With max_freq the slices overlap by the length of the anti-alias filter, so
+    the decimated samples of the frames do not depend on the slice boundaries.
+
+    Parameters:
+    - detector: AnomalyDetector
+    - signal: 1D array or RecordingStore (anything with len() and [start:stop])
+    - dtype: computation dtype (default: dtype of the signal if it is a float dtype, otherwise float64)
+    - other parameters: see do_fft_batched
+
+    Returns:
+    - times, freqs, magnitudes as do_fft_batched
+    """
+    dtype = dtype or (signal.dtype if np.issubdtype(signal.dtype, np.floating) else np.float64)
+    window_size = int(window_size_s * sampling_rate)
+    step = int(window_size * (1 - overlap))
+    if step <= 0:
+        raise ValueError("Overlap too high; resulting step size <= 0")
+    margin = 0
+    if max_freq is not None:
+        factor = decimation_factor(sampling_rate, max_freq, window_size, step)
+        if factor > 1:
+            margin = -(-len(anti_alias_filter(sampling_rate, factor, max_freq)) // step) * step  # frame aligned
+    n_samples = len(signal)
+    n_frames = (n_samples - window_size) // step + 1 if n_samples >= window_size else 0
+    slices = []
+    for first in range(0, max(1, n_frames), slice_frames):
+        last = min(n_frames, first + slice_frames)
+        start = max(0, first * step - margin)
+        stop = min(n_samples, (last - 1) * step + window_size + margin) if n_frames else n_samples
+        times, freqs, magnitudes = detector.do_fft_batched(np.arange(start, stop) / sampling_rate,
+                                                           signal[start:stop], window_size_s=window_size_s,
+                                                           sampling_rate=sampling_rate, dtype=dtype,
+                                                           max_freq=max_freq, step=step)
+        skip = (first * step - start) // step  # frames of the margin (computed by the previous slice)
+        slices.append((times[skip:skip + last - first], magnitudes[skip:skip + last - first]))
+    return (np.concatenate([times for times, _ in slices]), freqs,
+            np.concatenate([magnitudes for _, magnitudes in slices]))
+
+
+def analyze_file(path, sampling_rate=1000, window_size_s=0.5, overlap=0.5, normal_freqs=(25, 67),
+                 threshold_ratio=0.5, max_freq=None):
+    """
+    Run the AnomalyDetector pipeline on one recording (executed in a worker process). Errors are returned
+    in the files row, so that one broken file does not stop the batch.
+    The recording stays memory-mapped and is transformed in time slices (fft_in_slices) in its own dtype (float32
+    for binary recordings). With max_freq the recording is decimated to the highest frequency of interest before
+    the FFT (AnomalyDetector.decimate).
+
+    Returns:
+    - files row (file_table_dtype, 0-d structured array)
+    - anomalies (batch_anomaly_table_dtype, file index 0: set by the caller)
+    """
+    row = np.zeros((), dtype=file_table_dtype)
+    row['path'] = path
+    anomalies = np.empty(0, dtype=batch_anomaly_table_dtype)
+    start = time.perf_counter()
+    try:
+        signal, sampling_rate = read_recording(path, sampling_rate)
+        row['samples'], row['sampling_rate'] = len(signal), sampling_rate
+        row['duration_s'] = len(signal) / sampling_rate
+        read_done = time.perf_counter()
+
+        detector = AnomalyDetector()
+        times, freqs, magnitudes = fft_in_slices(detector, signal, sampling_rate, window_size_s=window_size_s,
+                                                 overlap=overlap, max_freq=max_freq)
+        row['frames'] = len(times)
+        fft_done = time.perf_counter()
+
+        if len(times):
+            table = detector.detect_anomalies_per_frame(freqs, list(normal_freqs), magnitudes,
+                                                        threshold_ratio=threshold_ratio)
+            anomalies = np.empty(len(table), dtype=batch_anomaly_table_dtype)
+            anomalies['file'] = 0
+            anomalies['frame'] = table['frame']
+            anomalies['time'] = times[table['frame']]
+            anomalies['frequency'] = table['frequency']
+            anomalies['magnitude'] = table['magnitude']
+            families = detector.detect_fault_families(freqs, list(normal_freqs), magnitudes,
+                                                      threshold_ratio=threshold_ratio)
+            row['fault_families'] = ';'.join(f"{family.fundamental}{family.harmonics if family.harmonics else ''}"
+                                             for family in families)  # e.g. 45.0;43.0[86.0, 129.0]
+        row['anomalies'] = len(anomalies)
+        row['read_s'], row['fft_s'] = read_done - start, fft_done - read_done
+        row['detect_s'] = time.perf_counter() - fft_done
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['total_s'] = time.perf_counter() - start
+    return row, anomalies
+
+
+def analyze_recordings(paths, workers=None, **options):
+    """
+    Analyze the recordings in a process pool (largest files first, so that a long recording does not
+    start last and delay the end of the batch).
+
+    Parameters:
+    - paths: recording paths
+    - workers: number of worker processes (default: number of CPUs), 1: run in this process
+    - options: parameters of analyze_file (sampling_rate, window_size_s, overlap, normal_freqs, threshold_ratio,
+      max_freq)
+
+    Returns:
+    - files table (file_table_dtype, in the order of paths)
+    - anomalies table (batch_anomaly_table_dtype, sorted by file and frame)
+    """
+    paths = list(paths)
+    files = np.zeros(len(paths), dtype=file_table_dtype)
+    anomalies = [np.empty(0, dtype=batch_anomaly_table_dtype)] * len(paths)
+    order = sorted(range(len(paths)), key=lambda i: recording_size(paths[i]), reverse=True)
+    analyze = functools.partial(analyze_file, **options)
+
+    def collect(index, result):
+        files[index], anomalies[index] = result
+        anomalies[index]['file'] = index
+        print(f"{paths[index]}: {files[index]['anomalies']} anomalies in {files[index]['total_s']:.2f} s "
+              f"{files[index]['error']}", file=sys.stderr)
+
+    if workers == 1 or len(paths) <= 1:
+        for index in order:
+            collect(index, analyze(paths[index]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analyze, paths[index]): index for index in order}
+            for future in as_completed(futures):
+                collect(futures[future], future.result())
+    return files, np.concatenate(anomalies)
+
+
+def save_report(output, files, anomalies):
+    """ Save the report columnar: .npz with the arrays '<table>.<column>', or two CSV files for .csv. """
+    tables = {'files': files, 'anomalies': anomalies}
+    if output.lower().endswith('.csv'):
+        for name, table in tables.items():
+            formats = ['%s' if table.dtype[field].kind == 'U' else '%.6g' if table.dtype[field].kind == 'f'
+                       else '%d' for field in table.dtype.names]
+            np.savetxt(f"{output[:-4]}_{name}.csv", table, fmt=formats, delimiter=',',
+                       header=','.join(table.dtype.names), comments='')
+    else:
+        np.savez(output, **{f"{name}.{field}": table[field] for name, table in tables.items()
+                            for field in table.dtype.names})
+
+
+def load_report(path):
+    """ Load a .npz report (save_report); returns the files and anomalies tables. """
+    with np.load(path) as report:
+        tables = []
+        for name, dtype in (('files', file_table_dtype), ('anomalies', batch_anomaly_table_dtype)):
+            table = np.empty(len(report[f"{name}.{dtype.names[0]}"]), dtype=dtype)
+            for field in dtype.names:
+                table[field] = report[f"{name}.{field}"]
+            tables.append(table)
+    return tuple(tables)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch anomaly analysis of recorded vibration files")
+    parser.add_argument('directory', help="directory with the recordings (.npy, .csv, .bin, .raw)")
+    parser.add_argument('--output', default='anomaly_report.npz', help="report file (.npz or .csv)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--recursive', action='store_true', help="include subdirectories")
+    parser.add_argument('--sampling-rate', type=float, default=1000, help="if the recording has no time column")
+    parser.add_argument('--window', type=float, default=0.5, help="FFT window size (s)")
+    parser.add_argument('--overlap', type=float, default=0.5)
+    parser.add_argument('--normal-freqs', default='25,67', help="normal operation frequencies (Hz)")
+    parser.add_argument('--threshold-ratio', type=float, default=0.5, help="relative to the max. magnitude")
+    parser.add_argument('--max-freq', type=float, help="highest frequency of interest (Hz): decimate before the FFT")
+    args = parser.parse_args()
+
+    paths = find_recordings(args.directory, args.recursive)
+    start = time.perf_counter()
+    files, anomalies = analyze_recordings(paths, workers=args.workers, sampling_rate=args.sampling_rate,
+                                          window_size_s=args.window, overlap=args.overlap,
+                                          normal_freqs=[float(f) for f in args.normal_freqs.split(',') if f],
+                                          threshold_ratio=args.threshold_ratio, max_freq=args.max_freq)
+    save_report(args.output, files, anomalies)
+    errors = np.count_nonzero(files['error'] != '')
+    print(f"{len(paths)} recordings ({files['duration_s'].sum() / 3600:.2f} h signal), {len(anomalies)} anomalies, "
+          f"{errors} errors in {time.perf_counter() - start:.1f} s (sum of file times {files['total_s'].sum():.1f} s)"
+          f" -> {args.output}")
+    sys.exit(1 if errors else 0)
@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from motor_simulator import Motor, normal_freqs, fault_freqs_default, noise_level, fault_time_s
+from numpy.lib.stride_tricks import sliding_window_view
+from motor_simulator import Motor, normal_freqs, fault_freqs_default, noise_level, fault_time_s, sampling_rate
 
 def detect_frequencies_no_hanning(signal, sampling_rate, window_size, overlap=0.5, threshold_ratio=0.1):
     """
@@ -54,6 +55,47 @@ def detect_frequencies_no_hanning(signal, sampling_rate, window_size, overlap=0.
     return np.array(times), freqs, all_freqs_per_window, np.array(magnitudes)
 
 
+def detect_frequencies_sparse(signal, sampling_rate, window_size, overlap=0.5, threshold_ratio=0.1,
+                              frames_per_batch=4096):
+    """
+    Vectorized version of detect_frequencies_no_hanning with sparse (COO-style) output: the peaks of all windows
+    are found with one threshold operation per batch of windows (threshold_ratio * max magnitude of each window)
+    and returned as three arrays with one entry per peak, so the memory scales with the number of peaks
+    instead of windows x bins.
+
+    Parameters: see detect_frequencies_no_hanning
+    - frames_per_batch: max. number of windows transformed by one FFT call (bounds the temporary dense matrix)
+
+    Returns:
+    - times: center time of each window
+    - freqs: FFT frequency bins
+    - window_idx: window index of each peak (ascending, then by frequency)
+    - freq_idx: frequency bin index of each peak (freqs[freq_idx] are the detected frequencies)
+    - peak_magnitudes: normalized magnitude of each peak
+    """
+    step = int(window_size * (1 - overlap))
+    if step <= 0:
+        raise ValueError("Overlap too high; resulting step size <= 0")
+    signal = np.asarray(signal, dtype=float)
+    freqs = np.fft.fftfreq(window_size, d=1 / sampling_rate)[:window_size // 2]
+    if len(signal) < window_size:
+        return np.array([]), freqs, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0)
+    frames = sliding_window_view(signal, window_size)[::step]  # view [window][sample], no copy
+    times = (np.arange(len(frames)) * step + window_size // 2) / sampling_rate
+
+    window_idx, freq_idx, peak_magnitudes = [], [], []
+    for first in range(0, len(frames), frames_per_batch):
+        magnitude = (2.0 / window_size) * np.abs(np.fft.rfft(frames[first:first + frames_per_batch], axis=-1))
+        magnitude = magnitude[:, :window_size // 2]
+        peaks = magnitude > threshold_ratio * np.max(magnitude, axis=1, keepdims=True)
+        peaks[:, 0] = False  # Only positive frequencies
+        windows, bins = np.nonzero(peaks)
+        window_idx.append((windows + first).astype(np.int32))
+        freq_idx.append(bins.astype(np.int32))
+        peak_magnitudes.append(magnitude[windows, bins])
+    return times, freqs, np.concatenate(window_idx), np.concatenate(freq_idx), np.concatenate(peak_magnitudes)
+
+
 def plot_frequencies_over_time(times, freqs, all_freqs_per_window, magnitudes):
     """
     Plot detected frequencies over time with a spectrogram-like view.
@@ -75,12 +117,8 @@ def plot_frequencies_over_time(times, freqs, all_freqs_per_window, magnitudes):
     plt.colorbar(im, ax=ax1, label='Magnitude')
 
     # Plot 2: Detected frequencies as scatter points
-    all_times = []
-    all_detected_freqs = []
-
-    for i, (t, freqs_in_window) in enumerate(zip(times, all_freqs_per_window)):
-        all_times.extend([t] * len(freqs_in_window))
-        all_detected_freqs.extend(freqs_in_window)
+    all_times = np.repeat(times, [len(freqs_in_window) for freqs_in_window in all_freqs_per_window])
+    all_detected_freqs = np.concatenate(all_freqs_per_window) if len(all_freqs_per_window) else []
 
     if len(all_times) > 0:
         ax2.scatter(all_times, all_detected_freqs, alpha=0.6, s=30, color='red')
@@ -94,6 +132,27 @@ def plot_frequencies_over_time(times, freqs, all_freqs_per_window, magnitudes):
     plt.show()
 
 
+def plot_peaks_over_time(times, freqs, window_idx, freq_idx, peak_magnitudes):
+    """
+    Plot the sparse peaks of detect_frequencies_sparse (frequency over time, colored by magnitude).
+
+    Parameters:
+    - times: center times of windows
+    - freqs: frequency bins
+    - window_idx, freq_idx, peak_magnitudes: peaks (COO-style, see detect_frequencies_sparse)
+    """
+    fig, ax = plt.subplots(figsize=(12, 5))
+    points = ax.scatter(times[window_idx], freqs[freq_idx], c=peak_magnitudes, cmap='viridis', s=30)
+    plt.colorbar(points, ax=ax, label='Magnitude')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Frequency (Hz)')
+    ax.set_title('Detected Frequencies Over Time')
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.show()
+
+
 # org.dqman.Main
 if __name__ == "__main__":
     # Generate test signal
@@ -102,9 +161,9 @@ if __name__ == "__main__":
                                              noise_level=noise_level, fault_freqs=fault_freqs_default,
                                              fault_time_s=fault_time_s)
 
-    # Detect frequencies
+    # Detect frequencies (sparse peaks of all windows)
     window_size = 512  # samples
-    times, freqs, all_freqs_per_window, magnitudes = detect_frequencies_no_hanning(
+    times, freqs, window_idx, freq_idx, peak_magnitudes = detect_frequencies_sparse(
         signal=signal,
         sampling_rate=sampling_rate,
         window_size=window_size,
@@ -113,9 +172,10 @@ if __name__ == "__main__":
     )
 
     # Plot results
-    plot_frequencies_over_time(times, freqs, all_freqs_per_window, magnitudes)
+    plot_peaks_over_time(times, freqs, window_idx, freq_idx, peak_magnitudes)
 
-    # Print detected frequencies
+    # Print detected frequencies (the peaks are sorted by window: split them at the window boundaries)
     print("Detected frequencies per window:")
-    for i, (t, freqs_detected) in enumerate(zip(times, all_freqs_per_window)):
-        print(f"  Window {i} (t={t:.2f}s): {np.round(freqs_detected, 1)} Hz")
\ No newline at end of file
+    boundaries = np.searchsorted(window_idx, np.arange(1, len(times)))
+    for i, (t, bins) in enumerate(zip(times, np.split(freq_idx, boundaries))):
+        print(f"  Window {i} (t={t:.2f}s): {np.round(freqs[bins], 1)} Hz")
\ No newline at end of file
@@ -1,7 +1,11 @@
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.widgets import Button, Slider
+from lod import MinMaxLine
 
 class MotorVibrationMonitor:
     ''' Class to monitor motor vibration using FFT and a sliding window approach.
@@ -34,7 +38,7 @@ class MotorVibrationMonitor:
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 6))
 
         # Time-domain signal
-        ax1.plot(t, signal, color='lightgray', label="Full Signal")
+        self.signal_line = MinMaxLine(ax1, t, signal, color='lightgray', label="Full Signal")
         window_line, = ax1.plot([], [], color='blue', label="FFT Window")
         ax1.set_xlim(t[0], t[-1])
         ax1.set_ylim(np.min(signal), np.max(signal))
@@ -89,7 +93,7 @@ class MotorVibrationMonitor:
         self.ax_signal.set_title("Motor Vibration - Moving Time Window")
         self.ax_signal.grid()
 
-        self.ax_signal.plot(self.t, self.signal, color='lightgray')
+        self.signal_line = MinMaxLine(self.ax_signal, self.t, self.signal, color='lightgray')
         self.window_line, = self.ax_signal.plot([], [], color='red', linewidth=2)
 
         self.warning_text = self.ax_signal.text(0.5, 0.9, "FAULT DETECTED!", color='red',
@@ -202,4 +206,170 @@ class MotorVibrationMonitor:
 
     def update_threshold(self, val):
         """Updates the threshold inside the injected detector."""
-        self.detector.threshold = val
\ No newline at end of file
+        self.detector.threshold = val
+
+
+class BlitMonitor:
+    ''' Real-time renderer of the moving window monitor (signal with moving window, FFT of the window with fading
+        older spectra and fault warning, as MotorVibrationMonitor.build_plot_) for long signals:
+        - all artists are created once, a frame only updates their data (no new line artists per frame)
+        - only the animated artists are drawn on the cached background of the figure (blitting)
+        - the spectra are computed by the vectorized STFT (AnomalyDetector.do_fft_batched) in blocks of
+          frames_per_block frames when they are needed, so neither a FFT per frame nor all spectra in memory
+        With headless=True the figure is rendered to an off-screen (Agg) canvas and run_headless reports
+        the achieved frames per second (e.g. to size a dashboard for several motors).
+    '''
+    def __init__(self, t, signal, detector, sampling_rate, window_size_s=0.5, step_samples=20, interval_ms=100,
+                 max_fft_lines=10, freq_max=200, frames_per_block=1024, headless=False):
+        """
+        Parameters:
+        - t, signal: time and signal arrays
+        - detector: AnomalyDetector (target band and threshold, the threshold can be changed while running)
+        - sampling_rate: samples per second
+        - window_size_s: FFT window size in seconds
+        - step_samples: samples between two frames
+        - interval_ms: time between two frames of the animation
+        - max_fft_lines: number of spectra shown (the current one and fading older ones)
+        - freq_max: highest frequency shown (Hz)
+        - frames_per_block: number of frames whose spectra are computed together
+        - headless: render to an off-screen canvas instead of a window
+        """
+        self.t = np.asarray(t)
+        self.signal = np.asarray(signal, dtype=np.float32)
+        self.detector = detector
+        self.sampling_rate = sampling_rate
+        self.window_size_s = window_size_s
+        self.window_size = int(window_size_s * sampling_rate)
+        self.step_samples = step_samples
+        self.interval_ms = interval_ms
+        self.max_fft_lines = max_fft_lines
+        self.frames_per_block = frames_per_block
+        self.n_frames = max(0, (len(self.signal) - self.window_size) // step_samples + 1)
+        freqs = np.fft.rfftfreq(self.window_size, d=1 / sampling_rate)
+        self.n_bins = int(np.searchsorted(freqs, freq_max, side='right'))
+        self.freqs = freqs[:self.n_bins]
+        self.band = (self.freqs >= detector.target_freq_min) & (self.freqs <= detector.target_freq_max)
+        self.fault_frame_counter = 0
+        self._block_first = self._block_magnitudes = None
+        self.build_plot(headless)
+
+    def build_plot(self, headless=False):
+        if headless:
+            self.fig = Figure(figsize=(12, 8))
+            FigureCanvasAgg(self.fig)
+            self.ax_signal, self.ax_fft = self.fig.subplots(2, 1)
+        else:
+            self.fig, (self.ax_signal, self.ax_fft) = plt.subplots(2, 1, figsize=(12, 8))
+        self.fig.subplots_adjust(hspace=0.35)
+
+        # Signal plot (top): static full signal, animated window
+        self.ax_signal.set_xlim(self.t[0], self.t[-1])
+        self.ax_signal.set_ylim(np.min(self.signal) - 1, np.max(self.signal) + 1)
+        self.ax_signal.set_xlabel("Time (s)")
+        self.ax_signal.set_ylabel("Vibration amplitude")
+        self.ax_signal.set_title("Motor Vibration - Moving Time Window")
+        self.ax_signal.grid()
+        self.signal_line = MinMaxLine(self.ax_signal, self.t, self.signal, color='lightgray')
+        self.fault_background = self.ax_signal.axvspan(self.t[0], self.t[-1], color='mistyrose', alpha=0.6,
+                                                       zorder=0, visible=False, animated=True)
+        self.window_line, = self.ax_signal.plot([], [], color='red', linewidth=2, animated=True)
+        self.warning_text = self.ax_signal.text(0.5, 0.9, "FAULT DETECTED!", color='red', fontsize=20, ha='center',
+                                                va='center', transform=self.ax_signal.transAxes, visible=False,
+                                                animated=True)
+
+        # FFT plot (bottom): a fixed pool of lines, the oldest spectrum first (drawn below the newer ones)
+        self.ax_fft.set_xlim(0, self.freqs[-1])
+        self.ax_fft.set_ylim(0, np.max(np.abs(self.signal)) * 1.05)  # upper bound of the window magnitudes
+        self.ax_fft.set_xlabel("Frequency (Hz)")
+        self.ax_fft.set_ylabel("Magnitude")
+        self.ax_fft.set_title("FFT of Current Window")
+        self.ax_fft.grid()
+        self.fft_lines = [self.ax_fft.plot(self.freqs, np.zeros(self.n_bins), color='blue', animated=True,
+                                           alpha=1.0 - age / self.max_fft_lines)[0]
+                          for age in reversed(range(self.max_fft_lines))]
+        self.threshold_line, = self.ax_fft.plot([self.detector.target_freq_min, self.detector.target_freq_max],
+                                                [self.detector.threshold] * 2, color='red', linestyle='--',
+                                                animated=True)
+        self.anomaly_points, = self.ax_fft.plot([], [], 'o', color='red', animated=True)
+        self.artists = [self.fault_background, self.window_line, self.warning_text] + self.fft_lines + \
+                       [self.threshold_line, self.anomaly_points]
+
+    def spectra(self, frame):
+        """
+        Magnitudes (float32, bins up to freq_max) of the frame and the max_fft_lines - 1 frames before it.
+        The STFT is computed for a block of frames at once and kept until a frame outside the block is requested.
+        :return: 2D array [frame (oldest first), frequency bin]
+        """
+        first = frame - self.max_fft_lines + 1
+        if self._block_first is None or first < self._block_first or \
+                frame >= self._block_first + len(self._block_magnitudes):
+            self._block_first = max(0, first)
+            last = min(self.n_frames, self._block_first + self.max_fft_lines + self.frames_per_block)
+            start = self._block_first * self.step_samples
+            end = (last - 1) * self.step_samples + self.window_size
+            _, _, magnitudes = self.detector.do_fft_batched(self.t[start:end], self.signal[start:end],
+                                                            self.window_size_s, self.sampling_rate, dtype=np.float32,
+                                                            step=self.step_samples)
+            self._block_magnitudes = np.ascontiguousarray(magnitudes[:, :self.n_bins])
+        return self._block_magnitudes[max(0, first) - self._block_first:frame - self._block_first + 1]
+
+    def update(self, frame):
+        """ Update the animated artists for a frame (index) and return them. """
+        start = frame * self.step_samples
+        end = start + self.window_size
+        self.window_line.set_data(self.t[start:end], self.signal[start:end])
+
+        spectra = self.spectra(frame)
+        hidden = self.max_fft_lines - len(spectra)  # older frames before the start of the signal
+        for line in self.fft_lines[:hidden]:
+            line.set_visible(False)
+        for line, magnitude in zip(self.fft_lines[hidden:], spectra):
+            line.set_ydata(magnitude)
+            line.set_visible(True)
+
+        # same rule as AnomalyDetector.detect_ (the threshold is read per frame, e.g. changed by a slider)
+        magnitude = spectra[-1]
+        anomalous = self.band & (magnitude > self.detector.threshold)
+        self.threshold_line.set_ydata([self.detector.threshold] * 2)
+        self.anomaly_points.set_data(self.freqs[anomalous], magnitude[anomalous])
+        if anomalous.any():
+            self.fault_frame_counter += 1
+            flash = (self.fault_frame_counter // 5) % 2 == 0
+        else:
+            self.fault_frame_counter = 0
+            flash = False
+        self.warning_text.set_visible(flash)
+        self.fault_background.set_visible(flash)
+        return self.artists
+
+    def start_animation(self):
+        self.ani = animation.FuncAnimation(self.fig, self.update, frames=self.n_frames, interval=self.interval_ms,
+                                           blit=True, repeat=True)
+        return self.ani
+
+    def run_headless(self, n_frames=None, blit=True):
+        """
+        Render frames as fast as possible on the off-screen canvas and measure the frame rate.
+        Parameters:
+        - n_frames: number of frames (default: all frames of the signal)
+        - blit: redraw only the animated artists (False: full redraw of the figure per frame, for comparison)
+        Returns dict with frames, seconds and fps.
+        """
+        n_frames = self.n_frames if n_frames is None else min(n_frames, self.n_frames)
+        canvas = self.fig.canvas
+        start = time.perf_counter()
+        canvas.draw()  # background without the animated artists
+        background = canvas.copy_from_bbox(self.fig.bbox)
+        for frame in range(n_frames):
+            artists = self.update(frame)
+            if blit:
+                canvas.restore_region(background)
+                for artist in artists:
+                    artist.axes.draw_artist(artist)
+                canvas.blit(self.fig.bbox)
+            else:
+                for artist in artists:
+                    artist.set_animated(False)
+                canvas.draw()
+        seconds = time.perf_counter() - start
+        return {"frames": n_frames, "seconds": seconds, "fps": n_frames / seconds if seconds else float('inf')}
@@ -13,29 +13,56 @@ class Motor:
     def get_max_freq(self):
         return np.max(self.freqs)
 
-    def create_motor_vibration(self, duration_s=5.0, sampling_rate=1000, noise_level=0.3, fault_freqs=None, fault_time_s=2.5):
-        '''Simulate a motor vibration signal with normal and faulty components and added noise'''
+    def create_motor_vibration(self, duration_s=5.0, sampling_rate=1000, noise_level=0.3, fault_freqs=None, fault_time_s=2.5,
+                               as_array=False, dtype=np.float64, rng=None):
+        '''Simulate a motor vibration signal with normal and faulty components and added noise
+        - as_array: return numpy arrays instead of lists (t is always float64, the vibration has the given dtype)
+        - rng: np.random.Generator or seed for the noise (default: global numpy random state)
+        '''
+        n_samples = int(duration_s * sampling_rate)
+        if rng is not None:
+            rng = np.random.default_rng(rng)
+        t, vibration = self._vibration_chunk(0, n_samples, sampling_rate, noise_level, fault_freqs, fault_time_s, dtype, rng)
+        if as_array:
+            return t, vibration
+        return t.tolist(), vibration.tolist()
+
+    def iter_motor_vibration(self, duration_s=5.0, sampling_rate=1000, noise_level=0.3, fault_freqs=None, fault_time_s=2.5,
+                             chunk_size=65536, dtype=np.float64, rng=None):
+        '''Same signal as create_motor_vibration, generated in chunks of chunk_size samples (constant memory).
+        The chunks are phase continuous (time is computed from the absolute sample index).
+        - duration_s: length of the signal, None for an endless stream
+        Yields (t, vibration) numpy arrays per chunk
+        '''
+        n_samples = None if duration_s is None else int(duration_s * sampling_rate)
+        if rng is not None:
+            rng = np.random.default_rng(rng)
+        start = 0
+        while n_samples is None or start < n_samples:
+            stop = start + chunk_size if n_samples is None else min(start + chunk_size, n_samples)
+            yield self._vibration_chunk(start, stop, sampling_rate, noise_level, fault_freqs, fault_time_s, dtype, rng)
+            start = stop
+
+    def _vibration_chunk(self, start, stop, sampling_rate, noise_level, fault_freqs, fault_time_s, dtype, rng):
+        '''Samples start..stop-1 of the vibration signal as (t, vibration) arrays'''
         # Create time vector
-        t = np.linspace(0, duration_s, int(duration_s * sampling_rate), endpoint=False)
+        t = np.arange(start, stop) / sampling_rate
         # Generate normal vibrations
-        # vibration_normal = np.sin(2 * np.pi * 30 * t) + 0.5 * np.sin(2 * np.pi * 60 * t)  ToDo delete this
-        vibration_normal = sum(np.sin(2 * np.pi * f * t) for f in self.freqs)
-
-        # Add fault starting halfway
-        vibration_with_fault = np.copy(vibration_normal)
+        vibration = np.zeros(len(t))
+        for f in self.freqs:
+            vibration += np.sin(2 * np.pi * f * t)
 
-        # Add faulty frequencies
+        # Add faulty frequencies (starting at fault_time_s)
         fault_amplitude = 0.7
         if fault_freqs is not None:
             # Create fault mask: 0 before fault_time_s, 1 after
             fault_mask = (t >= fault_time_s).astype(float)
             for ff in fault_freqs:
-                fault_component = fault_amplitude * np.sin(2 * np.pi * ff * t) * fault_mask
-                vibration_with_fault += fault_component
+                vibration += fault_amplitude * np.sin(2 * np.pi * ff * t) * fault_mask
 
         # Add noise
         if noise_level > 0:
-            noise = noise_level * np.random.normal(size=t.shape)
-            vibration_with_fault += noise
+            noise = rng.standard_normal(len(t)) if rng is not None else np.random.normal(size=t.shape)
+            vibration += noise_level * noise
 
-        return t.tolist(), vibration_with_fault.tolist()
\ No newline at end of file
+        return t, vibration.astype(dtype, copy=False)
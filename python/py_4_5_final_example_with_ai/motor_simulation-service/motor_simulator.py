@@ -10,6 +10,7 @@ from visualizer import plot_anomalies, plot_spectrogram, plot_signal, animate_mo
 from monitor import MotorVibrationMonitor
 from anomaly_detector import AnomalyDetector
 from motor import Motor
+from spectrogram import Spectrogram
 
 plot = True  # Plot the raw data and FFT analysis on the screen
 normal_freqs = [25, 67]  # Normal operation (motor vibration frequencies)
@@ -19,22 +20,40 @@ noise_level = 0.65  # Noise level for motor vibration simulation
 sampling_rate = 1000  # 1000 samples per second
 window_size_s = 0.5  # Window size for moving window FFT analysis
 magnitude_threshold = 0.0  # Minimum magnitude to consider a frequency component significant, 0.2 eliminates noise
+spectrogram_cache_dir = None  # Directory to keep the spectrograms (.npy + .json), e.g. "spectrograms"
 
-def simulate_motor_vibration(duration, sampling_rate, noise, fault_time, inject_fault):
+
+def _fault_freqs(inject_fault):
+    """ Fault frequencies to inject (None: normal operation only). """
+    return fault_freqs_default if inject_fault else None
+
+
+def simulate_motor_vibration(duration, sampling_rate, noise, fault_time, inject_fault, as_array=False, dtype=np.float64,
+                             seed=None):
     """
     Simulate motor vibration signal with optional fault injection and noise.
+    - as_array: return numpy arrays instead of lists
+    - dtype: dtype of the vibration signal (np.float64 or np.float32)
+    - seed: seed for the noise (None: global numpy random state)
     """
     global normal_freqs, fault_freqs_default
     motor = Motor(normal_freqs)
+    t, signal = motor.create_motor_vibration(duration_s=duration, sampling_rate=sampling_rate, noise_level=noise,
+                                             fault_freqs=_fault_freqs(inject_fault), fault_time_s=fault_time,
+                                             as_array=as_array, dtype=dtype, rng=seed)
+    return t, signal
 
-    if not inject_fault:
-        fault_freqs = None
-    else:
-        fault_freqs = fault_freqs_default
 
-    t, signal = motor.create_motor_vibration(duration_s=duration, sampling_rate=sampling_rate,
-                                             noise_level=noise, fault_freqs=fault_freqs, fault_time_s=fault_time)
-    return t, signal
+def simulate_motor_vibration_chunks(duration, sampling_rate, noise, fault_time, inject_fault, chunk_size=65536,
+                                    dtype=np.float64, seed=None):
+    """
+    Same as simulate_motor_vibration, but yields the (t, signal) arrays in chunks of chunk_size samples,
+    so that long signals (hours) can be produced in constant memory.
+    """
+    motor = Motor(normal_freqs)
+    return motor.iter_motor_vibration(duration_s=duration, sampling_rate=sampling_rate, noise_level=noise,
+                                      fault_freqs=_fault_freqs(inject_fault), fault_time_s=fault_time,
+                                      chunk_size=chunk_size, dtype=dtype, rng=seed)
 
 
 if __name__ == "__main__":
@@ -46,11 +65,14 @@ if __name__ == "__main__":
     t, signal = motor.create_motor_vibration(duration_s=5.0, sampling_rate=sampling_rate,
                                              noise_level=noise_level, fault_freqs=fault_freqs_default,
                                              fault_time_s=fault_time_s)
-    # Run windowed FFT and get the magnitudes (incl. normal frequencies)
-    times, freqs, magnitudes = detector.do_fft(t, signal, window_size_s=window_size_s,
-                sampling_rate=sampling_rate, magnitude_threshold=magnitude_threshold)
+    # Run windowed FFT and get the magnitudes (incl. normal frequencies); the spectrogram is computed once
+    # and reused by the plots below (same values as detector.do_fft)
+    spectrogram = Spectrogram.get(signal, sampling_rate, window_size_s=window_size_s, overlap=0.5,
+                                  cache_dir=spectrogram_cache_dir)
+    times, freqs, magnitudes = spectrogram.times, spectrogram.freqs, spectrogram.magnitudes
+    if magnitude_threshold:
+        magnitudes = np.where(magnitudes < magnitude_threshold, 0, magnitudes)
 
-    do_fft_no_hanning
     # anomaly detection (sort out the anomalies)
     anomaly_freqs = detector.detect_anomalies(freqs, normal_freqs, magnitudes)
 
@@ -65,14 +87,22 @@ if __name__ == "__main__":
                 print(f"**Anomaly at {anomaly_freq} Hz**", end=' ')
         print()
 
+    # one alert per fault: the harmonics of a fault frequency belong to the same fault family
+    print("Fault families (fundamental and harmonics):")
+    for family in detector.detect_fault_families(freqs, normal_freqs, magnitudes):
+        print(f"{family.fundamental} Hz: harmonics {family.harmonics} Hz, magnitude {family.magnitude:.2f}, "
+              f"score {family.score:.2f}")
+
     if plot:
         plot_signal(t, signal)  # Raw motor vibration signal
         plot_anomalies(times, freqs, magnitudes, anomaly_freqs)  # Chatter plot for anomaly freqs
-        plot_spectrogram(signal, sampling_rate)  # Spectrogram of motor vibration signal
+        plot_spectrogram(signal, sampling_rate, spectrogram)  # Spectrogram of motor vibration signal
 
         animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=sampling_rate,
                                        step_samples=20, interval_ms=100,
-                                       anomaly_threshold=10.0, min_magnitude=1.0)
+                                       anomaly_threshold=10.0, min_magnitude=0.1,
+                                       spectrogram=Spectrogram.get(signal, sampling_rate, window_size_s=0.5,
+                                                                   step=20, cache_dir=spectrogram_cache_dir))
 
         # Create the monitor and build the plot
         monitor = MotorVibrationMonitor(t, signal, detector, sampling_rate=sampling_rate)
@@ -0,0 +1,181 @@
+import json
+import os
+
+import numpy as np
+from anomaly_detector import AnomalyDetector
+
+
+class RecordingStore:
+    """ Persistent vibration recording: the samples are stored in chunk files of chunk_size raw samples
+        (chunk_000000.dat, ...) that are opened memory-mapped, so a time slice of a multi-GB recording only
+        reads the pages of that slice. A small header (recording.json) holds the sampling rate, dtype,
+        chunk size and the time index: a list of segments [first sample, time of the first sample] -
+        a new segment starts whenever an appended block does not continue the time of the previous one
+        (e.g. after a reconnect of a live stream).
+        Appending only writes the samples to the end of the last chunk file (the number of samples is
+        given by the chunk file sizes); the header is rewritten only for a new segment.
+        One writer, any number of readers (also in other processes).
+    """
+    header_name = 'recording.json'
+
+    def __init__(self, path):
+        """
+        Open an existing recording (see create).
+        Parameters:
+        - path: directory of the recording
+        """
+        self.path = path
+        with open(os.path.join(path, RecordingStore.header_name)) as f:
+            header = json.load(f)
+        self.sampling_rate = header['sampling_rate']
+        self.dtype = np.dtype(header['dtype'])
+        self.chunk_size = header['chunk_size']
+        self.segments = [tuple(segment) for segment in header['segments']]  # (first sample, time in s)
+        self._chunks = {}  # memory maps of the full (read-only) chunks
+        self._last_chunk = 0  # index of the last chunk file (only grows)
+
+    @staticmethod
+    def create(path, sampling_rate, dtype=np.float32, chunk_size=1 << 20, t0=0.0):
+        """
+        Create an empty recording.
+        Parameters:
+        - path: directory of the recording (created, must not contain a recording)
+        - sampling_rate: samples per second
+        - dtype: sample dtype in the files (float32 halves the size of float64)
+        - chunk_size: samples per chunk file
+        - t0: time of the first sample in seconds (if the first append has no t_start)
+        """
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, RecordingStore.header_name)):
+            raise FileExistsError(f"Recording already exists: {path}")
+        RecordingStore._write_header(path, {"sampling_rate": sampling_rate, "dtype": np.dtype(dtype).str,
+                                            "chunk_size": chunk_size, "segments": [[0, t0]]})
+        return RecordingStore(path)
+
+    @staticmethod
+    def _write_header(path, header):
+        tmp_path = os.path.join(path, f"{RecordingStore.header_name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, os.path.join(path, RecordingStore.header_name))  # readers never see a partial header
+
+    def _chunk_path(self, index):
+        return os.path.join(self.path, f"chunk_{index:06d}.dat")
+
+    def __len__(self):
+        while os.path.exists(self._chunk_path(self._last_chunk + 1)):
+            self._last_chunk += 1
+        last_path = self._chunk_path(self._last_chunk)
+        last_size = os.path.getsize(last_path) // self.dtype.itemsize if os.path.exists(last_path) else 0
+        return self._last_chunk * self.chunk_size + last_size
+
+    def __getitem__(self, index):
+        """ Samples of a slice (see read) or one sample, e.g. to process a recording in time slices. """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self.read(start, stop) if step == 1 else self.read()[index]
+        n_samples = len(self)
+        if not -n_samples <= index < n_samples:
+            raise IndexError(f"Sample index {index} out of range")
+        return self.read(index % n_samples, index % n_samples + 1)[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.read(), dtype=dtype)
+
+    @property
+    def duration_s(self):
+        """ Recorded time in seconds (without gaps). """
+        return len(self) / self.sampling_rate
+
+    def append(self, samples, t_start=None):
+        """
+        Append samples (e.g. one chunk of a live stream).
+        Parameters:
+        - samples: 1D array (converted to the dtype of the recording)
+        - t_start: time of the first sample in seconds (None: continues the previous samples), not before
+          the end of the previous samples
+        """
+        samples = np.ascontiguousarray(samples, dtype=self.dtype)
+        n_samples = len(self)
+        if t_start is not None:
+            first, t_first = self.segments[-1]
+            expected = t_first + (n_samples - first) / self.sampling_rate
+            if abs(t_start - expected) > 0.5 / self.sampling_rate:  # gap (or restart): new time segment
+                self.segments = self.segments[:-1] if first == n_samples else self.segments
+                self.segments.append((n_samples, t_start))
+                RecordingStore._write_header(self.path, {"sampling_rate": self.sampling_rate,
+                                                         "dtype": self.dtype.str, "chunk_size": self.chunk_size,
+                                                         "segments": [list(s) for s in self.segments]})
+        written = 0
+        while written < len(samples):
+            index, offset = divmod(n_samples + written, self.chunk_size)
+            count = min(len(samples) - written, self.chunk_size - offset)
+            with open(self._chunk_path(index), 'ab') as f:
+                f.write(samples[written:written + count].tobytes())
+            written += count
+
+    def refresh(self):
+        """ Re-read the time index (reader of a recording that is still written). """
+        with open(os.path.join(self.path, RecordingStore.header_name)) as f:
+            self.segments = [tuple(segment) for segment in json.load(f)['segments']]
+
+    def _chunk(self, index, n_samples):
+        chunk = self._chunks.get(index)
+        if chunk is None:
+            size = min(self.chunk_size, n_samples - index * self.chunk_size)
+            chunk = np.memmap(self._chunk_path(index), dtype=self.dtype, mode='r', shape=(size,))
+            if size == self.chunk_size:  # full chunks do not change any more
+                self._chunks[index] = chunk
+        return chunk
+
+    def read(self, start=0, stop=None):
+        """
+        Samples start..stop-1 (memory-mapped view if they are in one chunk file, otherwise one copy).
+        """
+        n_samples = len(self)
+        start, stop = max(0, start), n_samples if stop is None else min(n_samples, stop)
+        if stop <= start:
+            return np.empty(0, dtype=self.dtype)
+        pieces = []
+        for index in range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1):
+            first = index * self.chunk_size
+            pieces.append(self._chunk(index, n_samples)[max(start, first) - first:min(stop, first + self.chunk_size)
+                                                        - first])
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    def times(self, start, stop):
+        """ Times (s) of the samples start..stop-1 (time index: segments). """
+        firsts = np.array([segment[0] for segment in self.segments])
+        t_firsts = np.array([segment[1] for segment in self.segments])
+        index = np.arange(start, stop)
+        segment = np.searchsorted(firsts, index, side='right') - 1
+        return t_firsts[segment] + (index - firsts[segment]) / self.sampling_rate
+
+    def sample_index(self, t):
+        """ Index of the first sample at or after time t (s). """
+        n_samples = len(self)
+        firsts = [segment[0] for segment in self.segments] + [n_samples]
+        t_firsts = np.array([segment[1] for segment in self.segments])
+        segment = max(0, int(np.searchsorted(t_firsts, t, side='right')) - 1)
+        offset = int(np.ceil((t - t_firsts[segment]) * self.sampling_rate - 1e-6))
+        return int(np.clip(firsts[segment] + max(0, offset), firsts[segment], firsts[segment + 1]))
+
+    def time_slice(self, t_start=None, t_end=None):
+        """
+        Samples with t_start <= t < t_end (None: from the start / to the end of the recording).
+        Returns (t, signal) arrays as simulate_motor_vibration (signal memory-mapped if in one chunk file).
+        """
+        start = 0 if t_start is None else self.sample_index(t_start)
+        stop = len(self) if t_end is None else self.sample_index(t_end)
+        return self.times(start, max(start, stop)), self.read(start, stop)
+
+    def fft(self, t_start=None, t_end=None, window_size_s=0.5, overlap=0.5, detector=None, **kwargs):
+        """
+        Windowed FFT of a time slice (AnomalyDetector.do_fft_batched), e.g. for detect_anomalies on one hour
+        of a long recording. The computation dtype is the dtype of the recording (no copy of float32 samples).
+        Returns times, freqs and magnitudes as do_fft.
+        """
+        t, signal = self.time_slice(t_start, t_end)
+        kwargs.setdefault('dtype', self.dtype)
+        return (detector or AnomalyDetector()).do_fft_batched(t, signal, window_size_s, self.sampling_rate, overlap,
+                                                              **kwargs)
@@ -1,5 +1,10 @@
-from flask import Flask, request, jsonify
-from motor_simulator import simulate_motor_vibration
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from flask import Flask, Response, request, jsonify, stream_with_context
+from motor_simulator import simulate_motor_vibration, simulate_motor_vibration_chunks
+from payload.codec import JSON, encode, encode_frame, negotiate, negotiate_stream
 
 app = Flask(__name__)
 
@@ -12,10 +17,45 @@ def simulate_endpoint():
         noise = float(request.args.get('noise', 0.3))
         fault_time = float(request.args.get('fault_time', 2.5))
         inject_fault = request.args.get('inject_fault', 'true').lower() == 'true'  # bool("false") ➔ evaluates to True in Python
+        seed = request.args.get('seed', type=int)  # optional seed for reproducible noise
 
-        t, signal = simulate_motor_vibration(duration, sampling_rate, noise, fault_time, inject_fault)
+        content_type = negotiate(request)  # JSON (default) or binary format (Accept header or format parameter)
 
-        return jsonify({"vibration": signal})
+        if content_type == JSON:
+            t, signal = simulate_motor_vibration(duration, sampling_rate, noise, fault_time, inject_fault, seed=seed)
+            return jsonify({"vibration": signal})
+
+        t, signal = simulate_motor_vibration(duration, sampling_rate, noise, fault_time, inject_fault, as_array=True,
+                                             seed=seed)
+        return Response(encode(signal, content_type), mimetype=content_type)
+
+    except Exception as e:
+        return jsonify({"status": "Error", "message": str(e)}), 500
+
+
+# Endpoint for simulating motor vibration as a stream of chunks (constant memory, for long simulations)
+@app.route('/simulate/stream', methods=['GET'])
+def simulate_stream_endpoint():
+    try:
+        duration = float(request.args.get('duration', 5.0))
+        sampling_rate = int(request.args.get('sampling_rate', 1000))
+        noise = float(request.args.get('noise', 0.3))
+        fault_time = float(request.args.get('fault_time', 2.5))
+        inject_fault = request.args.get('inject_fault', 'true').lower() == 'true'
+        seed = request.args.get('seed', type=int)
+        chunk_size = int(request.args.get('chunk_size', 10000))  # samples per chunk
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        content_type = negotiate_stream(request)  # NDJSON lines (default) or length-prefixed raw float32 frames
+
+        chunks = simulate_motor_vibration_chunks(duration, sampling_rate, noise, fault_time, inject_fault,
+                                                 chunk_size=chunk_size, dtype=np.float32, seed=seed)
+
+        def generate():
+            for t, signal in chunks:
+                yield encode_frame(signal, content_type)
+
+        return Response(stream_with_context(generate()), mimetype=content_type)
 
     except Exception as e:
         return jsonify({"status": "Error", "message": str(e)}), 500
@@ -38,5 +78,6 @@ def anomaly_endpoint():
         return jsonify({"status": "Error", "message": str(e)}), 500
 
 
+# development server; production: gunicorn -c gunicorn.conf.py simulate_microservice:app
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5003)
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5003)))
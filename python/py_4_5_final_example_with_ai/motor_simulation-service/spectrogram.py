@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+from anomaly_detector import AnomalyDetector
+
+
+class Spectrogram:
+    """ STFT magnitudes of a signal (Hanning window, amplitude scale 2/N as AnomalyDetector.do_fft), computed once
+        per (signal, window size, step) and shared by the plots and the anomaly detection.
+        Spectrogram.get returns the cached object for the same signal and parameters; with a cache directory
+        the magnitudes are also stored as .npy file plus .json metadata and opened memory-mapped
+        the next time (e.g. when the analysis of a recording is opened again).
+    """
+    max_cached = 8  # spectrograms kept in memory
+    _cache = OrderedDict()
+
+    def __init__(self, magnitudes, sampling_rate, window_size, step, t0=0.0, key=None):
+        """
+        Parameters:
+        - magnitudes: 2D array [window index][frequency bin]
+        - sampling_rate: samples per second
+        - window_size: window size in samples
+        - step: samples between two windows
+        - t0: time of the first sample in seconds
+        - key: cache key (signal digest and parameters)
+        """
+        self.magnitudes = magnitudes
+        self.sampling_rate = sampling_rate
+        self.window_size = window_size
+        self.step = step
+        self.t0 = t0
+        self.key = key
+        self.freqs = np.fft.rfftfreq(window_size, d=1 / sampling_rate)
+        self.times = t0 + (np.arange(len(magnitudes)) * step + window_size // 2) / sampling_rate  # window centers
+
+    @staticmethod
+    def compute(signal, sampling_rate, window_size_s=0.5, overlap=0.5, step=None, t0=0.0, dtype=np.float64):
+        """
+        Compute the spectrogram (vectorized STFT, see AnomalyDetector.do_fft_batched).
+        Parameters:
+        - signal: 1D signal
+        - sampling_rate: samples per second
+        - window_size_s: window size in seconds
+        - overlap: fractional overlap between windows (e.g. 0.5 for 50%)
+        - step: samples between two windows (instead of overlap)
+        - t0: time of the first sample in seconds
+        - dtype: dtype of the computation and the magnitudes
+        """
+        window_size = int(window_size_s * sampling_rate)
+        step = step or int(window_size * (1 - overlap))
+        if step <= 0:
+            raise ValueError("Overlap too high; resulting step size <= 0")
+        signal = np.asarray(signal)
+        t = t0 + np.arange(len(signal)) / sampling_rate
+        _, _, magnitudes = AnomalyDetector().do_fft_batched(t, signal, window_size_s, sampling_rate, dtype=dtype,
+                                                            step=step)
+        return Spectrogram(magnitudes, sampling_rate, window_size, step, t0)
+
+    @staticmethod
+    def get(signal, sampling_rate, window_size_s=0.5, overlap=0.5, step=None, t0=0.0, dtype=np.float64,
+            cache_dir=None):
+        """
+        Cached spectrogram of a signal: computed only once per (signal, window size, step, dtype).
+        Parameters: see compute
+        - cache_dir: directory for the .npy/.json files of the spectrogram (optional)
+        """
+        signal = np.ascontiguousarray(signal)
+        window_size = int(window_size_s * sampling_rate)
+        step = step or int(window_size * (1 - overlap))
+        digest = hashlib.blake2b(signal.view(np.uint8), digest_size=12)
+        digest.update(f"{signal.dtype}|{sampling_rate}|{t0}".encode())
+        key = f"{digest.hexdigest()}-{window_size}-{step}-{np.dtype(dtype).name}"
+
+        spectrogram = Spectrogram._cache.pop(key, None)
+        if spectrogram is None and cache_dir is not None and os.path.exists(os.path.join(cache_dir, f"{key}.json")):
+            spectrogram = Spectrogram.load(os.path.join(cache_dir, f"{key}.npy"))
+        if spectrogram is None:
+            spectrogram = Spectrogram.compute(signal, sampling_rate, window_size_s, step=step, t0=t0, dtype=dtype)
+            spectrogram.key = key
+            if cache_dir is not None:
+                spectrogram.save(cache_dir)
+        Spectrogram._cache[key] = spectrogram  # most recently used last
+        while len(Spectrogram._cache) > Spectrogram.max_cached:
+            Spectrogram._cache.popitem(last=False)
+        return spectrogram
+
+    def save(self, directory, name=None):
+        """
+        Save the magnitudes as <name>.npy and the parameters as <name>.json (default name: cache key).
+        Returns the path of the .npy file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name or self.key or 'spectrogram'}")
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, np.asarray(self.magnitudes))
+        os.replace(tmp_path, f"{path}.npy")  # the metadata is written last: a .json means a complete .npy
+        with open(f"{path}.tmp.json", 'w') as f:
+            json.dump({"sampling_rate": self.sampling_rate, "window_size": self.window_size, "step": self.step,
+                       "t0": self.t0, "key": self.key, "shape": list(np.shape(self.magnitudes))}, f)
+        os.replace(f"{path}.tmp.json", f"{path}.json")  # get() never loads a partially written .json
+        return f"{path}.npy"
+
+    @staticmethod
+    def load(path):
+        """ Open a saved spectrogram (.npy path) memory-mapped: only the accessed windows are read. """
+        with open(path[:-len('.npy')] + '.json') as f:
+            meta = json.load(f)
+        return Spectrogram(np.load(path, mmap_mode='r'), meta['sampling_rate'], meta['window_size'], meta['step'],
+                           meta['t0'], meta['key'])
+
+    @property
+    def window_size_s(self):
+        return self.window_size / self.sampling_rate
+
@@ -0,0 +1,85 @@
+from collections import namedtuple
+
+import numpy as np
+from anomaly_detector import hanning_window
+
+# One analysed window: center time (s), FFT magnitudes (same bins as analyzer.freqs) and detection verdict
+SpectrumFrame = namedtuple('SpectrumFrame', ['time', 'magnitudes', 'anomaly'])
+
+
+class StreamingSpectrumAnalyzer:
+    """ Stateful spectrum analyzer for continuously streamed vibration samples.
+        Only one window plus one hop of samples is kept (ring buffer), so memory is constant
+        regardless of how long the stream runs. The frames are identical to AnomalyDetector.do_fft
+        for the same signal, window size and overlap.
+    """
+
+    def __init__(self, detector, sampling_rate=1000, window_size_s=0.5, overlap=0.5, magnitude_threshold=None, t0=0.0):
+        """
+        Parameters:
+        - detector: AnomalyDetector used for the verdict (detect_) of each frame
+        - sampling_rate: samples per second
+        - window_size_s: window size in seconds
+        - overlap: fractional overlap between windows (e.g. 0.5 for 50%)
+        - magnitude_threshold: optional minimum magnitude (smaller magnitudes are set to 0)
+        - t0: time of the first sample in seconds
+        """
+        self.detector = detector
+        self.sampling_rate = sampling_rate
+        self.window_size = int(window_size_s * sampling_rate)
+        self.step = int(self.window_size * (1 - overlap))
+        if self.step <= 0:
+            raise ValueError("Overlap too high; resulting step size <= 0")
+        self.magnitude_threshold = magnitude_threshold
+        self.t0 = t0
+        self.freqs = np.fft.rfftfreq(self.window_size, d=1 / sampling_rate)
+        self._window = hanning_window(self.window_size)
+        self._buffer = np.zeros(self.window_size + self.step)  # ring buffer: one window plus one hop
+        self.reset()
+
+    def reset(self):
+        """ Forget all buffered samples (e.g. after a sensor reconnect). """
+        self._buffer[:] = 0
+        self._pos = 0  # next write index in the ring buffer
+        self.n_samples = 0  # total number of samples pushed so far
+        self._next_frame_end = self.window_size  # sample count at which the next frame is complete
+
+    def push(self, samples):
+        """
+        Add new samples to the stream.
+        Parameters:
+        - samples: 1D array (or list) of new samples, any length
+        Returns:
+        - list of SpectrumFrame, one for each hop completed by these samples (may be empty)
+        """
+        samples = np.asarray(samples, dtype=self._buffer.dtype).ravel()
+        frames = []
+        offset = 0
+        while offset < len(samples):
+            n = min(len(samples) - offset, self._next_frame_end - self.n_samples)
+            self._write(samples[offset:offset + n])
+            offset += n
+            if self.n_samples == self._next_frame_end:
+                frames.append(self._analyse())
+                self._next_frame_end += self.step
+        return frames
+
+    def _write(self, samples):
+        """ Copy samples (at most window + hop) into the ring buffer. """
+        capacity = len(self._buffer)
+        first = min(len(samples), capacity - self._pos)
+        self._buffer[self._pos:self._pos + first] = samples[:first]
+        self._buffer[:len(samples) - first] = samples[first:]
+        self._pos = (self._pos + len(samples)) % capacity
+        self.n_samples += len(samples)
+
+    def _analyse(self):
+        """ FFT and anomaly verdict for the latest complete window. """
+        window_signal = self._buffer.take(np.arange(self._pos - self.window_size, self._pos), mode='wrap')
+        magnitude = (2.0 / self.window_size) * np.abs(np.fft.rfft(window_signal * self._window))
+        if self.magnitude_threshold is not None:
+            magnitude[magnitude < self.magnitude_threshold] = 0
+
+        start = self.n_samples - self.window_size
+        t_center = self.t0 + (start + self.window_size // 2) / self.sampling_rate
+        return SpectrumFrame(t_center, magnitude, self.detector.detect_(self.freqs, magnitude))
@@ -1,18 +1,21 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import animation
-from scipy.signal import spectrogram
+from lod import MinMaxLine
+from spectrogram import Spectrogram
 
 
 # Plot time-domain signal
 def plot_signal(t,  signal):
     """    Plot the time-domain signal of motor vibration.
+    Only the min/max samples per pixel are plotted and selected again on zoom/pan (see lod.py),
+    so long recordings stay interactive.
     Parameters:
     - t: 1D array of time values
     - signal: 1D array of signal values
     """
     fig = plt.figure(figsize=(12,4))
-    plt.plot(t, signal)
+    fig.signal_line = MinMaxLine(plt.gca(), t, signal)  # kept with the figure (zoom/pan callback)
     plt.title("Raw Data for Simulated Motor Vibration with Noise (Time Domain)")
     plt.xlabel("Time (s)")
     plt.ylabel("Vibration amplitude")
@@ -63,33 +66,36 @@ def plot_anomalies(times, freqs, magnitudes, anomaly_freqs, tolerance=1.0):
 
 
 # Plot spectrogram for normal frequency and frequency anomalies
-def plot_spectrogram(signal, sampling_rate):
+def plot_spectrogram(signal, sampling_rate, spectrogram=None, freq_max=120):
     """
     Plot spectrogram of a signal
     Parameters:
     - signal: 1D array of signal values
     - sampling_rate: sampling rate of the signal in Hz
+    - spectrogram: Spectrogram of the signal (default: cached spectrogram, 500 samples window, 50% overlap)
+    - freq_max: highest frequency shown (Hz)
     """
-    signal = np.array(signal)
-    f, t, Sxx = spectrogram(signal, fs=sampling_rate, window='hann',
-                            nperseg=500, noverlap=250, scaling='spectrum', mode='magnitude')
+    if spectrogram is None:
+        spectrogram = Spectrogram.get(signal, sampling_rate, window_size_s=500 / sampling_rate, overlap=0.5)
+    bins = spectrogram.freqs <= freq_max  # Focus on interesting range
 
     fig = plt.figure(figsize=(12, 6))
     fig.canvas.manager.set_window_title("Spectrogram")
-    plt.pcolormesh(t, f, Sxx, shading='gouraud')
+    plt.pcolormesh(spectrogram.times, spectrogram.freqs[bins], spectrogram.magnitudes[:, bins].T, shading='gouraud')
     plt.colorbar(label="Magnitude")
     plt.title("Spectrogram of Motor Vibration")
     plt.ylabel('Frequency (Hz)')
     plt.xlabel('Time (s)')
-    plt.ylim(0, 120)  # Focus on interesting range
     plt.grid()
     plt.show()
 
 # Animation function
 def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1000,
-                                   step_samples=20, interval_ms=100, anomaly_threshold=5.0, min_magnitude=0.5):
+                                   step_samples=20, interval_ms=100, anomaly_threshold=5.0, min_magnitude=0.05,
+                                   spectrogram=None):
     """
-    Animate a moving window over a signal and display its FFT.
+    Animate a moving window over a signal and display its FFT (magnitudes of the cached Spectrogram,
+    i.e. Hanning window and amplitude scale as AnomalyDetector.do_fft).
     smaller steps = slower animation
     Parameters:
     - t: 1D array of time values
@@ -100,8 +106,12 @@ def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1
     - interval_ms: time interval between frames in milliseconds (slower frame rate)
     - anomaly_threshold: threshold for detecting anomalies in FFT magnitude
     - min_magnitude: minimum magnitude (ignore tiny noise)
+    - spectrogram: Spectrogram of the signal with window_size_s and step_samples (default: cached spectrogram)
     """
-    window_size = int(window_size_s * sampling_rate)
+    if spectrogram is None:
+        spectrogram = Spectrogram.get(signal, sampling_rate, window_size_s, step=step_samples, t0=t[0])
+    window_size = spectrogram.window_size
+    step_samples = spectrogram.step
 
     fig, (ax_signal, ax_fft) = plt.subplots(2, 1, figsize=(12, 8))
     fig.canvas.manager.set_window_title("Animation of Moving Window with FFT")
@@ -115,7 +125,7 @@ def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1
     ax_signal.set_title("Motor Vibration - Moving Time Window")
     ax_signal.grid()
 
-    ax_signal.plot(t, signal, color='lightgray')
+    fig.signal_line = MinMaxLine(ax_signal, t, signal, color='lightgray')
     window_line, = ax_signal.plot([], [], color='red', linewidth=2)
 
     warning_text = ax_signal.text(0.5, 0.9, "FAULT DETECTED!", color='red',
@@ -123,10 +133,9 @@ def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1
                                   transform=ax_signal.transAxes, visible=False)
 
     # Bottom plot: FFT
-    fft_freqs = np.fft.fftfreq(window_size, d=1/sampling_rate)
-    positive_freqs = fft_freqs[:window_size//2]
+    positive_freqs = spectrogram.freqs
     ax_fft.set_xlim(0, 200)
-    ax_fft.set_ylim(0, None)
+    ax_fft.set_ylim(0, np.max(spectrogram.magnitudes) * 1.1)
     ax_fft.set_xlabel("Frequency (Hz)")
     ax_fft.set_ylabel("Magnitude")
     ax_fft.set_title("FFT of Current Window")
@@ -136,18 +145,14 @@ def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1
     anomaly_points = ax_fft.scatter([], [], color='red')
 
     def update(frame):
-        start = frame
+        start = frame * step_samples
         end = start + window_size
-        if end >= len(signal):
-            start = len(signal) - window_size
-            end = len(signal)
 
         window_t = t[start:end]
         window_signal = signal[start:end]
         window_line.set_data(window_t, window_signal)
 
-        fft_vals = np.fft.fft(window_signal)
-        magnitude = np.abs(fft_vals)[:window_size//2]
+        magnitude = spectrogram.magnitudes[frame]
 
         fft_line.set_data(positive_freqs, magnitude)
 
@@ -163,7 +168,6 @@ def animate_moving_window_with_fft(t, signal, window_size_s=0.5, sampling_rate=1
 
         return window_line, fft_line, anomaly_points, warning_text
 
-    n_frames = (len(signal) - window_size) // step_samples
-    ani = animation.FuncAnimation(fig, update, frames=np.arange(0, n_frames * step_samples, step_samples),
+    ani = animation.FuncAnimation(fig, update, frames=len(spectrogram.magnitudes),
                                   interval=interval_ms, blit=False, repeat=True)
     plt.show()
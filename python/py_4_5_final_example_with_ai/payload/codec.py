@@ -0,0 +1,173 @@
+# codec.py
+"""
+Encoding and decoding of vibration signals for the microservices (content negotiation).
+The signal can be exchanged in one of these formats (content types):
+- application/json: {"vibration": [...]} as before (default and fallback)
+- application/octet-stream: raw little-endian float32 samples with a small header
+  (4 bytes magic b'VIB1' + uint32 little-endian number of samples)
+- application/x-npy: numpy .npy file (any float dtype, 1D)
+- application/msgpack: {"vibration": <raw little-endian float32 bytes>} (requires msgpack)
+Streams (e.g. /simulate/stream) consist of chunks (frames), either
+- application/x-ndjson: one JSON line {"vibration": [...]} per chunk (default), or
+- application/octet-stream: one raw payload (header + float32 samples) per chunk, i.e. length-prefixed frames
+"""
+import io
+import json
+import struct
+import numpy as np
+from werkzeug.exceptions import UnsupportedMediaType
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+
+JSON = 'application/json'
+RAW = 'application/octet-stream'
+NPY = 'application/x-npy'
+MSGPACK = 'application/msgpack'
+NDJSON = 'application/x-ndjson'
+
+RAW_MAGIC = b'VIB1'
+RAW_HEADER = struct.Struct('<4sI')  # magic, number of samples
+RAW_DTYPE = np.dtype('<f4')
+
+# short names for the format query parameter, e.g. /simulate?format=raw
+FORMATS = {'json': JSON, 'raw': RAW, 'npy': NPY, 'msgpack': MSGPACK}
+
+
+def supported_content_types():
+    """ Content types that can be encoded/decoded (JSON first = preferred default). """
+    content_types = [JSON, RAW, NPY]
+    if msgpack is not None:
+        content_types.append(MSGPACK)
+    return content_types
+
+
+def encode(signal, content_type=JSON):
+    """
+    Encode a 1D signal.
+    :param signal: list or numpy array of samples
+    :param content_type: one of the supported content types
+    :return: body (bytes)
+    """
+    if content_type == JSON:
+        return json.dumps({"vibration": np.asarray(signal, dtype=float).tolist()}).encode()
+    if content_type == RAW:
+        samples = np.asarray(signal, dtype=RAW_DTYPE)
+        return RAW_HEADER.pack(RAW_MAGIC, len(samples)) + samples.tobytes()
+    if content_type == NPY:
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(signal), allow_pickle=False)
+        return buffer.getvalue()
+    if content_type == MSGPACK and msgpack is not None:
+        return msgpack.packb({"vibration": np.asarray(signal, dtype=RAW_DTYPE).tobytes()})
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def decode(body, content_type=JSON):
+    """
+    Decode a body created by encode (or any JSON {"vibration": [...]}).
+    :param body: bytes
+    :param content_type: content type of the body (parameters like charset are ignored)
+    :return: 1D numpy array of samples (float32 for raw/msgpack, float64 for JSON)
+    """
+    content_type = (content_type or JSON).split(';')[0].strip().lower()
+    if content_type == JSON:
+        return np.array(json.loads(body)['vibration'], dtype=float)
+    if content_type == RAW:
+        if len(body) < RAW_HEADER.size:
+            raise ValueError("Raw payload too short")
+        magic, n_samples = RAW_HEADER.unpack_from(body)
+        if magic != RAW_MAGIC or len(body) != RAW_HEADER.size + n_samples * RAW_DTYPE.itemsize:
+            raise ValueError("Invalid raw payload (wrong header or length)")
+        return np.frombuffer(body, dtype=RAW_DTYPE, offset=RAW_HEADER.size)
+    if content_type == NPY:
+        return np.load(io.BytesIO(body), allow_pickle=False).ravel()
+    if content_type == MSGPACK and msgpack is not None:
+        vibration = msgpack.unpackb(body)['vibration']
+        if isinstance(vibration, bytes):
+            return np.frombuffer(vibration, dtype=RAW_DTYPE)
+        return np.array(vibration, dtype=float)
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def read_vibration(request):
+    """
+    Read the vibration signal from a Flask request (any supported content type).
+    :param request: Flask request
+    :return: 1D numpy array of samples
+    :raises UnsupportedMediaType: content type not supported (e.g. msgpack without the msgpack package), 415
+    """
+    if request.mimetype in supported_content_types() and request.mimetype != JSON:
+        return decode(request.get_data(), request.mimetype)
+    if not request.is_json:
+        raise UnsupportedMediaType(f"Unsupported content type: {request.mimetype or 'none'} "
+                                   f"(supported: {', '.join(supported_content_types())})")
+    return np.array(request.get_json()['vibration'])
+
+
+def negotiate(request):
+    """
+    Select the response content type for a Flask request: the format query parameter (json, raw, npy, msgpack)
+    wins, otherwise the best match of the Accept header; JSON is the fallback.
+    """
+    content_types = supported_content_types()
+    requested = FORMATS.get(request.args.get('format', '').lower())
+    if requested in content_types:
+        return requested
+    return request.accept_mimetypes.best_match(content_types, default=JSON)
+
+
+def encode_frame(signal, content_type=NDJSON):
+    """
+    Encode one chunk of a signal stream.
+    :param signal: list or numpy array of samples
+    :param content_type: NDJSON or RAW
+    :return: frame (bytes)
+    """
+    if content_type == NDJSON:
+        return encode(signal, JSON) + b'\n'
+    if content_type == RAW:
+        return encode(signal, RAW)
+    raise ValueError(f"Unsupported stream content type: {content_type}")
+
+
+def iter_frames(stream, content_type=NDJSON):
+    """
+    Decode a signal stream chunk by chunk (e.g. from the raw response of requests.get(..., stream=True)).
+    :param stream: binary file-like object
+    :param content_type: NDJSON or RAW
+    :return: generator of 1D numpy arrays, one per chunk
+    """
+    content_type = content_type.split(';')[0].strip().lower()
+    if content_type == NDJSON:
+        for line in stream:
+            if line.strip():
+                yield decode(line, JSON)
+    elif content_type == RAW:
+        while True:
+            header = stream.read(RAW_HEADER.size)
+            if not header:
+                return
+            if len(header) < RAW_HEADER.size:
+                raise ValueError("Truncated frame header")
+            magic, n_samples = RAW_HEADER.unpack(header)
+            if magic != RAW_MAGIC:
+                raise ValueError("Invalid frame header")
+            data = stream.read(n_samples * RAW_DTYPE.itemsize)
+            if len(data) < n_samples * RAW_DTYPE.itemsize:
+                raise ValueError("Truncated frame")
+            yield np.frombuffer(data, dtype=RAW_DTYPE)
+    else:
+        raise ValueError(f"Unsupported stream content type: {content_type}")
+
+
+def negotiate_stream(request):
+    """
+    Select the content type of a streamed response: RAW frames if requested by the format parameter (raw)
+    or the Accept header, otherwise NDJSON.
+    """
+    if request.args.get('format', '').lower() == 'raw':
+        return RAW
+    return request.accept_mimetypes.best_match([NDJSON, RAW], default=NDJSON)
@@ -0,0 +1,179 @@
+# test_anomaly_detector.py
+"""
+Unit tests for the FFT based anomaly detector (motor simulation service)
+"""
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector, decimation_factor
+
+sampling_rate = 1000
+
+
+@pytest.fixture
+def vibration():
+    """ 5 s test signal with normal frequencies (25, 67 Hz) and a fault (45 Hz) after 2.5 s """
+    t = np.arange(5 * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + np.sin(2 * np.pi * 67 * t) + 0.7 * np.sin(2 * np.pi * 45 * t) * (t >= 2.5)
+    signal += 0.3 * np.random.default_rng(42).normal(size=t.shape)
+    return t, signal
+
+
+@pytest.mark.parametrize("magnitude_threshold", [None, 0.2])
+def test_do_fft_batched_matches_loop(vibration, magnitude_threshold):
+    t, signal = vibration
+    detector = AnomalyDetector()
+    expected = detector.do_fft(t, signal, window_size_s=0.5, sampling_rate=sampling_rate,
+                               magnitude_threshold=magnitude_threshold)
+    result = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate,
+                                     magnitude_threshold=magnitude_threshold, frames_per_batch=4)
+    for e, r in zip(expected, result):
+        np.testing.assert_allclose(r, e)
+
+
+def test_do_fft_batched_float32(vibration):
+    t, signal = vibration
+    detector = AnomalyDetector()
+    _, _, expected = detector.do_fft(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    _, _, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate,
+                                               dtype=np.float32)
+    assert magnitudes.dtype == np.float32
+    np.testing.assert_allclose(magnitudes, expected, atol=1e-5)
+
+
+def test_do_fft_batched_short_signal():
+    detector = AnomalyDetector()
+    times, freqs, magnitudes = detector.do_fft_batched(np.arange(10), np.zeros(10), window_size_s=0.5)
+    assert len(times) == 0
+    assert magnitudes.shape == (0, len(freqs))
+
+
+def test_do_fft_batched_step(vibration):
+    t, signal = vibration
+    detector = AnomalyDetector()
+    times, _, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    step_times, _, step_magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5,
+                                                             sampling_rate=sampling_rate, step=20)
+    assert len(step_times) == (len(signal) - 500) // 20 + 1
+    np.testing.assert_allclose(step_times[::25], times[::2])  # every 25th window starts at a multiple of 500
+    np.testing.assert_allclose(step_magnitudes[::25], magnitudes[::2])
+
+
+def test_do_fft_batched_decimated(vibration):
+    t, signal = vibration
+    signal = signal + 0.5 * np.sin(2 * np.pi * 150 * t)  # above max_freq: must not alias to 50 Hz
+    detector = AnomalyDetector()
+    times, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    dec_times, dec_freqs, dec_magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5,
+                                                                   sampling_rate=sampling_rate, max_freq=90)
+    assert decimation_factor(sampling_rate, 90, 500, 250) == 5 and dec_magnitudes.shape == (len(times), 51)
+    np.testing.assert_allclose(dec_times, times)
+    np.testing.assert_allclose(dec_freqs, freqs[:51])  # same resolution, bins up to 100 Hz
+    kept = dec_freqs <= 90
+    np.testing.assert_allclose(dec_magnitudes[1:-1, kept], magnitudes[1:-1, :51][:, kept], atol=5e-3)
+    assert detector.detect_anomalies(dec_freqs, [25, 67], dec_magnitudes) == [45.0]
+
+    t_dec, decimated, rate, factor = detector.decimate(t, np.vstack([signal, signal]), sampling_rate, 90)
+    assert (rate, factor) == (200, 5) and decimated.shape == (2, 1000)
+    np.testing.assert_array_equal(t_dec, t[::5])
+    assert detector.decimate(t, signal, sampling_rate, 450)[3] == 1  # nothing to decimate
+
+
+def test_multichannel_matches_single_channel(vibration):
+    t, signal = vibration
+    fault = np.sin(2 * np.pi * 80 * t) * (t >= 2.5)
+    channels = np.stack([signal, signal + fault, 0.5 * signal])
+    detector = AnomalyDetector()
+    times, freqs, magnitudes = detector.do_fft_batched(t, channels, window_size_s=0.5, sampling_rate=sampling_rate,
+                                                       frames_per_batch=7)
+    assert magnitudes.shape[0] == 3
+    for c in range(3):
+        expected_times, _, expected = detector.do_fft(t, channels[c], window_size_s=0.5, sampling_rate=sampling_rate)
+        np.testing.assert_allclose(times, expected_times)
+        np.testing.assert_allclose(magnitudes[c], expected)
+
+    normal_freqs = [25, 67]
+    table = detector.detect_anomalies_multichannel(freqs, normal_freqs, magnitudes, threshold_ratio=0.3)
+    for c in range(3):
+        expected = detector.detect_anomalies(freqs, normal_freqs, magnitudes[c], threshold_ratio=0.3)
+        assert table['frequency'][table['motor'] == c].tolist() == expected
+    assert 80.0 in table['frequency'][table['motor'] == 1]
+
+
+def detect_anomalies_loop(freqs, normal_freqs, magnitudes, threshold_ratio=0.5, tolerance=3.0, group_distance=3.0):
+    """ Reference: the original loop implementation of AnomalyDetector.detect_anomalies """
+    strong_freqs = freqs[np.max(magnitudes, axis=0) > threshold_ratio * np.max(magnitudes)]
+    if len(strong_freqs) == 0:
+        return []
+    strong_freqs = np.sort(strong_freqs)
+    groups = []
+    current_group = [strong_freqs[0]]
+    for f in strong_freqs[1:]:
+        if abs(f - current_group[-1]) <= group_distance:
+            current_group.append(f)
+        else:
+            groups.append(current_group)
+            current_group = [f]
+    groups.append(current_group)
+    detected = [round(np.mean(g), 1) for g in groups]
+    return [f for f in detected if all(abs(f - nf) > tolerance for nf in normal_freqs)]
+
+
+@pytest.mark.parametrize("threshold_ratio", [0.05, 0.2, 0.5])
+def test_detect_anomalies_matches_loop(vibration, threshold_ratio):
+    t, signal = vibration
+    detector = AnomalyDetector()
+    _, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    expected = detect_anomalies_loop(freqs, [25, 67], magnitudes, threshold_ratio=threshold_ratio)
+    assert detector.detect_anomalies(freqs, [25, 67], magnitudes, threshold_ratio=threshold_ratio) == expected
+    assert detector.detect_anomalies(freqs, [], np.zeros_like(magnitudes) - 1) == []
+
+
+def test_detect_anomalies_per_frame(vibration):
+    t, signal = vibration
+    detector = AnomalyDetector()
+    times, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    table = detector.detect_anomalies_per_frame(freqs, [25, 67], magnitudes, threshold_ratio=0.3)
+    assert set(table['frequency']) == {45.0}
+    assert np.all(times[table['frame']] >= 2.5)  # fault starts at 2.5 s
+    for frame in np.unique(table['frame']):
+        expected = detect_anomalies_loop(freqs, [25, 67], magnitudes[frame:frame + 1],
+                                         threshold_ratio=0.3 * np.max(magnitudes) / np.max(magnitudes[frame]))
+        assert table['frequency'][table['frame'] == frame].tolist() == expected
+
+
+def test_detect_fault_families():
+    t = np.arange(5 * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + np.sin(2 * np.pi * 67 * t) + 0.5 * np.sin(2 * np.pi * 50 * t)  # normal
+    fault = 0.8 * np.sin(2 * np.pi * 43 * t) + 0.5 * np.sin(2 * np.pi * 86 * t) + 0.3 * np.sin(2 * np.pi * 129 * t)
+    signal += (fault + 0.6 * np.sin(2 * np.pi * 111 * t)) * (t >= 2.5)  # second, independent fault at 111 Hz
+    signal += 0.3 * np.random.default_rng(0).normal(size=t.shape)
+    detector = AnomalyDetector()
+    _, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+
+    families = detector.detect_fault_families(freqs, [25, 67], magnitudes, threshold_ratio=0.2)
+    assert [(family.fundamental, family.harmonics) for family in families] == [(43.0, [86.0, 129.0]), (111.0, [])]
+    assert families[0].score > families[1].score and families[0].magnitude > families[1].magnitude
+    assert len(detector.detect_anomalies(freqs, [25, 67], magnitudes, threshold_ratio=0.2)) > len(families)
+    assert detector.detect_fault_families(freqs, [25, 50, 67], magnitudes[:4], threshold_ratio=0.2) == []
+
+
+def test_fault_families_keep_close_faults_apart(vibration):
+    t, signal = vibration
+    signal = signal + 0.7 * np.sin(2 * np.pi * 89 * t) * (t >= 2.5)  # 89 Hz is not the 2nd harmonic of 45 Hz
+    detector = AnomalyDetector()
+    _, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    families = detector.detect_fault_families(freqs, [25, 67], magnitudes, threshold_ratio=0.3)
+    assert sorted((family.fundamental, family.harmonics) for family in families) == [(45.0, []), (89.0, [])]
+
+
+def test_snap_to_nearest():
+    detector = AnomalyDetector()
+    freqs = np.fft.rfftfreq(500, d=1 / sampling_rate)
+    targets = [13, 44.9, 45.2, 1000, -20, 0.9, 499]
+    expected = sorted({round(freqs[np.argmin(np.abs(freqs - f))], 2) for f in targets
+                       if abs(freqs[np.argmin(np.abs(freqs - f))] - f) <= 5.0})
+    assert detector.snap_to_nearest(freqs, targets) == expected
+    assert detector.snap_to_nearest(freqs[::-1], [45.2], tolerance=0.1) == []
@@ -0,0 +1,88 @@
+# test_autoencoder.py
+"""
+Unit tests for the PyTorch autoencoder
+"""
+import os
+import sys
+import numpy as np
+import pytest
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.spectral_autoencoder import SpectralAutoencoder, spectral_features
+
+
+@pytest.fixture
+def signal():
+    t = np.arange(2000) / 1000
+    return (np.sin(2 * np.pi * 25 * t) + np.sin(2 * np.pi * 67 * t)).reshape(-1, 1).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Autoencoder, 'model_base_dir', str(tmp_path))
+    monkeypatch.setattr(Autoencoder, 'model_path', str(tmp_path / Autoencoder.model_name))
+    monkeypatch.setattr(SpectralAutoencoder, 'model_base_dir', str(tmp_path))
+    return tmp_path
+
+
+def test_train_fast_reduces_loss(signal):
+    torch.manual_seed(0)
+    autoencoder = Autoencoder()
+    x = torch.from_numpy(signal)
+    with torch.inference_mode():
+        initial_loss = torch.nn.functional.mse_loss(autoencoder(x), x).item()
+    loss = autoencoder.train_fast(signal)
+    assert loss < initial_loss / 10
+
+
+def test_train_fast_stops_early(signal, monkeypatch):
+    monkeypatch.setattr(Autoencoder, 'fast_patience', 1)
+    monkeypatch.setattr(Autoencoder, 'fast_min_delta', 0.99)  # no epoch can improve by 99 % -> stop after 2 epochs
+    calls = []
+    autoencoder = Autoencoder()
+    forward = autoencoder.forward
+    monkeypatch.setattr(autoencoder, 'forward', lambda x: calls.append(len(x)) or forward(x))
+    autoencoder.train_fast(signal)
+    assert sum(calls) == 2 * len(signal)
+
+
+def test_spectral_features_match_fft(signal):
+    features = spectral_features(signal, window_size=500, step=100)
+    assert features.shape == (16, 251)
+    frame = signal[300:800, 0] * np.hanning(500)
+    np.testing.assert_allclose(features[3], 2 / 500 * np.abs(np.fft.rfft(frame)), atol=1e-5)
+
+
+def test_spectral_autoencoder_detects_new_frequency(signal, monkeypatch):
+    monkeypatch.setattr(SpectralAutoencoder, 'epochs', 100)
+    torch.manual_seed(0)
+    autoencoder = SpectralAutoencoder()
+    autoencoder.train(signal)
+    version = autoencoder.save_model()
+    loaded = SpectralAutoencoder()
+    assert loaded.load_model() == version
+
+    t = np.arange(2000) / 1000
+    faulty = signal[:, 0] + np.sin(2 * np.pi * 180 * t).astype(np.float32)
+    normal_errors = loaded.reconstruction_errors(loaded.features(signal))
+    faulty_errors = loaded.reconstruction_errors(loaded.features(faulty))
+    assert normal_errors.max() < SpectralAutoencoder.error_threshold < faulty_errors.min()
+
+
+def test_save_and_load_versions(signal):
+    autoencoder = Autoencoder()
+    torch.save(autoencoder.state_dict(), Autoencoder.model_path)  # model file saved before the registry
+    legacy = Autoencoder()
+    assert legacy.load_model() is None
+    assert torch.equal(legacy.encoder[0].weight, autoencoder.encoder[0].weight)
+
+    first = autoencoder.save_model({"loss": 0.5})
+    with torch.no_grad():
+        autoencoder.encoder[0].weight.add_(1.0)
+    second = autoencoder.save_model({"loss": 0.1})
+    loaded = Autoencoder()
+    assert loaded.load_model() == second
+    assert torch.equal(loaded.encoder[0].weight, autoencoder.encoder[0].weight)
+    assert loaded.load_model(first) == first
+    assert not torch.equal(loaded.encoder[0].weight, autoencoder.encoder[0].weight)
@@ -0,0 +1,62 @@
+# test_baseline.py
+"""
+Unit tests for the loss baseline statistics (autoencoder/baseline.py) and the baseline threshold of detect()
+"""
+import os
+import sys
+import numpy as np
+import pytest
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'detect_service')))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.baseline import LossBaseline, load_baseline, save_baseline
+
+
+@pytest.fixture
+def losses():
+    return np.random.default_rng(0).lognormal(-10, 1.5, 20000)
+
+
+def test_moments_and_quantiles(losses):
+    baseline = LossBaseline()
+    for chunk in np.array_split(losses, 7):
+        baseline.update(chunk)
+    assert baseline.count == len(losses)
+    assert baseline.mean == pytest.approx(losses.mean(), rel=1e-9)
+    assert baseline.std == pytest.approx(losses.std(ddof=1), rel=1e-9)
+    for q in (0.5, 0.99, 0.999):
+        assert baseline.quantile(q) == pytest.approx(np.quantile(losses, q), rel=2 * LossBaseline.relative_accuracy)
+    assert baseline.threshold(k=3.0) == pytest.approx(losses.mean() + 3 * losses.std(ddof=1))
+    assert baseline.threshold(quantile=0.99) == baseline.quantile(0.99)
+
+
+def test_merge_and_serialization(losses):
+    merged = LossBaseline().update(losses[:5000]).merge(LossBaseline().update(np.append(losses[5000:], 0.0)))
+    single = LossBaseline().update(np.append(losses, 0.0))
+    restored = LossBaseline.from_dict(merged.to_dict())
+    for baseline in (merged, restored):
+        assert baseline.count == single.count and baseline.zero_count == 1
+        assert baseline.mean == pytest.approx(single.mean) and baseline.std == pytest.approx(single.std)
+        np.testing.assert_array_equal(baseline.counts, single.counts)
+
+
+def test_detect_uses_stored_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr(Autoencoder, 'model_base_dir', str(tmp_path))
+    import detect_microservice
+    monkeypatch.setattr(detect_microservice, 'threshold_mode', 'baseline')
+    torch.manual_seed(0)
+    version = Autoencoder().save_model()
+    registry = Autoencoder.registry()
+    assert load_baseline(registry) is None
+    save_baseline(registry, version, LossBaseline().update(np.full(100, 0.5)))  # threshold 0.5
+    for watcher in (detect_microservice.model_watcher, detect_microservice.baseline_watcher):
+        watcher.check()  # what the watcher thread does every check_interval_s
+
+    signal = np.zeros(1000)
+    signal[[10, 500]] = 100.0
+    anomalies, losses, threshold, _ = detect_microservice.detect({"vibration": signal})
+    assert threshold == pytest.approx(0.5)
+    assert anomalies.tolist() == [10, 500]
+    normal_only = detect_microservice.detect({"vibration": signal[:10]})  # threshold does not depend on the request
+    assert len(normal_only[0]) == 0 and normal_only[2] == threshold
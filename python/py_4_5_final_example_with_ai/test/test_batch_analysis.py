@@ -0,0 +1,88 @@
+# test_batch_analysis.py
+"""
+Unit tests for the offline batch analysis of recorded vibration files
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from batch_analysis import analyze_recordings, fft_in_slices, find_recordings, load_report, read_recording, save_report
+from payload.codec import RAW, encode
+from recording_store import RecordingStore
+
+sampling_rate = 1000
+
+
+def make_signal(duration_s=10, seed=0):
+    t = np.arange(duration_s * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + np.sin(2 * np.pi * 67 * t) + 0.7 * np.sin(2 * np.pi * 45 * t) * (t >= 5)
+    return t, signal + 0.3 * np.random.default_rng(seed).normal(size=t.shape)
+
+
+def write_recordings(directory):
+    t, signal = make_signal()
+    np.save(directory / 'motor1.npy', signal)
+    np.savetxt(directory / 'motor2.csv', np.column_stack([t, signal]), delimiter=',', header='t,vibration',
+               comments='')
+    (directory / 'motor3.bin').write_bytes(encode(signal, RAW))
+    signal.astype('<f4').tofile(directory / 'motor4.raw')
+    RecordingStore.create(str(directory / 'motor5'), sampling_rate, chunk_size=4096).append(signal)
+    (directory / 'broken.bin').write_bytes(b'abc')
+    (directory / 'notes.txt').write_text('not a recording')
+    return signal
+
+
+def test_read_formats(tmp_path):
+    signal = write_recordings(tmp_path)
+    paths = find_recordings(str(tmp_path))
+    assert [os.path.basename(path) for path in paths] == ['broken.bin', 'motor1.npy', 'motor2.csv', 'motor3.bin',
+                                                          'motor4.raw', 'motor5']
+    for path in paths[1:]:
+        recording, rate = read_recording(path, sampling_rate=500)
+        np.testing.assert_allclose(recording, signal, rtol=1e-6, atol=1e-6)
+        assert rate == (500 if path.endswith(('.npy', '.bin', '.raw')) else 1000)  # from the time column/header
+
+
+def test_fft_in_slices_matches_whole_recording(tmp_path):
+    t, signal = make_signal(duration_s=20)
+    np.save(tmp_path / 'motor.npy', signal.astype(np.float32))
+    recording, _ = read_recording(str(tmp_path / 'motor.npy'))
+    store = RecordingStore.create(str(tmp_path / 'store'), sampling_rate, chunk_size=3000)
+    store.append(signal)
+    detector = AnomalyDetector()
+    for max_freq in (None, 100):
+        expected = detector.do_fft_batched(t, np.asarray(recording), 0.5, sampling_rate, 0.5, dtype=np.float32,
+                                           max_freq=max_freq)
+        for source in (recording, store):
+            times, freqs, magnitudes = fft_in_slices(detector, source, sampling_rate, max_freq=max_freq,
+                                                     slice_frames=7)
+            assert magnitudes.dtype == np.float32 and magnitudes.shape == expected[2].shape
+            np.testing.assert_allclose(times, expected[0])
+            np.testing.assert_array_equal(freqs, expected[1])
+            np.testing.assert_allclose(magnitudes, expected[2], atol=1e-4)
+
+
+def test_report_process_pool(tmp_path):
+    write_recordings(tmp_path)
+    np.save(tmp_path / 'motor6.npy', make_signal(seed=1)[1])
+    paths = find_recordings(str(tmp_path))
+    files, anomalies = analyze_recordings(paths, workers=2, sampling_rate=sampling_rate, normal_freqs=[25, 67],
+                                          threshold_ratio=0.3)
+    assert files['path'].tolist() == paths
+    assert files['error'][0].startswith('ValueError') and np.all(files['error'][1:] == '')
+    assert np.all(files['fault_families'][1:] == '45.0') and np.all(files['total_s'] > 0)
+    assert set(anomalies['frequency']) == {45.0} and np.all(anomalies['time'] >= 5)
+    np.testing.assert_array_equal(np.bincount(anomalies['file'], minlength=len(paths)), files['anomalies'])
+
+    expected_files, expected_anomalies = analyze_recordings(paths, workers=1, sampling_rate=sampling_rate,
+                                                            normal_freqs=[25, 67], threshold_ratio=0.3)
+    np.testing.assert_array_equal(anomalies, expected_anomalies)
+
+    save_report(str(tmp_path / 'report.npz'), files, anomalies)
+    loaded_files, loaded_anomalies = load_report(str(tmp_path / 'report.npz'))
+    np.testing.assert_array_equal(loaded_files, files)
+    np.testing.assert_array_equal(loaded_anomalies, anomalies)
+    save_report(str(tmp_path / 'report.csv'), files, anomalies)
+    assert (tmp_path / 'report_anomalies.csv').read_text().splitlines()[0] == 'file,frame,time,frequency,magnitude'
@@ -0,0 +1,57 @@
+# test_export.py
+"""
+Unit tests for the exported inference backends (autoencoder/export.py)
+"""
+import os
+import sys
+import pytest
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'detect_service')))
+from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.export import BACKENDS, SUFFIXES, load_inference_model
+
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Autoencoder, 'model_base_dir', str(tmp_path))
+    monkeypatch.setattr(Autoencoder, 'model_path', str(tmp_path / Autoencoder.model_name))
+    return tmp_path
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_matches_eager(backend):
+    if backend.startswith('onnx'):
+        pytest.importorskip('onnxruntime')
+        pytest.importorskip('onnxscript')
+    torch.manual_seed(0)
+    autoencoder = Autoencoder()
+    version = autoencoder.save_model()
+    x = torch.linspace(-2, 2, 1000).reshape(-1, 1)
+    with torch.inference_mode():
+        expected = autoencoder(x)
+        reconstructed = load_inference_model(Autoencoder, backend)(x)
+    assert reconstructed.shape == expected.shape
+    tolerance = 0.02 if backend.endswith('int8') else 1e-5  # int8: quantization error of the weights
+    assert (reconstructed - expected).abs().max() < tolerance * expected.abs().max()
+    if backend != 'eager':
+        assert os.path.exists(Autoencoder.registry().artifact_path(version, SUFFIXES[backend]))
+
+
+def test_backend_needs_version():
+    with pytest.raises(FileNotFoundError):
+        load_inference_model(Autoencoder, 'torchscript')
+    with pytest.raises(ValueError):
+        load_inference_model(Autoencoder, 'tflite')
+
+
+def test_preload_fails_fast_without_exporter(monkeypatch):
+    import detect_microservice
+    Autoencoder().save_model()
+
+    def export_without_onnxscript(*args):
+        raise ModuleNotFoundError("No module named 'onnxscript'")
+    monkeypatch.setattr(detect_microservice, 'inference_backend', 'onnx')
+    monkeypatch.setattr(detect_microservice, 'export_version', export_without_onnxscript)
+    with pytest.raises(RuntimeError, match='onnxscript'):  # no retry loop: the export can never succeed
+        detect_microservice.preload_models()
@@ -0,0 +1,33 @@
+# test_fft_simple.py
+"""
+Unit tests for the frequency detection without Hanning window (fft_simple)
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from fft_simple import detect_frequencies_no_hanning, detect_frequencies_sparse
+
+sampling_rate = 1000
+
+
+def test_sparse_matches_list_per_window():
+    t = np.arange(20 * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 0.7 * np.sin(2 * np.pi * 89 * t) * (t >= 10)
+    signal += 0.65 * np.random.default_rng(0).normal(size=t.shape)
+    times, freqs, all_freqs_per_window, magnitudes = detect_frequencies_no_hanning(signal, sampling_rate, 512)
+    sparse_times, sparse_freqs, window_idx, freq_idx, peak_magnitudes = detect_frequencies_sparse(
+        signal, sampling_rate, 512, frames_per_batch=7)  # several batches
+
+    np.testing.assert_allclose(sparse_times, times)
+    np.testing.assert_allclose(sparse_freqs, freqs)
+    boundaries = np.searchsorted(window_idx, np.arange(1, len(times)))
+    for detected, bins in zip(all_freqs_per_window, np.split(freq_idx, boundaries)):
+        np.testing.assert_allclose(freqs[bins], detected)
+    np.testing.assert_allclose(peak_magnitudes, magnitudes[window_idx, freq_idx], atol=1e-12)
+    assert np.all(np.diff(window_idx) >= 0)
+
+
+def test_sparse_short_signal():
+    times, freqs, window_idx, freq_idx, peak_magnitudes = detect_frequencies_sparse(np.zeros(100), sampling_rate, 512)
+    assert len(times) == len(window_idx) == len(freq_idx) == len(peak_magnitudes) == 0 and len(freqs) == 256
@@ -0,0 +1,60 @@
+# test_lod.py
+"""
+Unit tests for the min/max level of detail (LOD) of long signals for plotting
+"""
+import os
+import sys
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from lod import MinMaxLine, MinMaxPyramid
+
+
+def make_signal(n=1_000_003):
+    signal = np.random.default_rng(0).normal(size=n)
+    signal[765_432:765_435] = 20  # short fault burst
+    signal[123_456] = -15
+    return signal
+
+
+def test_indices_keep_extremes():
+    signal = make_signal()
+    pyramid = MinMaxPyramid(signal)
+    n_pixels = 1000
+    for start, stop in [(0, len(signal)), (700_000, 800_000), (765_000, 766_000), (765_400, 765_500), (-5, 10)]:
+        idx = pyramid.indices(start, stop, n_pixels)
+        start, stop = max(0, start), min(len(signal), stop)
+        assert np.all(np.diff(idx) > 0) and idx[0] == start and idx[-1] == stop - 1
+        assert len(idx) <= 2 * pyramid.factor * n_pixels + 2
+        view = signal[start:stop]
+        assert signal[idx].max() == view.max() and signal[idx].min() == view.min()
+        if start <= 765_432 < stop:
+            assert {765_432, 765_433, 765_434} & set(idx.tolist())  # the burst is visible at every zoom level
+    assert np.array_equal(pyramid.indices(10, 20, 1000), np.arange(10, 20))  # few samples: all of them
+
+
+def test_levels_match_block_extremes():
+    signal = np.random.default_rng(1).normal(size=10_000)
+    pyramid = MinMaxPyramid(signal, base_block=16, factor=4)
+    for level, indices in enumerate(pyramid.levels):
+        block = 16 * 4 ** level
+        starts = np.arange(len(indices)) * block
+        np.testing.assert_array_equal(signal[indices[:, 0]], np.minimum.reduceat(signal, starts))
+        np.testing.assert_array_equal(signal[indices[:, 1]], np.maximum.reduceat(signal, starts))
+    assert len(pyramid.levels[-1]) == 1
+
+
+def test_min_max_line_follows_zoom():
+    signal = make_signal()
+    t = np.arange(len(signal)) / 1000
+    fig = Figure(figsize=(10, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    lod_line = MinMaxLine(ax, t, signal)
+    assert len(lod_line.line.get_xdata()) < 10_000 and lod_line.line.get_ydata().max() == 20
+
+    ax.set_xlim(765.0, 766.0)  # zoom in: samples of the visible range only, all of them
+    x = lod_line.line.get_xdata()
+    assert x[0] <= 765.0 and x[-1] >= 766.0 and len(x) == 1003
+    np.testing.assert_array_equal(lod_line.line.get_ydata(), signal[764_999:766_002])
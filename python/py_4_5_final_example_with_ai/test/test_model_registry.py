@@ -0,0 +1,70 @@
+# test_model_registry.py
+"""
+Unit tests for the versioned model registry (autoencoder/model_registry.py)
+"""
+import os
+import sys
+import pytest
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from autoencoder.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), "model")
+
+
+def test_publish_and_load(registry):
+    assert registry.latest_version() is None
+    with pytest.raises(FileNotFoundError):
+        registry.load()
+    first = registry.publish({"w": torch.zeros(3)}, {"loss": 0.5})
+    second = registry.publish({"w": torch.ones(3)}, {"loss": 0.1})
+    assert registry.versions() == [first, second]
+    assert registry.latest_version() == second
+    assert torch.equal(registry.load()["w"], torch.ones(3))
+    assert torch.equal(registry.load(first)["w"], torch.zeros(3))
+    assert registry.manifest()['versions'][0]['metadata'] == {"loss": 0.5}
+    assert not [name for name in os.listdir(registry.directory) if name.startswith('.tmp-')]
+
+
+def test_rollback_and_set_latest(registry):
+    versions = [registry.publish({"w": torch.full((1,), float(i))}) for i in range(3)]
+    assert registry.rollback() == versions[1]
+    assert registry.rollback() == versions[0]
+    with pytest.raises(ValueError):
+        registry.rollback()
+    registry.set_latest(versions[2])
+    assert registry.latest_version() == versions[2]
+    with pytest.raises(ValueError):
+        registry.set_latest("unknown")
+
+
+def test_prune_old_versions(registry, monkeypatch):
+    monkeypatch.setattr(ModelRegistry, 'keep_versions', 2)
+    versions = [registry.publish({"w": torch.zeros(1)}) for _ in range(4)]
+    assert registry.versions() == versions[2:]
+    assert set(os.listdir(registry.versions_dir)) == {f"{version}.pth" for version in versions[2:]}
+
+
+def publish_versions(directory, count):
+    registry = ModelRegistry(directory, "model")
+    for i in range(count):
+        registry.publish({"w": torch.full((3,), float(i))})
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="fork start method not available")
+def test_publish_from_several_processes(registry):
+    import multiprocessing
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=publish_versions, args=(os.path.dirname(registry.directory), 4))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    versions = registry.versions()
+    assert len(versions) == 16 and len(set(versions)) == 16  # no manifest update lost (< keep_versions)
+    assert registry.latest_version() in versions
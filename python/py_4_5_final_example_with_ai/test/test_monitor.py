@@ -0,0 +1,53 @@
+# test_monitor.py
+"""
+Unit tests for the blitting monitor renderer (headless)
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from monitor import BlitMonitor
+
+sampling_rate = 1000
+
+
+def make_signal(duration_s=6):
+    t = np.arange(duration_s * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 12 * np.sin(2 * np.pi * 80 * t) * (t >= duration_s / 2)
+    return t, signal
+
+
+def test_spectra_match_do_fft_batched():
+    t, signal = make_signal()
+    detector = AnomalyDetector()
+    monitor = BlitMonitor(t, signal, detector, sampling_rate, step_samples=30, frames_per_block=16, headless=True)
+    _, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate,
+                                                   overlap=1 - 30 / 500, dtype=np.float32)
+    assert monitor.n_frames == len(magnitudes)
+    for frame in (0, 5, 16, 17, 100, monitor.n_frames - 1):  # within and across the computed blocks
+        spectra = monitor.spectra(frame)
+        assert len(spectra) == min(frame + 1, monitor.max_fft_lines)
+        np.testing.assert_allclose(spectra, magnitudes[frame - len(spectra) + 1:frame + 1, :monitor.n_bins],
+                                   atol=1e-4)
+
+
+def test_update_reuses_artists_and_detects_fault():
+    t, signal = make_signal()
+    detector = AnomalyDetector()
+    monitor = BlitMonitor(t, signal, detector, sampling_rate, headless=True)
+    n_artists = len(monitor.ax_fft.lines)
+    monitor.update(0)
+    assert not monitor.anomaly_points.get_xdata().size and monitor.fault_frame_counter == 0
+    assert not any(line.get_visible() for line in monitor.fft_lines[:-1])  # no older spectra yet
+    monitor.update(monitor.n_frames - 1)
+    np.testing.assert_allclose(monitor.anomaly_points.get_xdata(), [80])
+    assert monitor.fault_frame_counter == 1 and monitor.warning_text.get_visible()
+    assert len(monitor.ax_fft.lines) == n_artists
+
+
+def test_run_headless():
+    t, signal = make_signal()
+    monitor = BlitMonitor(t, signal, AnomalyDetector(), sampling_rate, headless=True)
+    stats = monitor.run_headless(20)
+    assert stats['frames'] == 20 and stats['fps'] > 0
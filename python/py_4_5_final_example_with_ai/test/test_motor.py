@@ -0,0 +1,46 @@
+# test_motor.py
+"""
+Unit tests for the motor vibration simulation
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from motor import Motor
+
+sampling_rate = 1000
+
+
+def test_array_mode_matches_list_mode():
+    motor = Motor([25, 67])
+    t_list, signal_list = motor.create_motor_vibration(duration_s=2.0, sampling_rate=sampling_rate, noise_level=0,
+                                                       fault_freqs=[45], fault_time_s=1.0)
+    t, signal = motor.create_motor_vibration(duration_s=2.0, sampling_rate=sampling_rate, noise_level=0,
+                                             fault_freqs=[45], fault_time_s=1.0, as_array=True, dtype=np.float32)
+    assert isinstance(t_list, list) and isinstance(signal, np.ndarray)
+    assert signal.dtype == np.float32 and t.dtype == np.float64
+    np.testing.assert_allclose(t, t_list)
+    np.testing.assert_allclose(signal, signal_list, atol=1e-5)
+
+
+def test_seeded_noise_is_reproducible():
+    motor = Motor([25])
+    _, signal1 = motor.create_motor_vibration(noise_level=0.5, as_array=True, rng=7)
+    _, signal2 = motor.create_motor_vibration(noise_level=0.5, as_array=True, rng=np.random.default_rng(7))
+    np.testing.assert_array_equal(signal1, signal2)
+
+
+def test_chunks_are_phase_continuous():
+    motor = Motor([25, 67])
+    kwargs = dict(duration_s=3.0, sampling_rate=sampling_rate, noise_level=0.3, fault_freqs=[13, 89], fault_time_s=1.5)
+    t, signal = motor.create_motor_vibration(as_array=True, rng=3, **kwargs)
+    chunks = list(motor.iter_motor_vibration(chunk_size=700, rng=3, **kwargs))
+    assert [len(c[1]) for c in chunks] == [700, 700, 700, 700, 200]
+    np.testing.assert_allclose(np.concatenate([c[0] for c in chunks]), t)
+    np.testing.assert_allclose(np.concatenate([c[1] for c in chunks]), signal)
+
+
+def test_endless_stream():
+    stream = Motor([25]).iter_motor_vibration(duration_s=None, chunk_size=100, noise_level=0)
+    t, _ = [next(stream) for _ in range(50)][-1]
+    assert t[-1] == (50 * 100 - 1) / sampling_rate
@@ -0,0 +1,70 @@
+# test_payload.py
+"""
+Unit tests for the binary payload negotiation (payload.codec, /simulate endpoint)
+"""
+import io
+import os
+import sys
+import numpy as np
+import pytest
+from flask import request
+from werkzeug.exceptions import UnsupportedMediaType
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from payload import codec
+from simulate_microservice import app
+
+
+@pytest.mark.parametrize("content_type", codec.supported_content_types())
+def test_roundtrip(content_type):
+    signal = np.sin(np.linspace(0, 10, 1000))
+    decoded = codec.decode(codec.encode(signal, content_type), content_type)
+    np.testing.assert_allclose(decoded, signal, atol=1e-6)
+
+
+def test_invalid_raw_payload():
+    body = codec.encode([1.0, 2.0, 3.0], codec.RAW)
+    with pytest.raises(ValueError):
+        codec.decode(body[:-1], codec.RAW)
+    with pytest.raises(ValueError):
+        codec.decode(b'XXXX' + body[4:], codec.RAW)
+
+
+@pytest.mark.parametrize("content_type", [codec.MSGPACK, 'text/plain'])
+def test_read_vibration_unsupported_content_type(content_type, monkeypatch):
+    monkeypatch.setattr(codec, 'msgpack', None)  # msgpack is optional
+    with app.test_request_context(method='POST', data=b'\x81', content_type=content_type):
+        with pytest.raises(UnsupportedMediaType):
+            codec.read_vibration(request)
+    with app.test_request_context(method='POST', json={"vibration": [1.0, 2.0]}):
+        np.testing.assert_array_equal(codec.read_vibration(request), [1.0, 2.0])
+
+
+@pytest.mark.parametrize("headers, query, content_type", [
+    ({}, "", codec.JSON),
+    ({"Accept": "application/json, text/plain, */*"}, "", codec.JSON),
+    ({"Accept": codec.RAW}, "", codec.RAW),
+    ({"Accept": codec.NPY}, "", codec.NPY),
+    ({}, "&format=raw", codec.RAW),
+])
+def test_simulate_negotiation(headers, query, content_type):
+    client = app.test_client()
+    response = client.get("/simulate?duration=1&noise=0" + query, headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == content_type
+    signal = codec.decode(response.get_data(), response.mimetype)
+    assert len(signal) == 1000
+
+
+@pytest.mark.parametrize("query, content_type", [("", codec.NDJSON), ("&format=raw", codec.RAW)])
+def test_simulate_stream(query, content_type):
+    client = app.test_client()
+    response = client.get("/simulate/stream?duration=2.5&chunk_size=700&seed=5" + query)
+    assert response.status_code == 200
+    assert response.mimetype == content_type
+    chunks = list(codec.iter_frames(io.BytesIO(response.get_data()), response.mimetype))
+    assert [len(c) for c in chunks] == [700, 700, 700, 400]
+
+    full = client.get("/simulate?duration=2.5&seed=5&format=raw")
+    expected = codec.decode(full.get_data(), full.mimetype)
+    np.testing.assert_allclose(np.concatenate(chunks), expected, atol=1e-6)
@@ -0,0 +1,66 @@
+# test_recording_store.py
+"""
+Unit tests for the memory-mapped chunked recording store
+"""
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from motor_simulator import simulate_motor_vibration_chunks
+from recording_store import RecordingStore
+
+sampling_rate = 1000
+
+
+def record(path, duration_s=20, chunk_size=3000, stream_chunk=700):
+    store = RecordingStore.create(str(path), sampling_rate, chunk_size=chunk_size)
+    chunks = list(simulate_motor_vibration_chunks(duration_s, sampling_rate, 0.3, duration_s / 2, True,
+                                                  chunk_size=stream_chunk, seed=0))
+    for t, signal in chunks:
+        store.append(signal, t_start=t[0])
+    return store, np.concatenate([t for t, _ in chunks]), np.concatenate([signal for _, signal in chunks])
+
+
+def test_append_and_read(tmp_path):
+    store, t, signal = record(tmp_path / 'motor1')
+    assert len(store) == len(signal) and store.duration_s == 20 and store.segments == [(0, 0.0)]
+    assert len([name for name in os.listdir(tmp_path / 'motor1') if name.endswith('.dat')]) == 7  # 20000 / 3000
+
+    reader = RecordingStore(str(tmp_path / 'motor1'))  # e.g. another process
+    np.testing.assert_array_equal(reader.read(), signal.astype(np.float32))
+    assert isinstance(reader.read(3100, 5900), np.memmap)  # inside one chunk file: no copy
+    np.testing.assert_array_equal(reader.read(2900, 9100), signal[2900:9100].astype(np.float32))
+    assert len(reader.read(19_990, 30_000)) == 10 and len(reader.read(500, 400)) == 0
+
+    store.append(np.ones(100))  # live stream continues: the reader sees the new samples
+    assert len(reader) == 20_100 and np.all(reader.read(20_000) == 1)
+    with pytest.raises(FileExistsError):
+        RecordingStore.create(str(tmp_path / 'motor1'), sampling_rate)
+
+
+def test_time_index_with_gap(tmp_path):
+    store = RecordingStore.create(str(tmp_path / 'motor1'), sampling_rate, chunk_size=1000, t0=100.0)
+    store.append(np.arange(1500))  # 100.0 .. 101.499 s
+    store.append(np.arange(1500, 2000), t_start=101.5)  # continues: no new segment
+    store.append(np.arange(2000, 2500), t_start=200.0)  # reconnect after a gap
+    assert store.segments == [(0, 100.0), (2000, 200.0)]
+    assert RecordingStore(str(tmp_path / 'motor1')).segments == store.segments
+
+    t, signal = store.time_slice(101.9, 200.2)
+    np.testing.assert_array_equal(signal, np.arange(1900, 2200))
+    np.testing.assert_allclose(t[[0, 99, 100, -1]], [101.9, 101.999, 200.0, 200.199])
+    assert len(store.time_slice(150, 160)[1]) == 0  # inside the gap
+    assert store.sample_index(50) == 0 and store.sample_index(1000) == 2500
+
+
+def test_fft_of_time_slice(tmp_path):
+    store, t, signal = record(tmp_path / 'motor1')
+    times, freqs, magnitudes = store.fft(12.0, 18.0)
+    mask = (t >= 12.0) & (t < 18.0)
+    expected_times, _, expected = AnomalyDetector().do_fft_batched(t[mask], signal[mask].astype(np.float32), 0.5,
+                                                                   sampling_rate, dtype=np.float32)
+    np.testing.assert_allclose(times, expected_times)
+    np.testing.assert_allclose(magnitudes, expected, atol=1e-5)
+    assert AnomalyDetector().detect_anomalies(freqs, [25, 67], magnitudes) == [13.0, 45.0, 89.0]
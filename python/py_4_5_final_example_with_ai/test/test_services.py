@@ -16,6 +16,8 @@ from detect_service.detect_microservice import detect
 # Configuration
 simulate_url = "http://localhost:5003/simulate"
 train_url = "http://localhost:5001/train"
+train_jobs_url = "http://localhost:5001/train/jobs"
+baseline_url = "http://localhost:5001/models/baseline"
 detect_url = "http://localhost:5002/detect"
 
 
@@ -56,6 +58,23 @@ def plot_full_detection_report(signal, losses, anomalies, threshold):
     plt.tight_layout()
     plt.show()
 
+def wait_for_training_job(job, timeout_s=600, poll_interval_s=0.5):
+    """ Poll the training job until it has finished (instead of holding the connection open).
+    Args:
+        job (dict): The job returned by POST /train/jobs.
+        timeout_s (float): Max. time to wait in seconds.
+        poll_interval_s (float): Time between two status requests in seconds.
+    Returns:
+        dict: The finished job (status completed, failed or cancelled).
+    """
+    deadline = time.monotonic() + timeout_s
+    while job['status'] in ("queued", "running"):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Training job {job['job_id']} did not finish within {timeout_s} s")
+        time.sleep(poll_interval_s)
+        job = requests.get(f"{train_jobs_url}/{job['job_id']}").json()
+    return job
+
 def show_simulation_data():
     simulate_response = requests.get(simulate_url + "?inject_fault=false&noise=0")
     vibration_data_train = simulate_response.json()
@@ -83,13 +102,25 @@ if __name__ == "__main__":
 
         # 2. Call train_service
         print("2. Training Autoencoder...")
-        train_response = requests.post(train_url, json=vibration_data_train)
-        if train_response.status_code != 200:
+        train_response = requests.post(train_jobs_url, json=vibration_data_train)
+        if train_response.status_code != 202:
             print(f"   Training failed: {train_response.text}")
             exit(1)
-        print(f"   Training response: {train_response.json()}")
-        # Sleep to give filesystem time to write model
-        time.sleep(3)
+        train_job = wait_for_training_job(train_response.json())
+        if train_job['status'] != "completed":
+            print(f"   Training failed: {train_job}")
+            exit(1)
+        print(f"   Training response: {train_job['result']}")
+
+        # 2b. Update the loss baseline with normal data at the noise level of the detection data
+        # (the training data has no noise, so its baseline alone gives a too low threshold)
+        print("2b. Updating loss baseline with normal data...")
+        simulate_response = requests.get(simulate_url + "?inject_fault=false&noise=0.37")
+        baseline_response = requests.post(baseline_url, json=simulate_response.json())
+        if baseline_response.status_code != 200:
+            print(f"   Baseline update failed: {baseline_response.text}")
+            exit(1)
+        print(f"   Baseline response: {baseline_response.json()}")
 
         # 3. Call detect_service (no anomalies expected)
         print("3. Detecting anomalies...")
@@ -0,0 +1,123 @@
+# test_serving.py
+"""
+Unit tests for the serving helpers of the detect service (model hot reload, micro-batching)
+"""
+import os
+import sys
+import threading
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from autoencoder.serving import ModelWatcher, MicroBatcher
+
+
+def wait_for(condition, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_model_watcher_swaps_new_version(tmp_path):
+    model_path = tmp_path / "model.txt"
+    model_path.write_text("v1")
+    watcher = ModelWatcher(lambda: model_path.read_text(), str(model_path), check_interval_s=0.01)
+    assert watcher.get() == "v1"
+    assert not watcher.reload()  # unchanged file is not loaded again
+
+    model_path.write_text("v2-new")
+    assert wait_for(lambda: watcher.get() == "v2-new")
+
+
+def test_model_watcher_loads_in_background(tmp_path):
+    model_path = tmp_path / "model.txt"
+    model_path.write_text("v1")
+    release = threading.Event()
+
+    def load():
+        content = model_path.read_text()
+        if content != "v1":
+            release.wait(5.0)  # slow load of the new version
+        return content
+
+    watcher = ModelWatcher(load, str(model_path), check_interval_s=0.01)
+    assert watcher.get() == "v1"
+    model_path.write_text("v2-new")
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert watcher.get() == "v1"  # not blocked by the load running in the watcher thread
+    assert time.monotonic() - start < 0.05
+    release.set()
+    assert wait_for(lambda: watcher.get() == "v2-new")
+
+
+def test_model_watcher_keeps_model_if_load_fails(tmp_path):
+    model_path = tmp_path / "model.txt"
+    model_path.write_text("v1")
+    loads = iter(["v1", ValueError("half written")])
+
+    def load():
+        result = next(loads)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    watcher = ModelWatcher(load, str(model_path), check_interval_s=60.0)
+    assert watcher.get() == "v1"
+    model_path.write_text("broken")
+    assert not watcher.check()
+    assert watcher.get() == "v1"
+
+
+def test_model_watcher_caches_none_until_version_changes():
+    versions, loads = ["v1"], []
+
+    def load():
+        loads.append(versions[0])
+        return None  # e.g. no loss baseline for this model version
+
+    watcher = ModelWatcher(load, check_interval_s=60.0, version_fn=lambda: versions[0])
+    for _ in range(5):
+        assert watcher.get() is None
+    assert not watcher.check() and loads == ["v1"]
+    versions[0] = "v2"
+    assert watcher.check() and watcher.get() is None and loads == ["v1", "v2"]
+
+
+def test_micro_batcher_combines_concurrent_requests():
+    batch_sizes = []
+
+    def infer(rows):
+        batch_sizes.append(len(rows))
+        time.sleep(0.01)
+        return rows[:, 0] * 2
+
+    batcher = MicroBatcher(infer, max_batch_rows=1000, max_wait_ms=20)
+    results = {}
+
+    def request(i):
+        results[i] = batcher.submit(np.full((10 * (i + 1), 1), float(i)))
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(8):
+        np.testing.assert_array_equal(results[i], np.full(10 * (i + 1), 2.0 * i))
+    assert sum(batch_sizes) == 360
+    assert len(batch_sizes) < 8  # at least some requests shared a forward pass
+    assert max(batch_sizes) <= 1000
+
+
+def test_micro_batcher_propagates_errors():
+    def infer(rows):
+        raise RuntimeError("model not loaded")
+
+    batcher = MicroBatcher(infer)
+    try:
+        batcher.submit(np.zeros((3, 1)))
+        assert False, "exception expected"
+    except RuntimeError as e:
+        assert "model not loaded" in str(e)
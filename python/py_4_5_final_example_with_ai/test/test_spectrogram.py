@@ -0,0 +1,56 @@
+# test_spectrogram.py
+"""
+Unit tests for the cached spectrogram shared by the visualizer functions
+"""
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from spectrogram import Spectrogram
+
+sampling_rate = 1000
+
+
+def make_signal(duration_s=5):
+    t = np.arange(duration_s * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 0.7 * np.sin(2 * np.pi * 89 * t) * (t >= duration_s / 2)
+    return t, signal + 0.3 * np.random.default_rng(0).normal(size=t.shape)
+
+
+def test_matches_do_fft():
+    t, signal = make_signal()
+    times, freqs, magnitudes = AnomalyDetector().do_fft(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+    spectrogram = Spectrogram.compute(signal, sampling_rate, window_size_s=0.5, overlap=0.5)
+    np.testing.assert_allclose(spectrogram.times, times)
+    np.testing.assert_allclose(spectrogram.freqs, freqs)
+    np.testing.assert_allclose(spectrogram.magnitudes, magnitudes, atol=1e-12)
+
+    moving = Spectrogram.compute(signal, sampling_rate, window_size_s=0.5, step=20)
+    assert moving.step == 20 and len(moving.magnitudes) == (len(signal) - 500) // 20 + 1
+    np.testing.assert_allclose(moving.magnitudes[25], magnitudes[2], atol=1e-12)  # window at sample 500
+
+
+def test_get_computes_once(monkeypatch):
+    _, signal = make_signal()
+    first = Spectrogram.get(signal, sampling_rate, window_size_s=0.5, overlap=0.5)
+    monkeypatch.setattr(Spectrogram, 'compute', staticmethod(lambda *args, **kwargs: pytest.fail("recomputed")))
+    assert Spectrogram.get(signal.copy(), sampling_rate, window_size_s=0.5, overlap=0.5) is first
+    assert Spectrogram.get(list(signal), sampling_rate, window_size_s=0.5, overlap=0.5) is first
+    with pytest.raises(pytest.fail.Exception):
+        Spectrogram.get(signal, sampling_rate, window_size_s=0.5, step=20)  # other parameters: new spectrogram
+
+
+def test_cache_dir_memory_mapped(tmp_path, monkeypatch):
+    _, signal = make_signal()
+    computed = Spectrogram.get(signal, sampling_rate, window_size_s=0.5, step=50, cache_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [f"{computed.key}.json", f"{computed.key}.npy"]
+
+    Spectrogram._cache.clear()  # e.g. a new process opening the analysis of the same recording
+    monkeypatch.setattr(Spectrogram, 'compute', staticmethod(lambda *args, **kwargs: pytest.fail("recomputed")))
+    loaded = Spectrogram.get(signal, sampling_rate, window_size_s=0.5, step=50, cache_dir=str(tmp_path))
+    assert isinstance(loaded.magnitudes, np.memmap)
+    assert (loaded.window_size, loaded.step, loaded.key) == (500, 50, computed.key)
+    np.testing.assert_array_equal(loaded.magnitudes, computed.magnitudes)
+    np.testing.assert_allclose(loaded.times, computed.times)
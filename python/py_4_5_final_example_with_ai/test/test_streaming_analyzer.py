@@ -0,0 +1,66 @@
+# test_streaming_analyzer.py
+"""
+Unit tests for the streaming (ring buffer) spectrum analyzer
+"""
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'motor_simulation-service')))
+from anomaly_detector import AnomalyDetector
+from band_monitor import BandMonitor
+from streaming_analyzer import StreamingSpectrumAnalyzer
+
+sampling_rate = 1000
+
+
+def test_push_matches_do_fft():
+    t = np.arange(5 * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 12 * np.sin(2 * np.pi * 80 * t) * (t >= 2.5)
+    detector = AnomalyDetector()
+    times, freqs, magnitudes = detector.do_fft_batched(t, signal, window_size_s=0.5, sampling_rate=sampling_rate)
+
+    analyzer = StreamingSpectrumAnalyzer(detector, sampling_rate=sampling_rate, window_size_s=0.5)
+    rng = np.random.default_rng(1)
+    frames = []
+    offset = 0
+    while offset < len(signal):  # stream the signal in random chunk sizes
+        size = int(rng.integers(1, 400))
+        frames.extend(analyzer.push(signal[offset:offset + size]))
+        offset += size
+
+    np.testing.assert_allclose(analyzer.freqs, freqs)
+    np.testing.assert_allclose([f.time for f in frames], times)
+    np.testing.assert_allclose(np.array([f.magnitudes for f in frames]), magnitudes, atol=1e-9)
+    assert [f.anomaly for f in frames] == [detector.detect_(freqs, m) for m in magnitudes]
+    assert any(f.anomaly for f in frames) and not frames[0].anomaly
+
+
+def test_push_keeps_constant_buffer():
+    analyzer = StreamingSpectrumAnalyzer(AnomalyDetector(), sampling_rate=sampling_rate, window_size_s=0.5)
+    assert analyzer.push(np.zeros(499)) == []
+    assert len(analyzer.push(np.zeros(1))) == 1
+    assert len(analyzer.push(np.zeros(10 * sampling_rate))) == 40
+    assert len(analyzer._buffer) == analyzer.window_size + analyzer.step
+
+
+def test_band_monitor_matches_fft_of_band():
+    t = np.arange(10 * sampling_rate) / sampling_rate
+    signal = np.sin(2 * np.pi * 25 * t) + 12 * np.sin(2 * np.pi * 80 * t) * (t >= 5)
+    signal += 0.3 * np.random.default_rng(0).normal(size=t.shape)
+    detector = AnomalyDetector()
+    monitor = BandMonitor(detector, sampling_rate=sampling_rate, window_size_s=0.5, overlap=0.9, resync_hops=30)
+    frames = []
+    for chunk in np.array_split(signal, 37):
+        frames.extend(monitor.push(chunk))
+
+    # reference: full FFT of every window with a periodic Hann window, restricted to the band
+    n = monitor.window_size
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)
+    starts = np.arange(0, len(signal) - n + 1, monitor.step)
+    expected = (2.0 / n) * np.abs(np.fft.rfft(signal[starts[:, None] + np.arange(n)] * window, axis=-1))
+    freqs = np.fft.rfftfreq(n, d=1 / sampling_rate)
+    band = (freqs >= detector.target_freq_min) & (freqs <= detector.target_freq_max)
+
+    np.testing.assert_allclose(monitor.freqs, freqs[band])
+    np.testing.assert_allclose(np.array([f.magnitudes for f in frames]), expected[:, band], atol=1e-9)
+    assert [f.anomaly for f in frames] == [bool(np.any(m > detector.threshold)) for m in expected[:, band]]
@@ -0,0 +1,99 @@
+# test_training_jobs.py
+"""
+Unit tests for the asynchronous training jobs (train_service/training_jobs.py, /train/jobs endpoints)
+"""
+import math
+import os
+import sys
+import time
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'train_service')))
+from payload import codec
+from training_jobs import TrainingJobs, QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED
+
+
+def wait_for(jobs, job_id, timeout_s=60):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job['status'] not in (QUEUED, RUNNING):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+@pytest.fixture
+def jobs():
+    jobs = TrainingJobs(max_workers=1)
+    yield jobs
+    jobs.shutdown()
+
+
+def test_job_result_and_failure(jobs):
+    job, deduplicated = jobs.submit("a", math.factorial, 10)
+    assert not deduplicated and job['status'] == RUNNING and job['started']  # worker free: started immediately
+    failing, _ = jobs.submit("b", math.sqrt, -1)
+    assert wait_for(jobs, job['job_id'])['result'] == 3628800
+    failed = wait_for(jobs, failing['job_id'])
+    assert failed['status'] == FAILED and failed['error']
+    assert jobs.get("unknown") is None
+
+
+def test_dedupe_and_cancel(jobs):
+    key = TrainingJobs.key(np.arange(10, dtype=np.float32), model_type='sample')
+    assert key == TrainingJobs.key(np.arange(10, dtype=np.float32), model_type='sample')
+    assert key != TrainingJobs.key(np.arange(10, dtype=np.float32), model_type='spectral')
+
+    running, _ = jobs.submit("sleep-1", time.sleep, 1.0)
+    queued = [jobs.submit(f"sleep-{i}", time.sleep, 1.0)[0] for i in range(2, 5)]
+    again, deduplicated = jobs.submit("sleep-1", time.sleep, 1.0)
+    assert deduplicated and again['job_id'] == running['job_id']
+    time.sleep(0.2)
+    # one worker: the other jobs wait (the pool would already have moved the next one into its call queue)
+    assert [jobs.get(job['job_id'])['status'] for job in queued] == [QUEUED] * 3
+
+    cancelled = jobs.cancel(queued[0]['job_id'])  # next in line, still cancellable
+    assert cancelled['status'] == CANCELLED and cancelled['started'] is None
+    jobs.cancel(running['job_id'])  # running: result is discarded
+    assert wait_for(jobs, running['job_id'])['status'] == CANCELLED
+    assert wait_for(jobs, queued[1]['job_id'])['status'] == COMPLETED
+    assert jobs.get(queued[0]['job_id'])['status'] == CANCELLED
+    assert jobs.submit("sleep-1", time.sleep, 0)[0]['job_id'] != running['job_id']
+
+
+def test_train_job_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path))  # worker processes are spawned with this environment
+    import train_microservice
+    from autoencoder.autoencoder_pytorch import Autoencoder
+    from autoencoder.baseline import load_baseline
+    monkeypatch.setattr(Autoencoder, 'model_base_dir', str(tmp_path))
+    client = train_microservice.app.test_client()
+    signal = {"vibration": np.sin(np.arange(2000) / 10).tolist()}
+
+    response = client.post("/train/jobs?training=fast", json=signal)
+    assert response.status_code == 202
+    job = response.get_json()
+    status_url = job['status_url']
+    duplicate = client.post("/train/jobs?training=fast", json=signal).get_json()
+    assert duplicate['deduplicated'] and duplicate['job_id'] == job['job_id']
+
+    deadline = time.monotonic() + 120
+    while job['status'] in (QUEUED, RUNNING) and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = client.get(status_url).get_json()
+    train_microservice.jobs.shutdown()
+    assert job['status'] == COMPLETED, job
+    result = job['result']
+    assert (result['status'], result['samples'], result['model'], result['training']) == \
+           ("Training completed", 2000, "sample", "fast")
+    assert Autoencoder.registry().latest_version() == result['version']
+    assert load_baseline(Autoencoder.registry()).count == 2000  # loss baseline of the training data
+    models = client.get("/models").get_json()
+    assert models['latest'] == result['version']
+    assert models['versions'][-1]['metadata']['loss'] == result['loss']
+    assert client.get("/train/jobs/unknown").status_code == 404
+    monkeypatch.setattr(codec, 'msgpack', None)
+    response = client.post("/train/jobs", data=b'\x81', content_type=codec.MSGPACK)
+    assert response.status_code == 415 and 'application/msgpack' in response.get_json()['message']
@@ -2,6 +2,7 @@
 """
 This is a simple Flask microservice that trains an autoencoder on vibration data.
 It receives vibration data via a POST request, trains the model, and saves it to a file.
+Long trainings can be submitted as jobs (/train/jobs) that run in a worker process pool and are polled by job id.
 It uses PyTorch for the model and numpy for data manipulation.
 The service is designed to be part of a larger system for detecting anomalies in motor vibrations.
 """
@@ -11,41 +12,192 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 # shared_path = os.environ.get('SHARED_PATH', '../autoencoder')
 # sys.path.append(shared_path)
 from autoencoder.autoencoder_pytorch import Autoencoder
+from autoencoder.spectral_autoencoder import SpectralAutoencoder
 # from autoencoder_tensorflow import create_autoencoder, save_trained_model  # tensorflow version
 from flask import Flask, request, jsonify
+from werkzeug.exceptions import UnsupportedMediaType
+from payload.codec import read_vibration
+from autoencoder.baseline import LossBaseline, load_baseline, reconstruction_losses, save_baseline
+from autoencoder.export import export_version
+from training_jobs import TrainingJobs, train_model
 import numpy as np
 
 app = Flask(__name__)
+training_mode = os.environ.get('TRAINING_MODE', 'standard')  # standard (DataLoader) or fast (see Autoencoder.train_fast)
+train_workers = int(os.environ.get('TRAIN_WORKERS', 1))  # worker processes for training jobs
+# exports created for each new version, e.g. "onnx-int8,torchscript" (see autoencoder/export.py)
+export_backends = [backend for backend in os.environ.get('EXPORT_BACKENDS', '').split(',') if backend]
+
+
+def training_parameters():
+    """
+    Read the training parameters of the request.
+    :return: dict with model_type, mode, compile_model
+    """
+    model_type = request.args.get('model', 'sample')  # sample (one row per sample) or spectral (one row per window)
+    mode = request.args.get('training', training_mode)
+    compile_model = request.args.get('compile', 'false').lower() == 'true'
+    return {"model_type": model_type, "mode": mode, "compile_model": compile_model}
+
+
+def save_trained_model(autoencoder, model_type, mode, loss, samples, baseline=None):
+    """
+    Publish the trained model (and the baseline of its reconstruction losses) as a new version in the model registry.
+    :return: training response (also stored as job result)
+    """
+    metadata = {"model": model_type, "training": mode, "loss": loss, "samples": samples}
+    version = autoencoder.save_model(metadata)
+    if baseline is not None:
+        save_baseline(type(autoencoder).registry(), version, baseline)
+    for backend in export_backends:
+        try:
+            export_version(type(autoencoder), backend, version)
+        except Exception as e:  # the detect service exports on first use instead
+            print(f"Export {backend} of version {version} failed: {e}")
+    return {"status": "Training completed", "samples": samples, "model": model_type, "training": mode,
+            "loss": loss, "version": version}
+
+
+def save_job_result(job, result):
+    """
+    Save the model trained by a job (called in the service process when the job has finished).
+    :return: job result (same fields as the /train response)
+    """
+    autoencoder, mode, loss, baseline = result
+    return save_trained_model(autoencoder, job['model'], mode, loss, job['samples'], baseline)
+
+
+def model_registry(model_type):
+    """ Registry of the sample (Autoencoder) or spectral (SpectralAutoencoder) model. """
+    return SpectralAutoencoder.registry() if model_type == 'spectral' else Autoencoder.registry()
+
+
+jobs = TrainingJobs(max_workers=train_workers, on_result=save_job_result)
 
 
 # Flask endpoint
 @app.route('/train', methods=['POST'])
 def train_endpoint():
     try:
-        # Step 1: Receive vibration data
-        data = request.get_json()
+        # Step 1: Receive vibration data (JSON or binary, see payload.codec)
+        vibration = read_vibration(request)
 
         # Step 2: Prepare data
         # vibration_data = np.array(data['vibration'])  # tensorflow version
         # vibration_data = vibration_data.reshape(-1, 1)  # tensorflow version
-        vibration_data = np.array(data['vibration']).reshape(-1, 1).astype(np.float32)  # Each sample 1D
+        vibration_data = vibration.reshape(-1, 1).astype(np.float32)  # Each sample 1D
 
         # Step 3: Build and train model
         # model = create_autoencoder(input_dim=1)  # tensorflow version
         # model.fit(vibration_data, vibration_data, epochs=20, batch_size=32, verbose=0)   # tensorflow version
-        autoencoder = Autoencoder()
-        autoencoder.train(vibration_data)
+        parameters = training_parameters()
+        autoencoder, mode, loss, baseline = train_model(parameters['model_type'], parameters['mode'],
+                                                        parameters['compile_model'], vibration_data)
 
-        # Step 4: Save model
+        # Step 4: Save model (new version in the model registry)
         # save_trained_model(model)   # tensorflow version
-        autoencoder.save_model()
+        return jsonify(save_trained_model(autoencoder, parameters['model_type'], mode, loss, len(vibration_data),
+                                          baseline))
+
+    except UnsupportedMediaType as e:
+        return jsonify({"status": "Error", "message": e.description}), 415
+    except Exception as e:
+        return jsonify({"status": "Error", "message": str(e)}), 500
 
-        return jsonify({"status": "Training completed", "samples": len(vibration_data)})
 
+@app.route('/train/jobs', methods=['POST'])
+def submit_job_endpoint():
+    """ Submit a training job (same body and parameters as /train), returns 202 with the job id. """
+    try:
+        vibration_data = read_vibration(request).reshape(-1, 1).astype(np.float32)
+        parameters = training_parameters()
+        key = TrainingJobs.key(vibration_data, **parameters)
+        job, deduplicated = jobs.submit(key, train_model, parameters['model_type'], parameters['mode'],
+                                        parameters['compile_model'], vibration_data,
+                                        model=parameters['model_type'], samples=len(vibration_data))
+        job['deduplicated'] = deduplicated
+        job['status_url'] = f"/train/jobs/{job['job_id']}"
+        return jsonify(job), 202
+
+    except UnsupportedMediaType as e:
+        return jsonify({"status": "Error", "message": e.description}), 415
+    except Exception as e:
+        return jsonify({"status": "Error", "message": str(e)}), 500
+
+
+@app.route('/train/jobs', methods=['GET'])
+def list_jobs_endpoint():
+    return jsonify({"jobs": jobs.jobs()})
+
+
+@app.route('/train/jobs/<job_id>', methods=['GET'])
+def job_status_endpoint(job_id):
+    """ Status of a job (queued, running, completed, failed, cancelled); result contains the /train response. """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "Error", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+
+@app.route('/train/jobs/<job_id>', methods=['DELETE'])
+def cancel_job_endpoint(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "Error", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+
+@app.route('/models', methods=['GET'])
+def models_endpoint():
+    """ Versions (with training metadata) and latest version of a model (?model=sample or spectral). """
+    registry = model_registry(request.args.get('model', 'sample'))
+    return jsonify({"latest": registry.latest_version(), "versions": registry.manifest()['versions']})
+
+
+@app.route('/models/latest', methods=['POST'])
+def set_latest_model_endpoint():
+    """ Switch the version served by the detect service: ?version=<id> or the previous version (rollback). """
+    try:
+        registry = model_registry(request.args.get('model', 'sample'))
+        version = request.args.get('version')
+        if version:
+            registry.set_latest(version)
+        else:
+            version = registry.rollback()
+        return jsonify({"status": "Latest version set", "latest": version})
+
+    except ValueError as e:
+        return jsonify({"status": "Error", "message": str(e)}), 400
+
+
+@app.route('/models/baseline', methods=['POST'])
+def update_baseline_endpoint():
+    """
+    Update the loss baseline of the latest (sample) model version with vibration data confirmed to be normal,
+    e.g. recorded at the noise level of the real motor (the detect service picks up the new baseline).
+    """
+    try:
+        registry = Autoencoder.registry()
+        version = registry.latest_version()
+        if version is None:
+            return jsonify({"status": "Error", "message": "No model version published"}), 404
+        vibration_data = read_vibration(request).reshape(-1, 1).astype(np.float32)
+        autoencoder = Autoencoder()
+        autoencoder.load_model(version)
+        losses = reconstruction_losses(autoencoder, vibration_data)
+        with registry.lock():  # read-update-write of the baseline file (also across processes)
+            baseline = load_baseline(registry, version) or LossBaseline()
+            baseline.update(losses)
+            save_baseline(registry, version, baseline)
+        return jsonify({"status": "Baseline updated", "version": version, "samples": baseline.count,
+                        "mean": baseline.mean, "std": baseline.std})
+
+    except UnsupportedMediaType as e:
+        return jsonify({"status": "Error", "message": e.description}), 415
     except Exception as e:
         return jsonify({"status": "Error", "message": str(e)}), 500
 
 
-# Start server
+# Start server (development server; production: WEB_WORKERS=1 gunicorn -c gunicorn.conf.py train_microservice:app)
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001)
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5001)))
@@ -0,0 +1,208 @@
+# training_jobs.py
+"""
+Asynchronous training jobs for the train service.
+A job is submitted with the vibration data and returns a job id immediately; the training itself runs in a
+worker process pool (spawn context, so the CPU bound training neither blocks the Flask worker nor shares
+torch thread pools with it). Jobs wait in a queue of the registry and are handed to the pool only when a worker
+is free (the pool itself would move queued jobs into its call queue early, where they can neither be cancelled
+nor told apart from running jobs). Identical submissions (same data and parameters) that are still queued or
+running are deduplicated, queued jobs can be cancelled.
+"""
+import hashlib
+import multiprocessing
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+
+
+def train_model(model_type, mode, compile_model, vibration_data):
+    """
+    Create and train a model (runs in the worker process for jobs, in the request for /train).
+    :param model_type: sample (Autoencoder) or spectral (SpectralAutoencoder)
+    :param mode: training mode of the sample model (standard or fast)
+    :param compile_model: use torch.compile (fast mode only)
+    :param vibration_data: 2D float32 array [samples, 1]
+    :return: (trained model, training mode used, loss, baseline of the reconstruction losses or None)
+    """
+    from autoencoder.autoencoder_pytorch import Autoencoder
+    from autoencoder.baseline import LossBaseline, reconstruction_losses
+    from autoencoder.spectral_autoencoder import SpectralAutoencoder
+    if model_type == 'spectral':
+        autoencoder = SpectralAutoencoder()
+        return autoencoder, 'spectral', autoencoder.train(vibration_data), None
+    autoencoder = Autoencoder()
+    if mode == 'fast':
+        loss = autoencoder.train_fast(vibration_data, compile_model=compile_model)
+    else:
+        loss = autoencoder.train(vibration_data)
+    # loss statistics of the (normal) training data -> stable detection threshold
+    baseline = LossBaseline().update(reconstruction_losses(autoencoder, vibration_data))
+    return autoencoder, mode, loss, baseline
+
+
+class TrainingJobs:
+    """ Registry of training jobs executed by a process pool. """
+
+    def __init__(self, max_workers=1, max_finished_jobs=100, on_result=None):
+        """
+        :param max_workers: number of worker processes (each training uses all torch threads, so 1 is a good default)
+        :param max_finished_jobs: number of finished jobs kept for status queries (oldest are dropped)
+        :param on_result: callback on_result(job, result) called in the service process for each completed job
+                          (e.g. to save the model, so a cancelled job never overwrites the current model)
+        """
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.on_result = on_result
+        self._executor = None
+        self._jobs = OrderedDict()  # job id -> job dict
+        self._active = {}  # dedupe key -> job id (queued or running jobs)
+        self._futures = {}  # job id -> future (running jobs)
+        self._queue = deque()  # (job id, fn, args) of the queued jobs, oldest first
+        self._lock = threading.RLock()  # cancel() runs the done callback while holding the lock
+
+    @staticmethod
+    def key(data, **params):
+        """
+        Dedupe key of a submission: hash of the data bytes and the parameters.
+        :param data: numpy array
+        :param params: parameters that change the training result
+        :return: hex digest
+        """
+        digest = hashlib.sha256(data.tobytes())
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def _pool(self):
+        # the pool is created lazily, i.e. in the serving process and only when the first job is submitted
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def submit(self, key, fn, *args, **info):
+        """
+        Submit a job or return the queued/running job with the same key.
+        :param key: dedupe key (see TrainingJobs.key)
+        :param fn: picklable function executed in a worker process, fn(*args)
+        :param info: additional fields stored with the job (e.g. model, samples)
+        :return: (job dict, True if an existing job was returned)
+        """
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return self._snapshot(self._jobs[job_id]), True
+            job = dict(info, job_id=uuid.uuid4().hex, key=key, status=QUEUED, submitted=time.time(),
+                       started=None, finished=None, result=None, error=None, cancel_requested=False)
+            self._jobs[job['job_id']] = job
+            self._active[key] = job['job_id']
+            self._queue.append((job['job_id'], fn, args))
+            self._prune()
+        self._dispatch()
+        with self._lock:
+            return self._snapshot(job), False
+
+    def _dispatch(self):
+        """ Start queued jobs while workers are free. """
+        started = []
+        with self._lock:
+            while self._queue and len(self._futures) < self.max_workers:
+                job_id, fn, args = self._queue.popleft()
+                job = self._jobs[job_id]
+                job['status'], job['started'] = RUNNING, time.time()
+                self._futures[job_id] = self._pool().submit(fn, *args)
+                started.append(job_id)
+        for job_id in started:  # outside the lock: the callback runs immediately if the job is already done
+            self._futures[job_id].add_done_callback(lambda f, job_id=job_id: self._done(job_id, f))
+
+    def _done(self, job_id, future):
+        try:
+            self._finish(job_id, future)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+            self._dispatch()  # the worker is free: start the next queued job
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._active.pop(job['key'], None)
+            job['finished'] = time.time()
+            if future.cancelled() or job['cancel_requested']:
+                job['status'] = CANCELLED  # the result of a job cancelled while running is discarded
+                return
+            error = future.exception()
+            if error is not None:
+                job['status'], job['error'] = FAILED, str(error)
+                return
+        try:
+            result = future.result()
+            job_result = self.on_result(job, result) if self.on_result is not None else result
+            status, error = COMPLETED, None
+        except Exception as e:
+            job_result, status, error = None, FAILED, str(e)
+            logger.error(f"training job {job_id} failed: {e}")
+        with self._lock:
+            job['result'], job['status'], job['error'] = job_result, status, error
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in (COMPLETED, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot(job):
+        return {name: value for name, value in job.items() if name != 'key'}
+
+    def get(self, job_id):
+        """
+        :param job_id: job id returned by submit
+        :return: job dict (status, timestamps, result or error) or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return self._snapshot(job)
+
+    def jobs(self):
+        """ :return: list of all known jobs (oldest first) """
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. A queued job is removed from the queue; a running job cannot be interrupted,
+        but its result is discarded when it finishes (the model is not saved).
+        :param job_id: job id returned by submit
+        :return: job dict or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] in (QUEUED, RUNNING):
+                job['cancel_requested'] = True
+                self._active.pop(job['key'], None)  # a new identical submission starts a new job
+            if job['status'] == QUEUED:
+                self._queue = deque(entry for entry in self._queue if entry[0] != job_id)
+                job['status'], job['finished'] = CANCELLED, time.time()
+            return self._snapshot(job)
+
+    def shutdown(self):
+        """ Stop the worker processes (queued jobs are cancelled). """
+        with self._lock:
+            for job_id, _, _ in self._queue:
+                self._jobs[job_id]['status'], self._jobs[job_id]['finished'] = CANCELLED, time.time()
+                self._active.pop(self._jobs[job_id]['key'], None)
+            self._queue.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None